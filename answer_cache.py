@@ -0,0 +1,259 @@
+"""Answer cache in front of ToolsCallingAgentWithMem for near-duplicate opening questions.
+
+Questions are normalized (Vietnamese diacritics removed, lowercased, punctuation and extra
+spaces dropped) and indexed by character trigrams. A new question is answered from the cache
+when its cosine similarity with a cached question reaches ANSWER_CACHE_SIMILARITY and both
+mention the same numbers and stock symbols ("FPT lãi ròng 10 năm" never matches "... 5 năm").
+
+An entry expires when:
+- the data version changes, i.e. a newer row in ingestion_runs (see Database.record_ingestion_run)
+- its TTL passes: ANSWER_CACHE_PRICE_TTL_SECONDS if the answer used live prices,
+  ANSWER_CACHE_TTL_SECONDS otherwise
+
+Only the first question of a conversation is cached: later ones depend on the earlier turns.
+The VN100 symbol list that decides which tokens are symbols is fixed on first use, so a question
+always gets the same keys whether it is added or looked up.
+"""
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from typing import Dict, Iterable, List, Optional, Set
+from async_database import AsyncDatabase
+from database import reference_cache
+from tool_result_cache import PRICE_TOOLS
+load_dotenv()
+
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', 0.9))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', 12 * 3600))
+ANSWER_CACHE_PRICE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_PRICE_TTL_SECONDS', 300))
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', 2000))
+# How long a data version read from MySQL is trusted before asking again
+DATA_VERSION_CHECK_SECONDS = 60
+NGRAM_SIZE = 3
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip Vietnamese diacritics and punctuation, collapse spaces.
+    e.g. "Top  ngân hàng TỐT nhất?" -> "top ngan hang tot nhat"
+    """
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+def ngrams(normalized: str) -> Counter:
+    padded = f" {normalized} "
+    return Counter(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+
+def key_tokens(question: str, normalized: str, symbols: Optional[Set[str]] = None) -> frozenset:
+    """Tokens that must match exactly: numbers and stock symbols.
+    Without a symbol list, every 3-character token is treated as a possible symbol.
+    """
+    tokens = normalized.split()
+    keys = {token for token in tokens if token.isdigit()}
+    keys |= {token.lower() for token in re.findall(r"\b[A-Z0-9]{3}\b", question)}
+    if symbols is not None:
+        keys |= {token for token in tokens if token in symbols}
+    else:
+        keys |= {token for token in tokens if len(token) == 3 and token.isalnum()}
+    return frozenset(keys)
+
+class AnswerCacheEntry:
+    def __init__(self, question: str, answer: str, grams: Counter, keys: frozenset,
+                 created_at: datetime, expires_at: float):
+        self.question = question
+        self.answer = answer
+        self.grams = grams
+        self.norm = math.sqrt(sum(count * count for count in grams.values()))
+        self.keys = keys
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+class AnswerCache:
+    """Process-wide cache of answers to opening questions, shared by all sessions"""
+    def __init__(self,
+                 similarity: float = ANSWER_CACHE_SIMILARITY,
+                 ttl: float = ANSWER_CACHE_TTL_SECONDS,
+                 price_ttl: float = ANSWER_CACHE_PRICE_TTL_SECONDS,
+                 max_entries: int = ANSWER_CACHE_SIZE,
+                 symbols: Optional[Iterable[str]] = None):
+        """
+        Args:
+            similarity (float): Minimum cosine similarity of the trigram vectors (0 to 1)
+            ttl (float): Lifetime in seconds of an answer that did not use live prices
+            price_ttl (float): Lifetime in seconds of an answer that used live prices
+            max_entries (int): Oldest entries are evicted beyond this size
+            symbols (list[str]): Stock symbols, loaded from the reference data by load_symbols by default
+        """
+        self.similarity = similarity
+        self.ttl = ttl
+        self.price_ttl = price_ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[int, AnswerCacheEntry]" = OrderedDict()
+        self.index: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self._data_version: Optional[datetime] = None
+        self._data_version_checked = None
+        self.hits = 0
+        self.misses = 0
+        self.symbols: Optional[frozenset] = None
+        # Once the keys of an entry are computed, the symbol list may not change any more
+        self._symbols_fixed = False
+        if symbols is not None:
+            self.symbols = frozenset(symbol.lower() for symbol in symbols)
+            self._symbols_fixed = True
+
+    async def load_symbols(self):
+        """Load the symbol list from the reference data, once, before the first key is computed.
+        If it cannot be loaded, every 3-character token counts as a symbol for the life of the cache.
+        """
+        if self._symbols_fixed:
+            return
+        try:
+            if reference_cache.is_stale():
+                async with AsyncDatabase() as db:
+                    await db.ensure_reference_cache()
+            symbols = frozenset(symbol.lower() for symbol in reference_cache.get_all_symbols())
+        except Exception as e:
+            print(f"Error loading symbols for the answer cache: {e}")
+            symbols = None
+        if not self._symbols_fixed:
+            self.symbols = symbols
+            self._symbols_fixed = True
+
+    def _keys(self, question: str, normalized: str) -> frozenset:
+        self._symbols_fixed = True
+        return key_tokens(question, normalized, self.symbols)
+
+    async def data_version(self) -> Optional[datetime]:
+        """Latest ingestion time, read from MySQL at most every DATA_VERSION_CHECK_SECONDS"""
+        now = time.monotonic()
+        if self._data_version_checked is None or now - self._data_version_checked > DATA_VERSION_CHECK_SECONDS:
+            try:
+                async with AsyncDatabase() as db:
+                    version = await db.get_data_version()
+            except Exception as e:
+                print(f"Error checking data version: {e}")
+                version = self._data_version
+            if version != self._data_version:
+                self._data_version = version
+                self._expire_before(version)
+            self._data_version_checked = now
+        return self._data_version
+
+    def _expire_before(self, version: Optional[datetime]):
+        if version is None:
+            return
+        for entry_id in [i for i, entry in self.entries.items() if entry.created_at < version]:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for gram in entry.grams:
+            ids = self.index.get(gram)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.index[gram]
+
+    def add(self, question: str, answer: str, used_price: bool = False, created_at: Optional[datetime] = None):
+        """Cache the answer to an opening question.
+        Args:
+            question (str): The user's question
+            answer (str): The final answer
+            used_price (bool): The answer used live prices and expires after price_ttl
+            created_at (datetime): When the answer was produced, now by default
+        """
+        created_at = created_at or datetime.now()
+        age = (datetime.now() - created_at).total_seconds()
+        expires_at = time.monotonic() + (self.price_ttl if used_price else self.ttl) - age
+        if expires_at <= time.monotonic() or not answer:
+            return
+        normalized = normalize_question(question)
+        entry = AnswerCacheEntry(question, answer, ngrams(normalized), self._keys(question, normalized),
+                                 created_at, expires_at)
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = entry
+        for gram in entry.grams:
+            self.index.setdefault(gram, set()).add(entry_id)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def find(self, question: str) -> Optional[AnswerCacheEntry]:
+        """Most similar live entry for the question, without checking the data version"""
+        normalized = normalize_question(question)
+        grams = ngrams(normalized)
+        norm = math.sqrt(sum(count * count for count in grams.values()))
+        if not norm:
+            return None
+        keys = self._keys(question, normalized)
+        now = time.monotonic()
+        dots: Counter = Counter()
+        for gram, count in grams.items():
+            for entry_id in self.index.get(gram, ()):
+                dots[entry_id] += count * self.entries[entry_id].grams[gram]
+        best, best_score = None, self.similarity
+        for entry_id, dot in dots.items():
+            entry = self.entries[entry_id]
+            score = dot / (norm * entry.norm)
+            if score >= best_score and entry.keys == keys and entry.expires_at > now:
+                best, best_score = entry, score
+        return best
+
+    async def lookup(self, question: str) -> Optional[str]:
+        """Cached answer to a near-duplicate question, if still valid for the current data version"""
+        await self.load_symbols()
+        await self.data_version()
+        entry = self.find(question)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.answer
+
+    async def load_history(self, limit: int = 1000) -> int:
+        """Seed the cache with recent opening questions from tool_calling_messages.
+        Answers older than the TTL or the data version are skipped. Conversations that called a
+        price tool (seen in verbose_messages) are treated as price-dependent.
+        Returns:
+            int: Number of answers loaded
+        """
+        await self.load_symbols()
+        since = datetime.now() - timedelta(seconds=self.ttl)
+        version = await self.data_version()
+        if version is not None and version > since:
+            since = version
+        # The conversation database lives on the same server as MYSQL_DB
+        conversation_db = os.getenv('MYSQL_CONVERSATION_DB')
+        price_filter = " OR ".join("c.verbose_messages LIKE %s" for _ in PRICE_TOOLS)
+        query = f"""
+            SELECT m.question, m.answer, m.created_at, ({price_filter}) AS used_price
+            FROM {conversation_db}.tool_calling_messages m
+            JOIN {conversation_db}.tool_calling_conversations c ON c.conversation_id = m.conversation_id
+            WHERE m.created_at >= %s
+              AND m.id = (SELECT MIN(id) FROM {conversation_db}.tool_calling_messages WHERE conversation_id = m.conversation_id)
+            ORDER BY m.created_at DESC
+            LIMIT %s
+        """
+        params = tuple(f"%{tool}%" for tool in PRICE_TOOLS) + (since, limit)
+        try:
+            async with AsyncDatabase() as db:
+                await db.cursor.execute(query, params)
+                rows = await db.cursor.fetchall()
+        except Exception as e:
+            print(f"Error loading answer history: {e}")
+            return 0
+        count = len(self.entries)
+        for question, answer, created_at, used_price in reversed(rows):
+            self.add(question, answer, bool(used_price), created_at)
+        return len(self.entries) - count
+
+def used_price_tools(tool_names: Iterable[str]) -> bool:
+    return any(name.lower() in PRICE_TOOLS for name in tool_names)
@@ -0,0 +1,355 @@
+"""Asyncio-native counterpart of database.py for the async chat agent.
+
+AsyncDatabase mirrors the read methods of Database on top of aiomysql, with its own
+connection pool, so concurrent chat sessions in one process do not block the event
+loop on MySQL I/O. The tools below have the same names and arguments as the ones in
+database.py and can replace them in the agent's tool list (see utils.ASYNC_FIN_TOOLS).
+"""
+import asyncio
+import contextlib
+import os
+import socket
+import aiomysql
+import pandas as pd
+from pymysql import MySQLError
+from dotenv import load_dotenv
+from langchain_core.tools import tool
+from datetime import datetime
+from typing import List, Optional
+from database import (
+    MYSQL_POOL_SIZE, LATEST_METRICS_BY_INDUSTRY_QUERY, SCOREBOARD_QUERY, reference_cache, resolve_financial_columns,
+    build_financial_data_query, pivot_financial_data, to_compact_csv
+)
+from ranking import score_companies
+from tracing import traced
+load_dotenv()
+
+# aiomysql pools and asyncio locks are bound to the event loop that created them
+_async_pool = None
+_async_pool_loop = None
+_async_pool_lock = None
+_reference_cache_lock = None
+
+async def _close_pool(pool: aiomysql.Pool):
+    pool.close()
+    await pool.wait_closed()
+
+def _discard_pool(pool: aiomysql.Pool, loop: asyncio.AbstractEventLoop):
+    """Close the pool of an event loop other than the running one"""
+    if loop.is_running():
+        # Still serving in another thread: close it there
+        asyncio.run_coroutine_threadsafe(_close_pool(pool), loop)
+        return
+    # A finished loop cannot run the close any more: shut the sockets down so that MySQL frees
+    # the connections, their file descriptors are closed with the collected transports
+    pool.close()
+    for connection in [*pool._free, *pool._used]:
+        writer = connection._writer
+        sock = writer.transport.get_extra_info('socket') if writer else None
+        if sock is not None:
+            with contextlib.suppress(OSError):
+                sock.shutdown(socket.SHUT_RDWR)
+
+def _bind_loop(loop: asyncio.AbstractEventLoop):
+    """Reset the per-loop state for loop, discarding the pool of the previous loop"""
+    global _async_pool, _async_pool_loop, _async_pool_lock, _reference_cache_lock
+    if _async_pool_loop is loop:
+        return
+    if _async_pool is not None:
+        _discard_pool(_async_pool, _async_pool_loop)
+    _async_pool = None
+    _async_pool_loop = loop
+    _async_pool_lock = asyncio.Lock()
+    _reference_cache_lock = asyncio.Lock()
+
+async def get_async_pool() -> aiomysql.Pool:
+    """Get the aiomysql pool of the running event loop, creating it on first use.
+    Returns:
+        aiomysql.Pool: Pool of up to MYSQL_POOL_SIZE connections
+    """
+    global _async_pool
+    loop = asyncio.get_running_loop()
+    if _async_pool is not None and _async_pool_loop is loop:
+        return _async_pool
+    _bind_loop(loop)
+    async with _async_pool_lock:
+        if _async_pool is None:
+            _async_pool = await aiomysql.create_pool(
+                minsize=1,
+                maxsize=MYSQL_POOL_SIZE,
+                pool_recycle=3600,
+                autocommit=True,
+                host=os.getenv('MYSQL_HOST'),
+                user=os.getenv('MYSQL_USER'),
+                password=os.getenv('MYSQL_PASSWORD'),
+                db=os.getenv('MYSQL_DB'),
+                port=int(os.getenv('MYSQL_PORT', 3306))
+            )
+    return _async_pool
+
+async def close_async_pool():
+    """Close the pool of the running event loop, e.g. on server shutdown"""
+    global _async_pool
+    pool, _async_pool = _async_pool, None
+    if pool is None:
+        return
+    if _async_pool_loop is asyncio.get_running_loop():
+        await _close_pool(pool)
+    else:
+        _discard_pool(pool, _async_pool_loop)
+
+class AsyncDatabase:
+    """Async mirror of the Database read methods, used as `async with AsyncDatabase() as db:`"""
+    def __init__(self):
+        self.connection = None
+        self.cursor = None
+        self._pool = None
+
+    async def __aenter__(self):
+        self._pool = await get_async_pool()
+        self.connection = await self._pool.acquire()
+        try:
+            # Health check: reconnect if the server dropped the idle connection
+            await self.connection.ping(reconnect=True)
+            self.cursor = await self.connection.cursor()
+        except MySQLError:
+            self._pool.release(self.connection)
+            self.connection = None
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.cursor:
+            await self.cursor.close()
+            self.cursor = None
+        if self.connection:
+            self._pool.release(self.connection)
+            self.connection = None
+        return False
+
+    async def _fetch_frame(self, query: str, params=None) -> pd.DataFrame:
+        await self.cursor.execute(query, params)
+        results = await self.cursor.fetchall()
+        return pd.DataFrame(list(results), columns=[i[0] for i in self.cursor.description])
+
+    @traced("db.refresh_reference_cache")
+    async def refresh_reference_cache(self):
+        """Reload the shared reference_cache from MySQL without blocking the event loop"""
+        await self.cursor.execute("SELECT symbol FROM vn100_listing")
+        listing_rows = await self.cursor.fetchall()
+        await self.cursor.execute("""
+            SELECT symbol, organ_name, industry_name_lv2, industry_code_lv2
+            FROM vn100_listing_by_industry
+        """)
+        industry_rows = await self.cursor.fetchall()
+        reference_cache.load(listing_rows, industry_rows)
+
+    async def ensure_reference_cache(self):
+        """Reload reference_cache if it is stale; concurrent callers wait for a single reload"""
+        if not reference_cache.is_stale():
+            return
+        _bind_loop(asyncio.get_running_loop())
+        async with _reference_cache_lock:
+            if reference_cache.is_stale():
+                await self.refresh_reference_cache()
+
+    async def get_industries_list(self) -> list[dict]:
+        """Get list of industries, see Database.get_industries_list"""
+        await self.ensure_reference_cache()
+        return reference_cache.get_industries_list()
+
+    async def get_symbols_by_industry(self, industry_code_lv2: str) -> list[str]:
+        """Get list of symbols by industry, see Database.get_symbols_by_industry"""
+        await self.ensure_reference_cache()
+        return reference_cache.get_symbols_by_industry(industry_code_lv2)
+
+    async def get_all_symbols(self) -> list[str]:
+        await self.ensure_reference_cache()
+        return reference_cache.get_all_symbols()
+
+    async def get_company_info(self, symbol: str) -> dict:
+        await self.ensure_reference_cache()
+        return reference_cache.get_company_info(symbol)
+
+    @traced("db.get_financial_data")
+    async def get_financial_data(self, symbol: str, year: Optional[List[int]] = None,
+                                 column_groups: Optional[List[str]] = None, year_from: Optional[int] = None,
+                                 year_to: Optional[int] = None) -> pd.DataFrame:
+        """Get financial data by symbol, see Database.get_financial_data"""
+        columns = resolve_financial_columns(column_groups)
+        query, params = build_financial_data_query([symbol], columns, year, year_from, year_to)
+        return await self._fetch_frame(query, params)
+
+    @traced("db.get_financial_data_batch")
+    async def get_financial_data_batch(self, symbols: List[str], year: Optional[List[int]] = None,
+                                       metrics: Optional[List[str]] = None, year_from: Optional[int] = None,
+                                       year_to: Optional[int] = None) -> pd.DataFrame:
+        """Get financial data of several symbols pivoted for comparison, see Database.get_financial_data_batch"""
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol and symbol.strip()))
+        columns = resolve_financial_columns(metrics)
+        query, params = build_financial_data_query(symbols, columns, year, year_from, year_to)
+        return pivot_financial_data(await self._fetch_frame(query, params), symbols, columns)
+
+    @traced("db.get_scoreboard_symbols")
+    async def get_scoreboard_symbols(self, industry_code_lv2: str, num_stocks: int = 5) -> List[str]:
+        """Get the best symbols of an industry from industry_scores, see Database.get_scoreboard_symbols"""
+        try:
+            await self.cursor.execute(SCOREBOARD_QUERY, (industry_code_lv2, num_stocks))
+            return [row[0] for row in await self.cursor.fetchall()]
+        except MySQLError as e:
+            print(f"Error reading industry_scores: {e}")
+            return []
+
+    @traced("db.get_data_version")
+    async def get_data_version(self) -> Optional[datetime]:
+        """Get the data version, see Database.get_data_version"""
+        try:
+            await self.cursor.execute("SELECT MAX(finished_at) FROM ingestion_runs")
+            return (await self.cursor.fetchone())[0]
+        except MySQLError as e:
+            print(f"Error reading data version: {e}")
+            return None
+
+    @traced("db.get_best_symbols_by_industry")
+    async def get_best_symbols_by_industry(self, industry_code_lv2: str, num_stocks: int = 5,
+                                           missing_threshold: float = 0.5) -> List[str]:
+        """Get list of best stocks by industry, from the scoreboard or scored on the fly.
+        See Database.get_best_symbols_by_industry
+        """
+        symbols = await self.get_scoreboard_symbols(industry_code_lv2, num_stocks)
+        if symbols:
+            return symbols
+        data = await self._fetch_frame(LATEST_METRICS_BY_INDUSTRY_QUERY, (industry_code_lv2,))
+        if data.empty:
+            return []
+        sorted_companies, _ = score_companies(data, missing_threshold)
+        return sorted_companies['symbol'].head(num_stocks).tolist()
+
+@tool
+async def get_financial_data_tool(symbol: str, column_groups: Optional[List[str]] = None, year_from: Optional[int] = None,
+                                  year_to: Optional[int] = None, year: Optional[List[int]] = None) -> str:
+    """Get financial data by symbol: income statement, balance sheet, cash flow statement and yearly stock price
+    Pay attention to percentage values, they may be stored as decimal values (e.g: 15% is stored as 0.15)
+    Only request the column groups and years needed to answer the question.
+    Args:
+        symbol (str): Symbol of the company
+        column_groups (list[str]): Any of "balance_sheet", "income_statement", "cash_flow", "ratios", "price".
+            If None, get all groups
+        year_from (int): First year to get (inclusive), if None, from the earliest year
+        year_to (int): Last year to get (inclusive), if None, up to the latest year
+        year (list[int]): Exact years to get instead of a range, if None, get all years
+    Returns:
+        str: a string representation of the financial data in compact csv format, one row per year
+    """
+    try:
+        async with AsyncDatabase() as db:
+            financial_data = await db.get_financial_data(symbol, year, column_groups, year_from, year_to)
+            return to_compact_csv(financial_data, drop_columns=['symbol'])
+    except ValueError as e:
+        return str(e)
+    except MySQLError as e:
+        print(f"Error getting financial data: {e}")
+        return "Error getting financial data"
+
+@tool
+async def get_financial_data_batch_tool(symbols: List[str], metrics: Optional[List[str]] = None, year_from: Optional[int] = None,
+                                        year_to: Optional[int] = None, year: Optional[List[int]] = None) -> str:
+    """Get financial data of several companies at once, as one comparison table. Prefer this over
+    calling get_financial_data_tool once per symbol when comparing companies (e.g. "VCB vs BID vs CTG").
+    Pay attention to percentage values, they may be stored as decimal values (e.g: 15% is stored as 0.15)
+    Args:
+        symbols (list[str]): Symbols of the companies, e.g. ["VCB", "BID", "CTG"]
+        metrics (list[str]): Column groups ("balance_sheet", "income_statement", "cash_flow", "ratios", "price")
+            and/or column names (e.g. "net_profit_billion_vnd", "return_on_equity_percent"). If None, get all
+        year_from (int): First year to get (inclusive), if None, from the earliest year
+        year_to (int): Last year to get (inclusive), if None, up to the latest year
+        year (list[int]): Exact years to get instead of a range, if None, get all years
+    Returns:
+        str: compact csv with one row per (metric, year_report) and one column per symbol
+    """
+    try:
+        async with AsyncDatabase() as db:
+            table = await db.get_financial_data_batch(symbols, year, metrics, year_from, year_to)
+            return to_compact_csv(table.reset_index())
+    except ValueError as e:
+        return str(e)
+    except MySQLError as e:
+        print(f"Error getting financial data batch: {e}")
+        return "Error getting financial data batch"
+
+@tool
+async def get_industries_list_tool() -> list[dict]:
+    """Get list of industries.
+    Pay attention that the input industry name may be not the exact name, try to find the matched industry name in the list
+    Returns:
+        list[dict]: List of industries with industry_code_lv2 and industry_name_lv2
+        e.g: [{"industry_code_lv2": "1000", "industry_name_lv2": "Ngành nông nghiệp"},
+              {"industry_code_lv2": "2000", "industry_name_lv2": "Ngành công nghiệp"}]
+    """
+    try:
+        async with AsyncDatabase() as db:
+            return await db.get_industries_list()
+    except MySQLError as e:
+        print(f"Error getting industries list: {e}")
+        return []
+
+@tool
+async def get_symbols_by_industry_tool(industry_code_lv2: str) -> list[str]:
+    """Get list of symbols by industry.
+    Args:
+        industry_code_lv2 (str): Industry code of the industry
+    Returns:
+        list[str]: List of symbols
+        e.g: ["VCB", "BID", "CTG"]
+    """
+    try:
+        async with AsyncDatabase() as db:
+            return await db.get_symbols_by_industry(industry_code_lv2)
+    except MySQLError as e:
+        print(f"Error getting symbols by industry: {e}")
+        return []
+
+@tool
+async def get_all_symbols_tool() -> list[str]:
+    """Get list of all symbols in the database.
+    Returns:
+        list[str]: List of all symbols
+        e.g: ["VCB", "BID", "CTG", ...]
+    """
+    try:
+        async with AsyncDatabase() as db:
+            return await db.get_all_symbols()
+    except MySQLError as e:
+        print(f"Error getting all symbols: {e}")
+        return []
+
+@tool
+async def get_company_info_tool(symbol: str) -> dict:
+    """Get company information by symbol.
+    Args:
+        symbol (str): Symbol of the company
+    Returns:
+        dict: Company information including industry and organization name
+    """
+    try:
+        async with AsyncDatabase() as db:
+            return await db.get_company_info(symbol)
+    except MySQLError as e:
+        print(f"Error getting company info: {e}")
+        return {}
+
+@tool
+async def get_best_symbols_by_industry_tool(industry_code_lv2: str, num_stocks: int = 5) -> list[str]:
+    """Get list of best stocks by industry based on a composite score, with 50% weight on total trading volume (price * volume).
+    Args:
+        industry_code_lv2 (str): Industry code of the industry
+        num_stocks (int): Number of stocks to return
+    Returns:
+        list[str]: List of symbols
+    """
+    try:
+        async with AsyncDatabase() as db:
+            return await db.get_best_symbols_by_industry(industry_code_lv2, num_stocks)
+    except MySQLError as e:
+        print(f"Error getting best stocks by industry: {e}")
+        return []
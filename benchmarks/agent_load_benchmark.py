@@ -0,0 +1,258 @@
+"""Load test of the async agent loop: many concurrent conversations served by one process.
+
+The questions stored in tool_calling_messages (MYSQL_CONVERSATION_DB, or parsed from
+vnstock_conversation_db.sql with --dump) are replayed conversation by conversation, each in
+its own ToolsCallingAgentWithMem. The LLM is a stub that answers after a fixed latency: the
+first call of a turn requests tool calls, the next one returns the final answer. Tools are
+stubs too, unless --real-tools runs the async reference-data tools against MySQL.
+
+--stream streams the answers through a ResponseStreamer, the stub emitting one word every
+--token-latency seconds, and also reports the time to the first token of the final answer and
+the streaming time, from that first token to the end of the turn. --token-latency defaults to 0
+so that turns/s and the turn latencies measure the agent loop rather than the simulated typing
+speed; set it (e.g. 0.01 with --answer-words 200) to see how streaming adds up.
+
+--blocking makes the stub sleep synchronously inside ainvoke, which reproduces the previous
+blocking llm_with_tools.invoke and shows turns serializing on the event loop.
+
+--trace enables the tracer and prints the span histograms (turn, LLM calls, tool calls).
+
+Usage:
+    pipenv run python -m benchmarks.agent_load_benchmark [--dump vnstock_conversation_db.sql]
+        [--sessions 20] [--llm-latency 0.5] [--tool-latency 0.2] [--stream [--token-latency 0.01]]
+        [--blocking] [--trace]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import tool
+from typing import Dict, List
+from tools_summ_mem import ToolsCallingAgentWithMem
+from tools.response_streamer import ResponseStreamer, ResponseStreamListener
+from tracing import tracer
+load_dotenv()
+
+class StubChatModel(BaseChatModel):
+    """Chat model answering after `latency` seconds, with tool calls on the first call of a turn.
+    When streamed, the answer is sent one word every `token_latency` seconds after `latency`.
+    """
+    latency: float = 0.5
+    token_latency: float = 0.0
+    blocking: bool = False
+    # Tool calls requested once tools are bound, the unbound model (e.g. the memory summarizer) only answers
+    bound_tool_calls: List[dict] = []
+    tool_calls: List[dict] = []
+    answer: str = "Stub answer."
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tool_calls": self.bound_tool_calls})
+
+    def _respond(self, messages) -> ChatResult:
+        if self.tool_calls and isinstance(messages[-1], HumanMessage):
+            calls = [dict(call, id=f"call_{i}_{len(messages)}") for i, call in enumerate(self.tool_calls)]
+            message = AIMessage(content="", tool_calls=calls)
+        else:
+            message = AIMessage(content=self.answer)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = (await self._agenerate(messages)).generations[0].message
+        if message.tool_calls:
+            chunks = [{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                      for i, call in enumerate(message.tool_calls)]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=chunks))
+            return
+        for i, word in enumerate(message.content.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+class FirstTokenTimer(ResponseStreamListener):
+    """Records when the first token of the final answer was streamed."""
+    def __init__(self):
+        self.first_token = None
+
+    async def on_stream(self, text: str):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    async def on_event(self, event: dict):
+        if event["type"] == "answer_reset":
+            self.first_token = None
+
+def make_stub_tools(latency: float) -> List:
+    @tool
+    async def lookup_tool(query: str) -> str:
+        """Stub data lookup.
+        Args:
+            query (str): What to look up
+        """
+        await asyncio.sleep(latency)
+        return f"result for {query}"
+    return [lookup_tool]
+
+def parse_sql_values(text: str) -> List[tuple]:
+    """Parse the `(...),(...)` tuples of a mysqldump INSERT statement into Python values."""
+    escapes = {'n': '\n', 'r': '\r', 't': '\t', '0': '\0', 'Z': '\x1a'}
+    rows, row, i = [], None, 0
+    while i < len(text):
+        char = text[i]
+        if char == '(' and row is None:
+            row, token = [], ''
+        elif row is not None and char == "'":
+            value, i = [], i + 1
+            while text[i] != "'":
+                if text[i] == '\\':
+                    i += 1
+                    value.append(escapes.get(text[i], text[i]))
+                else:
+                    value.append(text[i])
+                i += 1
+            row.append(''.join(value))
+            token = None
+        elif row is not None and char in ',)':
+            if token:
+                row.append(None if token == 'NULL' else token)
+            token = ''
+            if char == ')':
+                rows.append(tuple(row))
+                row = None
+        elif row is not None and token is not None:
+            token += char
+        i += 1
+    return rows
+
+def load_questions_from_dump(path: str) -> Dict[str, List[str]]:
+    prefix = "INSERT INTO `tool_calling_messages` VALUES "
+    conversations: Dict[str, List[str]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(prefix):
+                for row in parse_sql_values(line[len(prefix):]):
+                    conversations.setdefault(row[1], []).append(row[2])
+    return conversations
+
+def load_questions_from_db() -> Dict[str, List[str]]:
+    import mysql.connector
+    connection = mysql.connector.connect(
+        host=os.getenv('MYSQL_HOST'),
+        user=os.getenv('MYSQL_USER'),
+        password=os.getenv('MYSQL_PASSWORD'),
+        database=os.getenv('MYSQL_CONVERSATION_DB'),
+        port=int(os.getenv('MYSQL_PORT', 3306))
+    )
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT conversation_id, question FROM tool_calling_messages ORDER BY conversation_id, id")
+        conversations: Dict[str, List[str]] = {}
+        for conversation_id, question in cursor.fetchall():
+            conversations.setdefault(conversation_id, []).append(question)
+        return conversations
+    finally:
+        connection.close()
+
+async def replay(conversation: List[str], make_agent, stream: bool, latencies: List[float], first_tokens: List[float],
+                 stream_times: List[float]):
+    timer = None
+    streamer = None
+    if stream:
+        timer = FirstTokenTimer()
+        streamer = ResponseStreamer()
+        streamer.add_listener(timer)
+    agent = make_agent(streamer)
+    for question in conversation:
+        start = time.perf_counter()
+        if timer:
+            timer.first_token = None
+        await agent.process_user_message(question)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        if streamer:
+            await streamer.flush()
+        if timer and timer.first_token is not None:
+            first_tokens.append(timer.first_token - start)
+            stream_times.append(end - timer.first_token)
+
+async def run(conversations: List[List[str]], make_agent, stream: bool) -> tuple:
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    stream_times: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(replay(conversation, make_agent, stream, latencies, first_tokens, stream_times)
+                           for conversation in conversations))
+    return time.perf_counter() - start, latencies, first_tokens, stream_times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dump", help="Read the questions from this mysqldump instead of MYSQL_CONVERSATION_DB")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent conversations (stored ones are reused)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per stub LLM call")
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="Seconds per stub tool call")
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls requested in each turn")
+    parser.add_argument("--real-tools", action="store_true", help="Call the async reference-data tools instead of stubs")
+    parser.add_argument("--stream", action="store_true", help="Stream the answers and report the time to first token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed words")
+    parser.add_argument("--answer-words", type=int, default=200, help="Words in each stub answer")
+    parser.add_argument("--blocking", action="store_true", help="Simulate the previous blocking LLM call")
+    parser.add_argument("--trace", action="store_true", help="Trace the turns and print the span histograms")
+    args = parser.parse_args()
+    tracer.enabled = tracer.enabled or args.trace
+
+    stored = load_questions_from_dump(args.dump) if args.dump else load_questions_from_db()
+    stored = [questions for questions in stored.values() if questions]
+    if not stored:
+        print("No stored questions found")
+        return
+    conversations = [stored[i % len(stored)] for i in range(args.sessions)]
+
+    if args.real_tools:
+        import utils
+        tools = utils.ASYNC_FIN_TOOLS
+        names = ["get_industries_list_tool", "get_all_symbols_tool"]
+        tool_calls = [{"name": names[i % len(names)], "args": {}} for i in range(args.tool_calls)]
+    else:
+        tools = make_stub_tools(args.tool_latency)
+        tool_calls = [{"name": "lookup_tool", "args": {"query": f"q{i}"}} for i in range(args.tool_calls)]
+    llm = StubChatModel(latency=args.llm_latency, token_latency=args.token_latency, blocking=args.blocking,
+                        bound_tool_calls=tool_calls, answer=" ".join(["token"] * args.answer_words))
+
+    def make_agent(streamer):
+        return ToolsCallingAgentWithMem(system_prompt="Load test", tools=tools, llm=llm, streamer=streamer)
+
+    elapsed, latencies, first_tokens, stream_times = asyncio.run(run(conversations, make_agent, args.stream))
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(f"sessions={args.sessions} turns={len(latencies)} elapsed={elapsed:.2f}s")
+    print(f"turns/s={len(latencies) / elapsed:.2f}  p50={p50 * 1000:.0f} ms  p95={p95 * 1000:.0f} ms")
+    if first_tokens:
+        p50, p95 = np.percentile(first_tokens, [50, 95])
+        print(f"first token: p50={p50 * 1000:.0f} ms  p95={p95 * 1000:.0f} ms")
+        p50, p95 = np.percentile(stream_times, [50, 95])
+        print(f"streaming ({args.answer_words} words, {args.token_latency * 1000:g} ms/word): "
+              f"p50={p50 * 1000:.0f} ms  p95={p95 * 1000:.0f} ms")
+    if tracer.enabled:
+        print(tracer.format_summary())
+
+if __name__ == "__main__":
+    main()
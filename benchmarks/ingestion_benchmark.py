@@ -0,0 +1,74 @@
+"""Benchmark financial_data ingestion: row-by-row iterrows() inserts vs the bulk executemany path.
+
+Both paths load combined_financial_data.csv into a scratch copy of financial_data,
+so the real table is never touched.
+
+Usage:
+    pipenv run python -m benchmarks.ingestion_benchmark [--repeat 1] [--batch-size 1000]
+"""
+import argparse
+import os
+import time
+import pandas as pd
+from mysql.connector import Error
+from database import Database, FINANCIAL_DATA_COLUMNS, FINANCIAL_DATA_CSV_COLUMNS, INGEST_BATCH_SIZE, prepare_financial_rows
+
+BENCH_TABLE = "financial_data_bench"
+
+def legacy_insert(db: Database, financial_df: pd.DataFrame) -> int:
+    """Previous ingestion path: one pd.isna/row.get per column and one execute() per row."""
+    query = f"""
+        INSERT IGNORE INTO {BENCH_TABLE} ({', '.join(FINANCIAL_DATA_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(FINANCIAL_DATA_COLUMNS))})
+    """
+    csv_columns = list(financial_df.columns)
+    for _, row in financial_df.iterrows():
+        values = [None if pd.isna(row.get(column)) else row.get(column) for column in csv_columns]
+        db.cursor.execute(query, values)
+    db.connection.commit()
+    return len(financial_df)
+
+def bulk_insert(db: Database, financial_df: pd.DataFrame, batch_size: int) -> int:
+    """New ingestion path: vectorized NaN -> NULL mapping and chunked executemany."""
+    return db.bulk_insert(BENCH_TABLE, FINANCIAL_DATA_COLUMNS, prepare_financial_rows(financial_df), batch_size)
+
+def reset_bench_table(db: Database):
+    db.cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    db.cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE financial_data")
+
+def run(label: str, func, db: Database, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        reset_bench_table(db)
+        start = time.perf_counter()
+        rows = func(db)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<10} {rows:>8} rows  {best:>8.3f} s  {rows / best:>12.0f} rows/s")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per path, the best time is reported")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Rows per executemany/commit")
+    args = parser.parse_args()
+
+    db = Database()
+    if not db.connect():
+        return
+    try:
+        raw_df = pd.read_csv(os.path.join(db.data_dir, "combined_financial_data.csv"))
+        # The legacy loop read the CSV columns in table order
+        legacy_df = raw_df.reindex(columns=list(FINANCIAL_DATA_CSV_COLUMNS))
+
+        legacy_time = run("iterrows", lambda d: legacy_insert(d, legacy_df), db, args.repeat)
+        bulk_time = run("bulk", lambda d: bulk_insert(d, raw_df, args.batch_size), db, args.repeat)
+        print(f"Speed-up: {legacy_time / bulk_time:.1f}x")
+    except Error as e:
+        print(f"Error running ingestion benchmark: {e}")
+    finally:
+        db.cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        db.close()
+
+if __name__ == "__main__":
+    main()
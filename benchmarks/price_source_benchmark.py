@@ -0,0 +1,115 @@
+"""Benchmark the pooled price-source HTTP layer against bare requests.get, on a local HTTP stand-in.
+
+A local keep-alive HTTP/1.1 server answers like the VNDirect chart API. The same price lookups
+are made with a new requests.get per call (the previous code) and with get_vn_direct_price on the
+shared session (tools/price_sources.py), sequentially and from a thread pool. The server counts
+the TCP connections it accepted. A last check requests an oversized response, which the pooled
+layer abandons from its Content-Length while requests.get downloads it whole.
+
+The stand-in is plain HTTP on localhost, so only the TCP handshake and per-call session setup are
+saved here; against the real HTTPS endpoints every reused connection also skips a TLS handshake.
+
+Usage:
+    pipenv run python -m benchmarks.price_source_benchmark [--calls 500] [--threads 8] [--large-mb 5]
+"""
+import argparse
+import json
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from tools.price_sources import (
+    USER_AGENT, ResponseTooLarge, create_http_session, get_json, get_vn_direct_price
+)
+import tools.price_sources as price_sources
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, Nagle would delay the body of kept-alive responses
+    disable_nagle_algorithm = True
+    large_bytes = 5_000_000
+    connections = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.connections.add(self.client_address)
+        url = urlparse(self.path)
+        if url.path == "/large":
+            body = b" " * self.large_bytes
+        else:
+            symbol = parse_qs(url.query).get("symbol", ["FPT"])[0]
+            body = json.dumps({"data": [{"symbol": symbol, "last": 120.5}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The pooled client hangs up on oversized bodies
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def bare_price(url: str, symbol: str):
+    """Previous get_vn_direct_price: a new connection per call"""
+    response = requests.get(url, params={"symbol": symbol}, headers={"User-Agent": USER_AGENT}, timeout=3)
+    return float(response.json()["data"][0]["last"])
+
+def pooled_price(url: str, symbol: str):
+    return get_vn_direct_price(symbol, base_url=url)
+
+def measure(fetch, url: str, calls: int, threads: int) -> float:
+    """Seconds per call, sequential if threads is 1"""
+    symbols = [f"S{i % 100:03d}" for i in range(calls)]
+    start = time.perf_counter()
+    if threads == 1:
+        for symbol in symbols:
+            fetch(url, symbol)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda symbol: fetch(url, symbol), symbols))
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="Price lookups per mode")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent lookups in the threaded modes")
+    parser.add_argument("--large-mb", type=float, default=5, help="Size of the oversized response")
+    args = parser.parse_args()
+
+    StandInHandler.large_bytes = int(args.large_mb * 1_000_000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    # Fresh pool sized for the threaded mode, with nothing connected yet
+    price_sources.http_session = create_http_session(pool_size=args.threads)
+
+    print(f"{'mode':<28} {'ms/call':>9} {'connections':>12} {'speed-up':>9}")
+    for threads in (1, args.threads):
+        results = {}
+        for name, fetch in (("requests.get", bare_price), ("pooled session", pooled_price)):
+            StandInHandler.connections = set()
+            per_call = measure(fetch, f"{base}/general", args.calls, threads)
+            results[name] = per_call
+            speed_up = results["requests.get"] / per_call
+            print(f"{name + f' x{threads} threads':<28} {per_call * 1000:>9.3f} {len(StandInHandler.connections):>12} {speed_up:>8.1f}x")
+
+    start = time.perf_counter()
+    requests.get(f"{base}/large", timeout=30).content
+    bare_large = time.perf_counter() - start
+    start = time.perf_counter()
+    try:
+        get_json(f"{base}/large")
+    except ResponseTooLarge as e:
+        print(f"oversized response rejected: {e}")
+    pooled_large = time.perf_counter() - start
+    print(f"{args.large_mb:g} MB response: requests.get {bare_large * 1000:.1f} ms, pooled layer {pooled_large * 1000:.1f} ms")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Benchmark the vectorized ranking engine against the original per-company scoring loop.
+
+Synthetic industries are generated with Decimal/None values like the rows returned by
+mysql.connector. Both implementations score them, the scores are checked for exact equality
+and the time per call is reported.
+
+Usage:
+    pipenv run python -m benchmarks.ranking_benchmark [--sizes 5 10 20 100 1000] [--repeat 20]
+"""
+import argparse
+import decimal
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from ranking import SCORE_METRICS, rank_companies, score_companies
+
+COLUMNS = ['symbol', 'return_on_equity_percent', 'net_profit_margin_percent',
+           'revenue_growth_percent', 'total_liabilities_billion_vnd', 'owner_equity_billion_vnd',
+           'yearly_close_price_vnd', 'yearly_volume', 'year_report']
+
+def legacy_scores(results: List[tuple], missing_threshold: float = 0.5) -> List[tuple]:
+    """Original loop implementation from Database.get_best_symbols_by_industry.
+    Returns:
+        list[tuple]: (symbol, composite_score) sorted by score descending
+    """
+    metrics = SCORE_METRICS
+    data = []
+    for row in results:
+        converted_row = [float(val) if isinstance(val, decimal.Decimal) else val for val in row]
+        data.append(dict(zip(COLUMNS, converted_row)))
+
+    for company in data:
+        total_liabilities = company['total_liabilities_billion_vnd']
+        owner_equity = company['owner_equity_billion_vnd']
+        company['debt_to_equity'] = total_liabilities / owner_equity if owner_equity and owner_equity != 0 and total_liabilities is not None else None
+        price = company['yearly_close_price_vnd']
+        volume = company['yearly_volume']
+        company['total_volume'] = price * volume if price is not None and volume is not None else None
+
+    valid_metrics = {}
+    for metric in metrics:
+        values = [c.get(metric) for c in data if c.get(metric) is not None]
+        missing_ratio = 1 - len(values) / len(data) if data else 1
+        if missing_ratio <= missing_threshold:
+            valid_metrics[metric] = metrics[metric]
+    if not valid_metrics:
+        return []
+
+    metric_stats: Dict[str, tuple] = {}
+    for metric in valid_metrics:
+        values = [c.get(metric) for c in data if c.get(metric) is not None]
+        if values:
+            metric_stats[metric] = (min(values), max(values), np.median(values), np.var(values) if len(values) > 1 else 0)
+        else:
+            metric_stats[metric] = (0, 1, 0.5, 0)
+
+    total_variance = sum(stats[3] for stats in metric_stats.values())
+    metric_weights = {
+        metric: stats[3] / total_variance if total_variance > 0 else 1 / len(valid_metrics)
+        for metric, stats in metric_stats.items()
+    }
+    weight_sum = sum(metric_weights.values())
+    if weight_sum > 0:
+        metric_weights = {k: v / weight_sum for k, v in metric_weights.items()}
+
+    debt_values = [c.get('debt_to_equity') for c in data if c.get('debt_to_equity') is not None]
+    if debt_values:
+        debt_p75 = np.percentile(debt_values, 75)
+        for company in data:
+            debt = company.get('debt_to_equity')
+            if debt is not None and debt > debt_p75 * 1.5:
+                company['debt_to_equity_adjusted'] = max(0, 1 - (debt - debt_p75) / debt_p75)
+            else:
+                company['debt_to_equity_adjusted'] = 1.0 if debt is not None else None
+
+    for company in data:
+        company_score = 0
+        total_weight = 0
+        for metric in valid_metrics:
+            value = company.get(metric if metric != 'debt_to_equity' else 'debt_to_equity_adjusted')
+            min_val, max_val, median_val, _ = metric_stats[metric]
+            if value is None:
+                value = median_val
+            if max_val == min_val:
+                normalized = 1.0
+            elif valid_metrics[metric] == 'higher':
+                normalized = (value - min_val) / (max_val - min_val)
+            else:
+                normalized = (max_val - value) / (max_val - min_val)
+            company_score += normalized * metric_weights[metric]
+            total_weight += metric_weights[metric]
+        company['composite_score'] = company_score / total_weight if total_weight > 0 else 0
+
+    sorted_companies = sorted(data, key=lambda x: x.get('composite_score', 0), reverse=True)
+    return [(c['symbol'], c['composite_score']) for c in sorted_companies]
+
+def vectorized_scores(results: List[tuple], missing_threshold: float = 0.5) -> List[tuple]:
+    scored, _ = score_companies(pd.DataFrame(results, columns=COLUMNS), missing_threshold, verbose=False)
+    return list(zip(scored['symbol'], scored['composite_score']))
+
+def make_industry(size: int, rng: np.random.Generator, missing_rate: float = 0.1) -> List[tuple]:
+    """Random latest-year rows shaped like the financial_data query result."""
+    def maybe(value):
+        return None if rng.random() < missing_rate else value
+    rows = []
+    for i in range(size):
+        rows.append((
+            f"S{i:04d}",
+            maybe(decimal.Decimal(f"{rng.normal(15, 8):.2f}")),
+            maybe(decimal.Decimal(f"{rng.normal(10, 5):.2f}")),
+            maybe(decimal.Decimal(f"{rng.normal(8, 20):.2f}")),
+            maybe(decimal.Decimal(f"{rng.uniform(100, 50000):.2f}")),
+            maybe(decimal.Decimal(f"{rng.uniform(-500, 20000):.2f}")),
+            maybe(decimal.Decimal(f"{rng.uniform(5000, 150000):.2f}")),
+            maybe(int(rng.integers(1_000_000, 2_000_000_000))),
+            2024,
+        ))
+    return rows
+
+def time_call(func, results, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(results)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 20, 100, 1000], help="Companies per industry")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per size, the best time is reported")
+    parser.add_argument("--industries", type=int, default=20, help="Industries ranked in one call")
+    parser.add_argument("--industry-size", type=int, default=5, help="Companies per industry in the one-call run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'companies':>10} {'loop (ms)':>12} {'vectorized (ms)':>16} {'speed-up':>9}  exact")
+    for size in args.sizes:
+        results = make_industry(size, rng)
+        exact = legacy_scores(results) == vectorized_scores(results)
+        loop_time = time_call(legacy_scores, results, args.repeat)
+        vector_time = time_call(vectorized_scores, results, args.repeat)
+        print(f"{size:>10} {loop_time * 1000:>12.3f} {vector_time * 1000:>16.3f} {loop_time / vector_time:>8.1f}x  {exact}")
+
+    # Whole VN100 at once: one legacy call per industry vs a single rank_companies call
+    industries = {f"{code:04d}": make_industry(args.industry_size, rng) for code in range(args.industries)}
+    all_rows = [row + (code,) for code, rows in industries.items() for row in rows]
+    all_df = pd.DataFrame(all_rows, columns=COLUMNS + ['industry_code_lv2'])
+
+    def loop_all(_):
+        return {code: legacy_scores(rows) for code, rows in industries.items()}
+
+    def rank_all(_):
+        ranked = rank_companies(all_df)
+        return {code: list(zip(group['symbol'], group['composite_score']))
+                for code, group in ranked.groupby('industry_code_lv2', sort=False)}
+
+    exact = loop_all(None) == rank_all(None)
+    loop_time = time_call(loop_all, None, args.repeat)
+    vector_time = time_call(rank_all, None, args.repeat)
+    label = f"{args.industries}x{args.industry_size}"
+    print(f"{label:>10} {loop_time * 1000:>12.3f} {vector_time * 1000:>16.3f} {loop_time / vector_time:>8.1f}x  {exact}  (all industries)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Token-budgeted conversation memory for ToolsCallingAgentWithMem.
+
+The history is kept as (question, answer) turns with their token counts, computed once when
+a turn is added. When system prompt + summary + turns exceed the budget, every turn but the
+last `keep_last_turns` is folded into a running summary by the LLM, in a background task that
+overlaps with the user typing the next question. The summary is appended to the system prompt,
+so the prompt sent each turn stays roughly flat however long the session is.
+"""
+import asyncio
+import functools
+import os
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
+from typing import List, Optional, Tuple
+from tracing import tracer
+load_dotenv()
+
+MEMORY_TOKEN_BUDGET = int(os.getenv('MEMORY_TOKEN_BUDGET', 8000))
+MEMORY_KEEP_TURNS = int(os.getenv('MEMORY_KEEP_TURNS', 3))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv('MEMORY_SUMMARY_MAX_TOKENS', 600))
+
+SUMMARY_PROMPT = """Bạn tóm tắt cuộc trò chuyện giữa người dùng và trợ lý đầu tư chứng khoán để trợ lý tiếp tục tư vấn.
+Cập nhật bản tóm tắt hiện có với các lượt trò chuyện mới. Giữ lại: mã cổ phiếu, ngành, số liệu quan trọng (kèm năm),
+kết luận đã đưa ra, yêu cầu và sở thích của người dùng. Bỏ lời chào, gợi ý câu hỏi, disclaimer.
+Viết tiếng Việt, dạng gạch đầu dòng, tối đa {max_words} từ. Chỉ trả về bản tóm tắt."""
+
+SUMMARY_HEADER = "\n\nTóm tắt các lượt trò chuyện trước:\n"
+
+_encoding = None
+
+def get_encoding():
+    """tiktoken's cl100k_base encoding, loaded on first use; False if tiktoken is unavailable"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"tiktoken unavailable, estimating tokens from length: {e}")
+            _encoding = False
+    return _encoding
+
+async def warm_encoding():
+    """Load the encoding in a worker thread at startup. Loading reads (or downloads) the BPE
+    ranks, which would otherwise block the event loop in the first count_tokens call.
+    """
+    await asyncio.to_thread(get_encoding)
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken (cl100k_base), or estimate 4 characters per token if it is unavailable.
+    Args:
+        text (str): Text to count
+    Returns:
+        int: Number of tokens
+    """
+    encoding = get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+@functools.lru_cache(maxsize=16)
+def prompt_tokens(system_prompt: str) -> int:
+    """count_tokens for system prompts, which are shared by many conversations"""
+    return count_tokens(system_prompt)
+
+def message_text(message: BaseMessage) -> str:
+    """Text of a message whose content may be a string or a list of content blocks"""
+    return message.content if isinstance(message.content, str) else message.text()
+
+class ConversationMemory:
+    """Recent turns verbatim plus a rolling summary of the older ones, within a token budget"""
+    def __init__(self,
+                 system_prompt: str,
+                 llm: Optional[BaseChatModel] = None,
+                 token_budget: int = MEMORY_TOKEN_BUDGET,
+                 keep_last_turns: int = MEMORY_KEEP_TURNS,
+                 summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS):
+        """
+        Args:
+            system_prompt (str): System prompt, always sent first
+            llm (BaseChatModel): Model writing the summary; without it older turns are truncated instead
+            token_budget (int): Tokens of system prompt + summary + turns above which older turns are folded
+            keep_last_turns (int): Number of latest turns always kept verbatim
+            summary_max_tokens (int): Target length of the summary
+        """
+        self.system_prompt = system_prompt
+        self.llm = llm
+        self.token_budget = token_budget
+        self.keep_last_turns = keep_last_turns
+        self.summary_max_tokens = summary_max_tokens
+        self.system_tokens = prompt_tokens(system_prompt)
+        self.summary = ""
+        self.summary_tokens = 0
+        # (question, answer, tokens)
+        self.turns: List[Tuple[str, str, int]] = []
+        self.turn_tokens = 0
+        self._compaction: Optional[asyncio.Task] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.summary_tokens + self.turn_tokens
+
+    def reset(self):
+        if self._compaction is not None:
+            self._compaction.cancel()
+            self._compaction = None
+        self.summary = ""
+        self.summary_tokens = 0
+        self.turns = []
+        self.turn_tokens = 0
+
+    def add_turn(self, question: str, answer: str):
+        """Record a finished turn and start folding older turns if the budget is exceeded"""
+        tokens = count_tokens(question) + count_tokens(answer)
+        self.turns.append((question, answer, tokens))
+        self.turn_tokens += tokens
+        if self.total_tokens > self.token_budget and len(self.turns) > self.keep_last_turns \
+                and (self._compaction is None or self._compaction.done()):
+            self._compaction = asyncio.create_task(self._compact())
+
+    async def messages(self) -> List[BaseMessage]:
+        """Messages to send before the next question, waiting for a running compaction"""
+        if self._compaction is not None:
+            await self._compaction
+            self._compaction = None
+        system_prompt = self.system_prompt
+        if self.summary:
+            system_prompt += SUMMARY_HEADER + self.summary
+        messages = [SystemMessage(content=system_prompt)]
+        for question, answer, _ in self.turns:
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=answer))
+        return messages
+
+    async def _compact(self):
+        # Turns added while the summary is written are kept, only the folded prefix is removed
+        fold_count = len(self.turns) - self.keep_last_turns
+        if fold_count <= 0:
+            return
+        folded = self.turns[:fold_count]
+        summary = await self._summarize(folded)
+        self.turns = self.turns[fold_count:]
+        self.turn_tokens -= sum(tokens for _, _, tokens in folded)
+        self.summary = summary
+        self.summary_tokens = count_tokens(summary)
+
+    async def _summarize(self, turns: List[Tuple[str, str, int]]) -> str:
+        transcript = "\n\n".join(f"Người dùng: {question}\nTrợ lý: {answer}" for question, answer, _ in turns)
+        if self.llm is not None:
+            try:
+                with tracer.span("llm.summary", turns=len(turns), transcript_chars=len(transcript)):
+                    response = await self.llm.ainvoke([
+                        SystemMessage(content=SUMMARY_PROMPT.format(max_words=self.summary_max_tokens // 2)),
+                        HumanMessage(content=f"Tóm tắt hiện có:\n{self.summary or '(chưa có)'}\n\nCác lượt mới:\n{transcript}")
+                    ])
+                return message_text(response).strip()
+            except Exception as e:
+                print(f"Error summarizing conversation, truncating instead: {e}")
+        return self._truncated_summary(turns)
+
+    def _truncated_summary(self, turns: List[Tuple[str, str, int]]) -> str:
+        """Fallback summary: the start of every folded turn, keeping the most recent within the limit"""
+        lines = self.summary.splitlines() if self.summary else []
+        for question, answer, _ in turns:
+            lines.append(f"- Người dùng: {question[:200]} | Trợ lý: {answer[:300]}")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
@@ -0,0 +1,357 @@
+"""Persist agent conversations to the vnstock_conversation_db schema (see vnstock_conversation_db.sql).
+
+Recording a turn only puts records on a queue: a background thread batches them every
+RECORDER_FLUSH_SECONDS and writes them to MYSQL_CONVERSATION_DB, so persistence adds no latency
+to the turn. Each batch is first appended to a JSONL spool file, which is truncated once the
+batch is committed. If MySQL is unreachable the pending records stay in the spool (only the
+latest snapshot of each conversation) and are retried with backoff; after a crash the spool is
+replayed on the next start. At most the records of the last
+flush interval can be lost, and while MySQL is down at most RECORDER_MAX_PENDING records are
+kept, the oldest messages being dropped first. Writes are idempotent (conversation rows are upserted from
+full snapshots, messages carry a message_id generated when they are recorded, unique in
+tool_calling_messages), so a replay after a crash between commit and truncation does not
+duplicate anything, while two identical questions asked in the same second are both kept.
+
+The message_id column is added by vnstock_conversation_db_message_id.sql; without it the recorder
+disables itself on its first write and leaves the spool for a replay once the migration has run.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import uuid
+import mysql.connector
+from mysql.connector import Error
+from datetime import datetime
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, SystemMessage
+from typing import List, Optional
+load_dotenv()
+
+RECORDER_FLUSH_SECONDS = float(os.getenv('RECORDER_FLUSH_SECONDS', 1))
+RECORDER_BATCH_SIZE = int(os.getenv('RECORDER_BATCH_SIZE', 200))
+RECORDER_SPOOL_PATH = os.getenv('RECORDER_SPOOL_PATH', 'conversation_spool.jsonl')
+RECORDER_MAX_PENDING = int(os.getenv('RECORDER_MAX_PENDING', 10000))
+RECORDER_MAX_BACKOFF_SECONDS = 30
+
+UPSERT_CONVERSATION_QUERY = """
+    INSERT INTO tool_calling_conversations
+        (conversation_id, llm_model, system_prompt, start_time, end_time, total_runtime_seconds, verbose_messages)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        end_time = VALUES(end_time),
+        total_runtime_seconds = VALUES(total_runtime_seconds),
+        verbose_messages = VALUES(verbose_messages)
+"""
+
+MESSAGE_ID_COLUMN_QUERY = """
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'tool_calling_messages' AND column_name = 'message_id'
+"""
+
+# A message already written keeps its row; unlike INSERT IGNORE, other errors are not hidden
+INSERT_MESSAGE_QUERY = """
+    INSERT INTO tool_calling_messages (message_id, conversation_id, question, answer, runtime_seconds, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE message_id = message_id
+"""
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else None
+
+class ConversationLog:
+    """Producer side of one conversation: accumulates its verbose messages and runtime"""
+    def __init__(self, recorder: "ConversationRecorder", llm_model: str, system_prompt: str,
+                 conversation_id: Optional[str] = None):
+        self.recorder = recorder
+        self.conversation_id = conversation_id or str(uuid.uuid4())
+        self.llm_model = llm_model
+        self.system_prompt = system_prompt
+        self.start_time = datetime.now()
+        self.end_time = None
+        self.total_runtime_seconds = 0.0
+        # Same format as the existing rows: str() of the message list
+        self.verbose_messages: List[str] = [repr(SystemMessage(content=system_prompt))]
+        self.recorder.enqueue(self._snapshot())
+
+    def _snapshot(self) -> dict:
+        return {
+            "kind": "conversation",
+            "conversation_id": self.conversation_id,
+            "llm_model": self.llm_model,
+            "system_prompt": self.system_prompt,
+            "start_time": _timestamp(self.start_time),
+            "end_time": _timestamp(self.end_time),
+            "total_runtime_seconds": round(self.total_runtime_seconds, 2),
+            "verbose_messages": "[" + ", ".join(self.verbose_messages) + "]"
+        }
+
+    def record_turn(self, question: str, answer: str, runtime_seconds: float, messages: List[BaseMessage]):
+        """Record a finished turn, without blocking.
+        Args:
+            question (str): User message
+            answer (str): Final answer
+            runtime_seconds (float): Time taken by the turn
+            messages (list[BaseMessage]): Every message of the turn, tool calls and results included
+        """
+        self.end_time = datetime.now()
+        self.total_runtime_seconds += runtime_seconds
+        self.verbose_messages.extend(repr(message) for message in messages)
+        self.recorder.enqueue(self._snapshot())
+        self.recorder.enqueue({
+            "kind": "message",
+            "message_id": str(uuid.uuid4()),
+            "conversation_id": self.conversation_id,
+            "question": question,
+            "answer": answer,
+            "runtime_seconds": round(runtime_seconds, 2),
+            "created_at": _timestamp(self.end_time)
+        })
+
+class ConversationRecorder:
+    """Background batched writer of conversation records, shared by all agents of a process"""
+    def __init__(self,
+                 database: Optional[str] = None,
+                 spool_path: str = RECORDER_SPOOL_PATH,
+                 flush_interval: float = RECORDER_FLUSH_SECONDS,
+                 batch_size: int = RECORDER_BATCH_SIZE,
+                 max_pending: int = RECORDER_MAX_PENDING):
+        """
+        Args:
+            database (str): Conversation database, MYSQL_CONVERSATION_DB by default
+            spool_path (str): JSONL file holding the records not yet committed
+            flush_interval (float): Seconds between batches
+            batch_size (int): Maximum records taken from the queue per batch
+            max_pending (int): Maximum records queued or waiting for MySQL
+        """
+        self.database = database or os.getenv('MYSQL_CONVERSATION_DB')
+        self.spool_path = spool_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.connection = None
+        self._schema_checked = False
+        self.disabled = False
+        self._pending: List[dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def start(self):
+        """Replay the spool left by a previous run and start the writer thread"""
+        if self._thread is not None or self.disabled:
+            return
+        self._pending = self._trim(self._read_spool())
+        if self._pending:
+            print(f"Replaying {len(self._pending)} conversation records from {self.spool_path}")
+        self._thread = threading.Thread(target=self._run, name="conversation-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def start_conversation(self, llm_model: str, system_prompt: str, conversation_id: Optional[str] = None) -> ConversationLog:
+        return ConversationLog(self, llm_model, system_prompt, conversation_id)
+
+    def enqueue(self, record: dict):
+        if self.disabled:
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 10):
+        """Write what is queued and stop the writer thread; unwritten records stay in the spool"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._disconnect()
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            stopping = self._stop.wait(backoff)
+            batch = self._drain_queue()
+            if batch:
+                self._append_spool(batch)
+                self._pending.extend(batch)
+            if self._pending:
+                if self._write(self._pending):
+                    self.written += len(self._pending)
+                    self._pending = []
+                    self._truncate_spool()
+                    backoff = self.flush_interval
+                else:
+                    # Keep the spool as small as the pending records while MySQL is down
+                    self.failures += 1
+                    self._pending = self._trim(self._coalesce(self._pending))
+                    self._rewrite_spool(self._pending)
+                    if self.disabled:
+                        return
+                    backoff = min(backoff * 2, RECORDER_MAX_BACKOFF_SECONDS)
+            if stopping:
+                if self.queue.empty():
+                    return
+                backoff = 0
+
+    def _drain_queue(self) -> List[dict]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _coalesce(records: List[dict]) -> List[dict]:
+        """Keep only the latest snapshot of each conversation, messages in order"""
+        latest = {}
+        for index, record in enumerate(records):
+            if record["kind"] == "conversation":
+                latest[record["conversation_id"]] = index
+        return [record for index, record in enumerate(records)
+                if record["kind"] != "conversation" or latest[record["conversation_id"]] == index]
+
+    def _trim(self, records: List[dict]) -> List[dict]:
+        """Drop the oldest messages beyond max_pending; conversation snapshots are kept"""
+        excess = len(records) - self.max_pending
+        if excess <= 0:
+            return records
+        dropped = set()
+        for index, record in enumerate(records):
+            if len(dropped) == excess:
+                break
+            if record["kind"] == "message":
+                dropped.add(index)
+        self.dropped += len(dropped)
+        print(f"Conversation recorder over {self.max_pending} pending records, dropped the {len(dropped)} oldest messages")
+        return [record for index, record in enumerate(records) if index not in dropped]
+
+    def _connect(self) -> bool:
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(
+                    host=os.getenv('MYSQL_HOST'),
+                    user=os.getenv('MYSQL_USER'),
+                    password=os.getenv('MYSQL_PASSWORD'),
+                    database=self.database,
+                    port=int(os.getenv('MYSQL_PORT', 3306))
+                )
+            return True
+        except Error as e:
+            print(f"Error connecting to conversation database: {e}")
+            self.connection = None
+            return False
+
+    def _disconnect(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Error:
+                pass
+            self.connection = None
+
+    @staticmethod
+    def _message_id(record: dict) -> str:
+        # Spooled by a version without message ids: derive one from the old deduplication key
+        return record.get("message_id") or str(uuid.uuid5(
+            uuid.NAMESPACE_URL, f"{record['conversation_id']}|{record['created_at']}|{record['question']}"))
+
+    def _check_schema(self, cursor) -> bool:
+        """Whether tool_calling_messages has the message_id column; disable the recorder if not"""
+        cursor.execute(MESSAGE_ID_COLUMN_QUERY)
+        if cursor.fetchone()[0] == 0:
+            print(f"Conversation recorder disabled: tool_calling_messages in {self.database} has no message_id column, "
+                  f"run vnstock_conversation_db_message_id.sql; unsaved records stay in {self.spool_path}")
+            self.disabled = True
+            return False
+        self._schema_checked = True
+        return True
+
+    def _write(self, records: List[dict]) -> bool:
+        records = self._coalesce(records)
+        conversations = [
+            (r["conversation_id"], r["llm_model"], r["system_prompt"], r["start_time"], r["end_time"],
+             r["total_runtime_seconds"], r["verbose_messages"])
+            for r in records if r["kind"] == "conversation"
+        ]
+        messages = [
+            (self._message_id(r), r["conversation_id"], r["question"], r["answer"], r["runtime_seconds"], r["created_at"])
+            for r in records if r["kind"] == "message"
+        ]
+        if not self._connect():
+            return False
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            if not self._schema_checked and not self._check_schema(cursor):
+                return False
+            # Conversations first, messages reference them
+            if conversations:
+                cursor.executemany(UPSERT_CONVERSATION_QUERY, conversations)
+            if messages:
+                cursor.executemany(INSERT_MESSAGE_QUERY, messages)
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error writing conversation records: {e}")
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            self._disconnect()
+            return False
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Error:
+                    pass
+
+    def _read_spool(self) -> List[dict]:
+        if not os.path.exists(self.spool_path):
+            return []
+        records = []
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short by a crash
+                    continue
+        return self._coalesce(records)
+
+    def _append_spool(self, records: List[dict]):
+        try:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"Error writing conversation spool: {e}")
+
+    def _rewrite_spool(self, records: List[dict]):
+        temp_path = self.spool_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.spool_path)
+        except OSError as e:
+            print(f"Error writing conversation spool: {e}")
+
+    def _truncate_spool(self):
+        try:
+            if os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+        except OSError as e:
+            print(f"Error truncating conversation spool: {e}")
@@ -1,45 +1,419 @@
+import argparse
 import pandas as pd
 import os
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 import decimal
+import json
+import threading
+import time
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime
+from ranking import METRIC_NAMES, rank_companies, score_companies
+from tracing import traced
 load_dotenv()
 
+MYSQL_POOL_NAME = "fin_bot_pool"
+MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 5))
+# Seconds to wait for a free pooled connection before giving up
+MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 10))
+
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+# One slot per pooled connection: borrowers wait on it instead of polling the pool
+_connection_slots = threading.BoundedSemaphore(MYSQL_POOL_SIZE)
+
+def get_connection_pool() -> pooling.MySQLConnectionPool:
+    """Get the process-wide MySQL connection pool, creating it on first use.
+    Returns:
+        MySQLConnectionPool: Shared pool of MYSQL_POOL_SIZE connections
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = pooling.MySQLConnectionPool(
+                    pool_name=MYSQL_POOL_NAME,
+                    pool_size=MYSQL_POOL_SIZE,
+                    pool_reset_session=True,
+                    host=os.getenv('MYSQL_HOST'),
+                    user=os.getenv('MYSQL_USER'),
+                    password=os.getenv('MYSQL_PASSWORD'),
+                    database=os.getenv('MYSQL_DB'),
+                    port=int(os.getenv('MYSQL_PORT', 3306))
+                )
+    return _connection_pool
+
+def get_pooled_connection(timeout: float = MYSQL_POOL_TIMEOUT):
+    """Borrow a healthy connection from the shared pool.
+    Waits up to `timeout` seconds for a free slot when every pooled connection is in use,
+    woken as soon as one is released, and pings the connection on checkout so a stale one
+    is reconnected before use.
+    Args:
+        timeout (float): Maximum seconds to wait for a free connection
+    Returns:
+        PooledMySQLConnection: Connection to give back with release_pooled_connection()
+    """
+    if not _connection_slots.acquire(timeout=timeout):
+        raise PoolError(msg=f"No pooled MySQL connection free after {timeout:g}s")
+    try:
+        connection = get_connection_pool().get_connection()
+    except Exception:
+        _connection_slots.release()
+        raise
+    try:
+        # Health check: reconnect if the server dropped the idle connection
+        connection.ping(reconnect=True, attempts=2, delay=0)
+    except Error:
+        release_pooled_connection(connection)
+        raise
+    return connection
+
+def release_pooled_connection(connection):
+    """Return a connection from get_pooled_connection() to the pool and wake one waiting borrower"""
+    try:
+        connection.close()
+    finally:
+        _connection_slots.release()
+
+# Rows per executemany call / commit when loading CSV data
+INGEST_BATCH_SIZE = int(os.getenv('MYSQL_INGEST_BATCH_SIZE', 1000))
+
+# Mapping of combined_financial_data.csv columns -> financial_data columns
+FINANCIAL_DATA_CSV_COLUMNS = {
+    'symbol': 'symbol',
+    'yearReport': 'year_report',
+    # Balance Sheet
+    'Cash and cash equivalents (Bn. VND)': 'cash_and_equivalents_billion_vnd',
+    'Fixed assets (Bn. VND)': 'fixed_assets_billion_vnd',
+    'TOTAL ASSETS (Bn. VND)': 'total_assets_billion_vnd',
+    'LIABILITIES (Bn. VND)': 'total_liabilities_billion_vnd',
+    "OWNER'S EQUITY (Bn. VND)": 'owner_equity_billion_vnd',
+    'Undistributed earnings (Bn. VND)': 'undistributed_earnings_billion_vnd',
+    # Income Statement
+    'Revenue (Bn. VND)': 'revenue_billion_vnd',
+    'Revenue YoY (%)': 'revenue_growth_percent',
+    'Profit before tax': 'profit_before_tax_billion_vnd',
+    'Net Profit For the Year': 'net_profit_billion_vnd',
+    'Attribute to parent company YoY (%)': 'parent_company_growth_percent',
+    # Cash Flow
+    'Cash and Cash Equivalents at the end of period': 'cash_end_period_billion_vnd',
+    'Net cash inflows/outflows from operating activities': 'cash_from_operations_billion_vnd',
+    'Net Cash Flows from Investing Activities': 'cash_from_investments_billion_vnd',
+    # Financial Ratios
+    'EPS (VND)': 'earnings_per_share_vnd',
+    'P/E': 'price_to_earnings',
+    'P/B': 'price_to_book',
+    'ROE (%)': 'return_on_equity_percent',
+    'ROA (%)': 'return_on_assets_percent',
+    'Net Profit Margin (%)': 'net_profit_margin_percent',
+    'Dividend yield (%)': 'dividend_yield_percent',
+    # Stock Price
+    'yearly_stock_close_price': 'yearly_close_price_vnd',
+    'yearly_stock_volume': 'yearly_volume',
+}
+FINANCIAL_DATA_COLUMNS = list(FINANCIAL_DATA_CSV_COLUMNS.values())
+
+def dataframe_to_rows(df: pd.DataFrame) -> List[tuple]:
+    """Convert a DataFrame to a list of row tuples with NaN turned into None for MySQL.
+    Args:
+        df (pd.DataFrame): Data to convert, columns already in insert order
+    Returns:
+        list[tuple]: Rows of plain Python values
+    """
+    # Casting to object first makes numpy scalars plain Python values and lets NaN become None
+    values = df.astype(object).where(df.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+def prepare_financial_frame(financial_df: pd.DataFrame) -> pd.DataFrame:
+    """Map combined_financial_data.csv columns to financial_data columns.
+    Columns missing from the CSV are filled with NaN.
+    Args:
+        financial_df (pd.DataFrame): Raw CSV data
+    Returns:
+        pd.DataFrame: Data with FINANCIAL_DATA_COLUMNS, in table order
+    """
+    return financial_df.reindex(columns=list(FINANCIAL_DATA_CSV_COLUMNS)).rename(columns=FINANCIAL_DATA_CSV_COLUMNS)
+
+def prepare_financial_rows(financial_df: pd.DataFrame) -> List[tuple]:
+    """Map combined_financial_data.csv to financial_data insert rows in one vectorized pass.
+    Args:
+        financial_df (pd.DataFrame): Raw CSV data
+    Returns:
+        list[tuple]: Rows ordered as FINANCIAL_DATA_COLUMNS, NaN as None
+    """
+    return dataframe_to_rows(prepare_financial_frame(financial_df))
+
+FINANCIAL_DATA_KEY = ['symbol', 'year_report']
+FINANCIAL_DATA_VALUE_COLUMNS = [c for c in FINANCIAL_DATA_COLUMNS if c not in FINANCIAL_DATA_KEY]
+# Decimal places stored by MySQL for each value column (DECIMAL(x,2) unless listed)
+FINANCIAL_DATA_SCALE = {'yearly_volume': 0}
+
+# financial_data columns by statement, used to project only what a question needs
+FINANCIAL_COLUMN_GROUPS = {
+    'balance_sheet': [
+        'cash_and_equivalents_billion_vnd', 'fixed_assets_billion_vnd', 'total_assets_billion_vnd',
+        'total_liabilities_billion_vnd', 'owner_equity_billion_vnd', 'undistributed_earnings_billion_vnd'
+    ],
+    'income_statement': [
+        'revenue_billion_vnd', 'revenue_growth_percent', 'profit_before_tax_billion_vnd',
+        'net_profit_billion_vnd', 'parent_company_growth_percent'
+    ],
+    'cash_flow': [
+        'cash_end_period_billion_vnd', 'cash_from_operations_billion_vnd', 'cash_from_investments_billion_vnd'
+    ],
+    'ratios': [
+        'earnings_per_share_vnd', 'price_to_earnings', 'price_to_book', 'return_on_equity_percent',
+        'return_on_assets_percent', 'net_profit_margin_percent', 'dividend_yield_percent'
+    ],
+    'price': ['yearly_close_price_vnd', 'yearly_volume'],
+}
+
+def resolve_financial_columns(column_groups: Optional[List[str]] = None) -> List[str]:
+    """Expand column group names (or single financial_data column names) into value columns.
+    Args:
+        column_groups (list[str]): Keys of FINANCIAL_COLUMN_GROUPS or column names, None for all columns
+    Returns:
+        list[str]: Value columns in table order
+    Raises:
+        ValueError: If a name is neither a group nor a financial_data column
+    """
+    if not column_groups:
+        return list(FINANCIAL_DATA_VALUE_COLUMNS)
+    selected = set()
+    for name in column_groups:
+        name = name.strip().lower()
+        if name in FINANCIAL_COLUMN_GROUPS:
+            selected.update(FINANCIAL_COLUMN_GROUPS[name])
+        elif name in FINANCIAL_DATA_VALUE_COLUMNS:
+            selected.add(name)
+        else:
+            raise ValueError(f"Unknown column group '{name}', valid groups: {', '.join(FINANCIAL_COLUMN_GROUPS)}")
+    return [column for column in FINANCIAL_DATA_VALUE_COLUMNS if column in selected]
+
+def build_financial_data_query(symbols: List[str], columns: List[str], year: Optional[List[int]] = None,
+                               year_from: Optional[int] = None, year_to: Optional[int] = None) -> Tuple[str, list]:
+    """Build a parameterized SELECT of the given columns of financial_data.
+    Args:
+        symbols (list[str]): Symbols to fetch
+        columns (list[str]): Value columns, from resolve_financial_columns
+        year (list[int]): Exact years to fetch, None for all years
+        year_from (int): First year to fetch (inclusive)
+        year_to (int): Last year to fetch (inclusive)
+    Returns:
+        tuple: (query with %s placeholders, params)
+    Raises:
+        ValueError: If symbols is empty, before any SQL is built
+    """
+    if not symbols:
+        raise ValueError("No symbol given, pass at least one symbol")
+    query = f"""
+        SELECT symbol, year_report, {', '.join(columns)} FROM financial_data
+        WHERE symbol IN ({', '.join(['%s'] * len(symbols))})
+    """
+    params = list(symbols)
+    if year:
+        query += f" AND year_report IN ({', '.join(['%s'] * len(year))})"
+        params += [int(y) for y in year]
+    if year_from is not None:
+        query += " AND year_report >= %s"
+        params.append(int(year_from))
+    if year_to is not None:
+        query += " AND year_report <= %s"
+        params.append(int(year_to))
+    query += " ORDER BY symbol, year_report"
+    return query, params
+
+def to_compact_csv(df: pd.DataFrame, drop_columns: Optional[List[str]] = None) -> str:
+    """Serialize tabular data as compact CSV for the LLM context.
+    All-null columns are dropped and numbers are written with at most 2 decimals and no
+    trailing zeros (e.g. 1234.50 -> 1234.5, 15.00 -> 15).
+    Args:
+        df (pd.DataFrame): Data to serialize
+        drop_columns (list[str]): Columns to leave out, e.g. a symbol already known to the caller
+    Returns:
+        str: CSV text without index
+    """
+    df = df.drop(columns=drop_columns or [], errors='ignore').dropna(axis=1, how='all')
+    # DECIMAL columns arrive as Decimal objects
+    numeric = {column: float for column in df.columns if df[column].map(lambda v: isinstance(v, decimal.Decimal)).any()}
+    df = df.astype(numeric)
+    return df.to_csv(index=False, float_format=lambda x: f"{x:.2f}".rstrip('0').rstrip('.'))
+
+def pivot_financial_data(df: pd.DataFrame, symbols: List[str], columns: List[str]) -> pd.DataFrame:
+    """Pivot long financial_data rows into a comparison table.
+    Args:
+        df (pd.DataFrame): Rows with symbol, year_report and the value columns
+        symbols (list[str]): Symbols in the order of the output columns
+        columns (list[str]): Value columns in the order of the output rows
+    Returns:
+        pd.DataFrame: Index (metric, year_report), one float column per symbol found; all-null rows dropped
+    """
+    long = df.melt(id_vars=['symbol', 'year_report'], value_vars=columns, var_name='metric')
+    long['value'] = long['value'].astype(float)
+    long['metric'] = pd.Categorical(long['metric'], categories=columns, ordered=True)
+    table = long.pivot(index=['metric', 'year_report'], columns='symbol', values='value')
+    table = table[[symbol for symbol in symbols if symbol in table.columns]]
+    table.columns.name = None
+    return table.dropna(how='all')
+
+def diff_financial_frames(incoming: pd.DataFrame, stored: pd.DataFrame) -> Tuple[pd.DataFrame, List[tuple]]:
+    """Find incoming financial_data rows that are new or differ from the stored ones.
+    Rows are matched on the unique_record key (symbol, year_report). A value counts as
+    unchanged when it equals the stored one after MySQL rounding to the column scale.
+    Args:
+        incoming (pd.DataFrame): Rows with FINANCIAL_DATA_COLUMNS, e.g. from prepare_financial_frame
+        stored (pd.DataFrame): Rows currently in financial_data, same columns
+    Returns:
+        tuple: (changed rows with FINANCIAL_DATA_COLUMNS,
+                change log entries as (symbol, year_report, change_type, changed_columns))
+    """
+    incoming = incoming.drop_duplicates(subset=FINANCIAL_DATA_KEY, keep='first').reset_index(drop=True)
+    incoming[FINANCIAL_DATA_VALUE_COLUMNS] = incoming[FINANCIAL_DATA_VALUE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    stored = stored[FINANCIAL_DATA_COLUMNS].copy()
+    stored[FINANCIAL_DATA_VALUE_COLUMNS] = stored[FINANCIAL_DATA_VALUE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+
+    merged = incoming.merge(stored, on=FINANCIAL_DATA_KEY, how='left', suffixes=('', '_stored'), indicator=True)
+    is_new = (merged['_merge'] == 'left_only').to_numpy()
+
+    # One boolean column per value column: True where incoming differs from stored
+    differs = np.zeros((len(merged), len(FINANCIAL_DATA_VALUE_COLUMNS)), dtype=bool)
+    for i, column in enumerate(FINANCIAL_DATA_VALUE_COLUMNS):
+        new_values = merged[column].to_numpy(dtype=float)
+        old_values = merged[f"{column}_stored"].to_numpy(dtype=float)
+        tolerance = 0.5 * 10 ** -FINANCIAL_DATA_SCALE.get(column, 2) + 1e-9
+        same = np.isclose(new_values, old_values, rtol=0, atol=tolerance) | (np.isnan(new_values) & np.isnan(old_values))
+        differs[:, i] = ~same
+    is_updated = ~is_new & differs.any(axis=1)
+
+    column_names = np.array(FINANCIAL_DATA_VALUE_COLUMNS)
+    change_log = []
+    for i in np.flatnonzero(is_new | is_updated):
+        change_type = 'insert' if is_new[i] else 'update'
+        changed_columns = column_names[differs[i]].tolist() if is_updated[i] else []
+        change_log.append((merged.at[i, 'symbol'], int(merged.at[i, 'year_report']), change_type, changed_columns))
+
+    return incoming.loc[is_new | is_updated, FINANCIAL_DATA_COLUMNS], change_log
+
+# Latest-year scoring metrics per symbol. The correlated MAX() is resolved on the
+# unique_record (symbol, year_report) key of financial_data
+LATEST_METRICS_QUERY = """
+    SELECT f.symbol, f.return_on_equity_percent, f.net_profit_margin_percent,
+        f.revenue_growth_percent, f.total_liabilities_billion_vnd, f.owner_equity_billion_vnd,
+        f.yearly_close_price_vnd, f.yearly_volume, f.year_report, l.industry_code_lv2
+    FROM vn100_listing_by_industry l
+    INNER JOIN financial_data f ON f.symbol = l.symbol
+    WHERE f.year_report = (
+        SELECT MAX(f2.year_report) FROM financial_data f2 WHERE f2.symbol = l.symbol
+    )
+"""
+LATEST_METRICS_BY_INDUSTRY_QUERY = LATEST_METRICS_QUERY + """
+    AND l.industry_code_lv2 = %s
+"""
+LATEST_METRICS_ALL_INDUSTRIES_QUERY = LATEST_METRICS_QUERY + """
+    AND l.industry_code_lv2 IS NOT NULL
+    ORDER BY f.symbol
+"""
+
+# Secondary indexes added by Database.migrate_indexes: (table, index name, columns)
+SCHEMA_INDEXES = [
+    ('vn100_listing_by_industry', 'idx_industry_code_lv2', '(industry_code_lv2)'),
+]
+
+# Top-N symbols of an industry from the precomputed scoreboard, on idx_industry_rank
+SCOREBOARD_QUERY = """
+    SELECT symbol FROM industry_scores
+    WHERE industry_code_lv2 = %s
+    ORDER BY industry_rank
+    LIMIT %s
+"""
+
+INDUSTRY_SCORES_COLUMNS = ['symbol', 'industry_code_lv2', 'year_report'] + METRIC_NAMES + \
+    [f"{metric}_normalized" for metric in METRIC_NAMES] + ['composite_score', 'industry_rank', 'updated_at']
+
 class Database:
     def __init__(self):
         self.connection = None
         self.cursor = None
+        self._prepared_cursor = None
         self.data_dir = "vn100_data"
     
+    def __enter__(self):
+        if not self.connect():
+            raise Error(msg="Could not get a MySQL connection from the pool")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
     def connect(self):
-        """Establish connection to MySQL database"""
+        """Borrow a connection to MySQL database from the shared pool"""
         try:
-            self.connection = mysql.connector.connect(
-                host=os.getenv('MYSQL_HOST'),
-                user=os.getenv('MYSQL_USER'),
-                password=os.getenv('MYSQL_PASSWORD'),
-                database=os.getenv('MYSQL_DB'),
-                port=int(os.getenv('MYSQL_PORT', 3306))
-            )
-            if self.connection.is_connected():
-                self.cursor = self.connection.cursor()
-                return True
+            self.connection = get_pooled_connection()
+            self.cursor = self.connection.cursor()
+            return True
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
             return False
     
+    def prepared_cursor(self):
+        """Get a cursor that runs its statements as server-side prepared statements.
+        The cursor is kept for the lifetime of the borrowed connection, so a statement
+        executed repeatedly is prepared once.
+        """
+        if self._prepared_cursor is None:
+            self._prepared_cursor = self.connection.cursor(prepared=True)
+        return self._prepared_cursor
+
     def close(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
+        """Return the connection to the pool"""
+        if self.connection:
+            if self._prepared_cursor:
+                self._prepared_cursor.close()
+                self._prepared_cursor = None
             if self.cursor:
                 self.cursor.close()
-            self.connection.close()
-            print("MySQL connection closed")
+            release_pooled_connection(self.connection)
+            self.connection = None
+            self.cursor = None
     
+    def bulk_insert(self, table: str, columns: List[str], rows: List[tuple], batch_size: int = INGEST_BATCH_SIZE,
+                    update_columns: Optional[List[str]] = None) -> int:
+        """Insert rows in chunks with executemany, committing at each batch boundary.
+        mysql.connector rewrites each chunk into a single multi-row INSERT, so a
+        chunk costs one round trip instead of one per row.
+        Args:
+            table (str): Target table name
+            columns (list[str]): Column names, in the order of each row tuple
+            rows (list[tuple]): Rows to insert, NULLs already as None
+            batch_size (int): Number of rows per executemany call and commit
+            update_columns (list[str]): If given, upsert with ON DUPLICATE KEY UPDATE of these
+                columns instead of skipping duplicates with INSERT IGNORE
+        Returns:
+            int: Number of rows sent to the server
+        """
+        if update_columns:
+            updates = ', '.join(f"{column} = VALUES({column})" for column in update_columns)
+            query = f"""
+                INSERT INTO {table} ({', '.join(columns)})
+                VALUES ({', '.join(['%s'] * len(columns))})
+                ON DUPLICATE KEY UPDATE {updates}
+            """
+        else:
+            query = f"""
+                INSERT IGNORE INTO {table} ({', '.join(columns)})
+                VALUES ({', '.join(['%s'] * len(columns))})
+            """
+        for start in range(0, len(rows), batch_size):
+            self.cursor.executemany(query, rows[start:start + batch_size])
+            self.connection.commit()
+        return len(rows)
+
     def create_vn100_listing(self):
         """Create and populate vn100_listing table"""
         try:
@@ -52,11 +426,8 @@ class Database:
             """)
             
             listing_df = pd.read_csv(os.path.join(self.data_dir, "vn100_listing.csv"))
-            for _, row in listing_df.iterrows():
-                self.cursor.execute("""
-                    INSERT IGNORE INTO vn100_listing (symbol)
-                    VALUES (%s)
-                """, (row['symbol'],))
+            self.bulk_insert("vn100_listing", ["symbol"], dataframe_to_rows(listing_df[["symbol"]]))
+            reference_cache.invalidate()
             print("Successfully created vn100_listing table")
             return True
         except Error as e:
@@ -79,20 +450,21 @@ class Database:
             """)
             
             industry_df = pd.read_csv(os.path.join(self.data_dir, "vn100_listing_by_industry.csv"))
-            for _, row in industry_df.iterrows():
-                self.cursor.execute("""
-                    INSERT IGNORE INTO vn100_listing_by_industry 
-                    (symbol, organ_name, industry_name_lv2, industry_code_lv2)
-                    VALUES (%s, %s, %s, %s)
-                """, (row['symbol'], row['organ_name'], row['industry_name_lv2'], row['industry_code_lv2']))
+            industry_columns = ["symbol", "organ_name", "industry_name_lv2", "industry_code_lv2"]
+            self.bulk_insert("vn100_listing_by_industry", industry_columns, dataframe_to_rows(industry_df[industry_columns]))
+            reference_cache.invalidate()
             print("Successfully created vn100_listing_by_industry table")
             return True
         except Error as e:
             print(f"Error creating vn100_listing_by_industry table: {e}")
             return False
     
-    def create_financial_data(self):
-        """Create and populate financial_data table"""
+    def create_financial_data(self, incremental: bool = False):
+        """Create and populate financial_data table
+        Args:
+            incremental (bool): Sync only new/changed rows with sync_financial_data instead of
+                INSERT IGNORE over the whole CSV
+        """
         try:
             self.cursor.execute("""
                 CREATE TABLE IF NOT EXISTS financial_data (
@@ -139,63 +511,83 @@ class Database:
             """)
             
             financial_df = pd.read_csv(os.path.join(self.data_dir, "combined_financial_data.csv"))
-            for _, row in financial_df.iterrows():
-                # Convert NaN to None for MySQL
-                values = [
-                    row['symbol'], 
-                    row['yearReport'],
-                    None if pd.isna(row.get('Cash and cash equivalents (Bn. VND)')) else row.get('Cash and cash equivalents (Bn. VND)'),
-                    None if pd.isna(row.get('Fixed assets (Bn. VND)')) else row.get('Fixed assets (Bn. VND)'),
-                    None if pd.isna(row.get('TOTAL ASSETS (Bn. VND)')) else row.get('TOTAL ASSETS (Bn. VND)'),
-                    None if pd.isna(row.get('LIABILITIES (Bn. VND)')) else row.get('LIABILITIES (Bn. VND)'),
-                    None if pd.isna(row.get("OWNER'S EQUITY (Bn. VND)")) else row.get("OWNER'S EQUITY (Bn. VND)"),
-                    None if pd.isna(row.get('Undistributed earnings (Bn. VND)')) else row.get('Undistributed earnings (Bn. VND)'),
-                    None if pd.isna(row.get('Revenue (Bn. VND)')) else row.get('Revenue (Bn. VND)'),
-                    None if pd.isna(row.get('Revenue YoY (%)')) else row.get('Revenue YoY (%)'),
-                    None if pd.isna(row.get('Profit before tax')) else row.get('Profit before tax'),
-                    None if pd.isna(row.get('Net Profit For the Year')) else row.get('Net Profit For the Year'),
-                    None if pd.isna(row.get('Attribute to parent company YoY (%)')) else row.get('Attribute to parent company YoY (%)'),
-                    None if pd.isna(row.get('Cash and Cash Equivalents at the end of period')) else row.get('Cash and Cash Equivalents at the end of period'),
-                    None if pd.isna(row.get('Net cash inflows/outflows from operating activities')) else row.get('Net cash inflows/outflows from operating activities'),
-                    None if pd.isna(row.get('Net Cash Flows from Investing Activities')) else row.get('Net Cash Flows from Investing Activities'),
-                    None if pd.isna(row.get('EPS (VND)')) else row.get('EPS (VND)'),
-                    None if pd.isna(row.get('P/E')) else row.get('P/E'),
-                    None if pd.isna(row.get('P/B')) else row.get('P/B'),
-                    None if pd.isna(row.get('ROE (%)')) else row.get('ROE (%)'),
-                    None if pd.isna(row.get('ROA (%)')) else row.get('ROA (%)'),
-                    None if pd.isna(row.get('Net Profit Margin (%)')) else row.get('Net Profit Margin (%)'),
-                    None if pd.isna(row.get('Dividend yield (%)')) else row.get('Dividend yield (%)'),
-                    None if pd.isna(row.get('yearly_stock_close_price')) else row.get('yearly_stock_close_price'),
-                    None if pd.isna(row.get('yearly_stock_volume')) else row.get('yearly_stock_volume')
-                ]
-                
-                self.cursor.execute("""
-                    INSERT IGNORE INTO financial_data (
-                        symbol, year_report,
-                        cash_and_equivalents_billion_vnd, fixed_assets_billion_vnd, total_assets_billion_vnd,
-                        total_liabilities_billion_vnd, owner_equity_billion_vnd, undistributed_earnings_billion_vnd,
-                        revenue_billion_vnd, revenue_growth_percent, profit_before_tax_billion_vnd, net_profit_billion_vnd,
-                        parent_company_growth_percent, cash_end_period_billion_vnd, cash_from_operations_billion_vnd,
-                        cash_from_investments_billion_vnd, earnings_per_share_vnd, price_to_earnings, price_to_book,
-                        return_on_equity_percent, return_on_assets_percent, net_profit_margin_percent,
-                        dividend_yield_percent, yearly_close_price_vnd, yearly_volume
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, values)
+            if incremental:
+                self.sync_financial_data(financial_df)
+            else:
+                self.bulk_insert("financial_data", FINANCIAL_DATA_COLUMNS, prepare_financial_rows(financial_df))
             print("Successfully created financial_data table")
             return True
         except Error as e:
             print(f"Error creating financial_data table: {e}")
             return False
+
+    def create_financial_data_changes(self):
+        """Create financial_data_changes table, the change log written by sync_financial_data"""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS financial_data_changes (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                symbol VARCHAR(10) NOT NULL,
+                year_report INT NOT NULL,
+                change_type VARCHAR(10) NOT NULL,
+                changed_columns TEXT,
+                synced_at DATETIME NOT NULL,
+                KEY idx_symbol_year (symbol, year_report),
+                KEY idx_synced_at (synced_at)
+            )
+        """)
+
+    def sync_financial_data(self, financial_df: pd.DataFrame, batch_size: int = INGEST_BATCH_SIZE) -> Dict[str, int]:
+        """Incrementally sync financial_data with the given CSV data.
+        Incoming rows are diffed against the stored ones on (symbol, year_report); only
+        new or changed rows are sent, as INSERT ... ON DUPLICATE KEY UPDATE batches,
+        and each of them is recorded in financial_data_changes.
+        Args:
+            financial_df (pd.DataFrame): Raw combined_financial_data.csv data
+            batch_size (int): Number of rows per executemany call and commit
+        Returns:
+            dict: Counts of inserted, updated and unchanged rows
+        """
+        self.create_financial_data_changes()
+        incoming = prepare_financial_frame(financial_df)
+
+        self.cursor.execute(f"SELECT {', '.join(FINANCIAL_DATA_COLUMNS)} FROM financial_data")
+        stored = pd.DataFrame(self.cursor.fetchall(), columns=FINANCIAL_DATA_COLUMNS)
+
+        changed, change_log = diff_financial_frames(incoming, stored)
+        self.bulk_insert("financial_data", FINANCIAL_DATA_COLUMNS, dataframe_to_rows(changed), batch_size,
+                         update_columns=FINANCIAL_DATA_VALUE_COLUMNS)
+
+        synced_at = datetime.now()
+        log_rows = [(symbol, year_report, change_type, json.dumps(columns), synced_at)
+                    for symbol, year_report, change_type, columns in change_log]
+        self.bulk_insert("financial_data_changes",
+                         ["symbol", "year_report", "change_type", "changed_columns", "synced_at"],
+                         log_rows, batch_size)
+
+        inserted = sum(1 for entry in change_log if entry[2] == 'insert')
+        summary = {
+            "inserted": inserted,
+            "updated": len(change_log) - inserted,
+            "unchanged": len(incoming.drop_duplicates(subset=FINANCIAL_DATA_KEY)) - len(change_log),
+        }
+        print(f"Synced financial_data: {summary}")
+        return summary
     
-    def create_tables(self):
-        """Create all database tables"""
+    def create_tables(self, incremental: bool = False):
+        """Create all database tables
+        Args:
+            incremental (bool): Sync financial_data incrementally instead of a full INSERT IGNORE reload
+        """
         if not self.connect():
             return
         
         try:
             if self.create_vn100_listing():
                 if self.create_vn100_listing_by_industry():
-                    self.create_financial_data()
+                    if self.create_financial_data(incremental):
+                        self.migrate_indexes()
+                        self.rebuild_industry_scores()
+                        self.record_ingestion_run("incremental" if incremental else "full")
             
             self.connection.commit()
             print("Database creation completed")
@@ -206,6 +598,164 @@ class Database:
         finally:
             self.close()
     
+    def create_ingestion_runs(self):
+        """Create ingestion_runs table, one row per completed data load"""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingestion_runs (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                run_type VARCHAR(20) NOT NULL,
+                finished_at DATETIME NOT NULL,
+                KEY idx_finished_at (finished_at)
+            )
+        """)
+
+    def record_ingestion_run(self, run_type: str) -> datetime:
+        """Record a completed data load, which becomes the new data version.
+        Args:
+            run_type (str): "full" or "incremental"
+        Returns:
+            datetime: The new data version
+        """
+        self.create_ingestion_runs()
+        finished_at = datetime.now().replace(microsecond=0)
+        self.cursor.execute("INSERT INTO ingestion_runs (run_type, finished_at) VALUES (%s, %s)", (run_type, finished_at))
+        self.connection.commit()
+        return finished_at
+
+    @traced("db.get_data_version")
+    def get_data_version(self) -> Optional[datetime]:
+        """Get the data version: the time of the latest completed data load.
+        Returns:
+            datetime: finished_at of the latest ingestion run, None if unknown
+        """
+        try:
+            self.cursor.execute("SELECT MAX(finished_at) FROM ingestion_runs")
+            return self.cursor.fetchone()[0]
+        except Error as e:
+            print(f"Error reading data version: {e}")
+            return None
+
+    def index_exists(self, table: str, index_name: str) -> bool:
+        """Whether table has an index named index_name"""
+        self.cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index_name))
+        return self.cursor.fetchone()[0] > 0
+
+    def migrate_indexes(self):
+        """Add the secondary indexes in SCHEMA_INDEXES that do not exist yet"""
+        for table, index_name, columns in SCHEMA_INDEXES:
+            if not self.index_exists(table, index_name):
+                self.cursor.execute(f"CREATE INDEX {index_name} ON {table} {columns}")
+                print(f"Created index {index_name} on {table}")
+
+    def explain(self, query: str, params: tuple = (), prepared: bool = False) -> List[dict]:
+        """Run EXPLAIN on a query.
+        Args:
+            query (str): Query to explain, with %s placeholders
+            params (tuple): Placeholder values
+            prepared (bool): Explain it as a server-side prepared statement, like prepared_cursor runs it
+        Returns:
+            list[dict]: One row per table access, keyed by EXPLAIN column name
+        """
+        cursor = self.prepared_cursor() if prepared else self.cursor
+        cursor.execute(f"EXPLAIN {query}", tuple(params))
+        columns = [i[0] for i in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def check_query_plans(self, industry_code_lv2: str = "8300", symbol: str = "VCB") -> List[str]:
+        """Check with EXPLAIN that the hot tool queries are index-backed.
+        The queries are the ones the tools run, built and executed the same way.
+        Args:
+            industry_code_lv2 (str): Sample industry code for the parameterized queries
+            symbol (str): Sample symbol for the parameterized queries
+        Returns:
+            list[str]: One message per table access that is a full table scan or uses no index, empty if none
+        """
+        checks = {
+            "latest metrics by industry": (LATEST_METRICS_BY_INDUSTRY_QUERY, (industry_code_lv2,), True),
+            "financial data by symbol": (*build_financial_data_query([symbol], resolve_financial_columns(None)), False),
+            "scoreboard top-N": (SCOREBOARD_QUERY, (industry_code_lv2, 5), False),
+        }
+        problems = []
+        for name, (query, params, prepared) in checks.items():
+            for step in self.explain(query, params, prepared):
+                if step.get('type') == 'ALL':
+                    problems.append(f"{name}: full scan of {step.get('table')} (possible keys: {step.get('possible_keys')})")
+                # A one-row system table or an optimized-away step has no type and needs no index
+                elif step.get('type') not in (None, 'system') and step.get('key') is None:
+                    problems.append(f"{name}: {step.get('type')} access of {step.get('table')} uses no index")
+        return problems
+
+    def create_industry_scores(self):
+        """Create industry_scores table, the precomputed scoreboard behind get_best_symbols_by_industry_tool"""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS industry_scores (
+                symbol VARCHAR(10) NOT NULL PRIMARY KEY,
+                industry_code_lv2 VARCHAR(20) NOT NULL,
+                year_report INT NOT NULL,
+                
+                # Latest-year metrics
+                return_on_equity_percent DOUBLE,
+                net_profit_margin_percent DOUBLE,
+                revenue_growth_percent DOUBLE,
+                debt_to_equity DOUBLE,
+                total_volume DOUBLE,
+                
+                # Normalized metrics, NULL when the metric was excluded for the industry
+                return_on_equity_percent_normalized DOUBLE,
+                net_profit_margin_percent_normalized DOUBLE,
+                revenue_growth_percent_normalized DOUBLE,
+                debt_to_equity_normalized DOUBLE,
+                total_volume_normalized DOUBLE,
+                
+                composite_score DOUBLE NOT NULL,
+                industry_rank INT NOT NULL,
+                updated_at DATETIME NOT NULL,
+                KEY idx_industry_rank (industry_code_lv2, industry_rank)
+            )
+        """)
+
+    def rebuild_industry_scores(self, missing_threshold: float = 0.5) -> int:
+        """Recompute the composite score of every symbol and replace the industry_scores snapshot.
+        Should run after each ingestion, so that best-symbol lookups are a single indexed read.
+        Args:
+            missing_threshold (float): Threshold for missing data ratio to exclude a metric (0 to 1)
+        Returns:
+            int: Number of scored symbols
+        """
+        self.create_industry_scores()
+        self.cursor.execute(LATEST_METRICS_ALL_INDUSTRIES_QUERY)
+        data = pd.DataFrame(self.cursor.fetchall(), columns=[i[0] for i in self.cursor.description])
+        ranked = rank_companies(data, 'industry_code_lv2', missing_threshold)
+        ranked = ranked.rename(columns={'rank': 'industry_rank'})
+        updated_at = datetime.now()
+        rows = [row + (updated_at,) for row in dataframe_to_rows(ranked[INDUSTRY_SCORES_COLUMNS[:-1]])]
+
+        # Replace the snapshot in one transaction, bulk_insert commits it
+        self.cursor.execute("DELETE FROM industry_scores")
+        self.bulk_insert("industry_scores", INDUSTRY_SCORES_COLUMNS, rows, batch_size=max(len(rows), 1))
+        self.connection.commit()
+        print(f"Rebuilt industry_scores for {len(ranked)} symbols")
+        return len(ranked)
+
+    @traced("db.get_scoreboard_symbols")
+    def get_scoreboard_symbols(self, industry_code_lv2: str, num_stocks: int = 5) -> List[str]:
+        """Get the best symbols of an industry from the precomputed industry_scores table.
+        Args:
+            industry_code_lv2 (str): Industry code of the industry
+            num_stocks (int): Number of stocks to return
+        Returns:
+            list[str]: List of symbols, empty if the scoreboard has not been built
+        """
+        try:
+            self.cursor.execute(SCOREBOARD_QUERY, (industry_code_lv2, num_stocks))
+            return [row[0] for row in self.cursor.fetchall()]
+        except Error as e:
+            print(f"Error reading industry_scores: {e}")
+            return []
+
     def extract_tables_schemas(self):
         """Extract schemas of all tables in the database
         Returns:
@@ -290,6 +840,7 @@ class Database:
         finally:
             self.close()
             
+    @traced("db.get_industries_list")
     def get_industries_list(self) -> list[dict]:
         """Get list of industries.
         Returns:
@@ -303,6 +854,7 @@ class Database:
         results = self.cursor.fetchall()
         return [{"industry_code_lv2": row[0], "industry_name_lv2": row[1]} for row in results]
 
+    @traced("db.get_symbols_by_industry")
     def get_symbols_by_industry(self, industry_code_lv2: str) -> list[str]:
         """Get list of symbols by industry.
         Args:
@@ -316,24 +868,50 @@ class Database:
         """, (industry_code_lv2,))
         return [row[0] for row in self.cursor.fetchall()]
     
-    def get_financial_data(self, symbol: str) -> pd.DataFrame:
+    @traced("db.get_financial_data")
+    def get_financial_data(self, symbol: str, year: Optional[List[int]] = None, column_groups: Optional[List[str]] = None,
+                           year_from: Optional[int] = None, year_to: Optional[int] = None) -> pd.DataFrame:
         """Get financial data by symbol: income statement, balance sheet, cash flow statement and yearly stock price
         Pay attention to percentage values, they may be stored as decimal values (e.g: 15% is stored as 0.15)
         Args:
             symbol (str): Symbol of the company
+            year (list[int]): List of years, if None, get all years
+            column_groups (list[str]): Keys of FINANCIAL_COLUMN_GROUPS to select, if None, get all columns
+            year_from (int): First year to get (inclusive)
+            year_to (int): Last year to get (inclusive)
         Returns:
-            dataframe: Financial data
+            dataframe: Financial data with symbol, year_report and the selected columns, ordered by year
         """
-        self.cursor.execute("""
-            SELECT * FROM financial_data WHERE symbol = %s
-        """, (symbol,))
+        columns = resolve_financial_columns(column_groups)
+        query, params = build_financial_data_query([symbol], columns, year, year_from, year_to)
+        self.cursor.execute(query, params)
         results = self.cursor.fetchall()
-        df = pd.DataFrame(results, columns=[i[0] for i in self.cursor.description])
-        # remove id column
-        df = df.drop(columns=['id'])
-        return df
+        return pd.DataFrame(results, columns=[i[0] for i in self.cursor.description])
 
+    @traced("db.get_financial_data_batch")
+    def get_financial_data_batch(self, symbols: List[str], year: Optional[List[int]] = None,
+                                 metrics: Optional[List[str]] = None, year_from: Optional[int] = None,
+                                 year_to: Optional[int] = None) -> pd.DataFrame:
+        """Get financial data of several symbols in one query, pivoted for comparison.
+        Args:
+            symbols (list[str]): Symbols of the companies, e.g. ["VCB", "BID", "CTG"]
+            year (list[int]): List of years, if None, get all years
+            metrics (list[str]): Keys of FINANCIAL_COLUMN_GROUPS or financial_data column names, if None, get all
+            year_from (int): First year to get (inclusive)
+            year_to (int): Last year to get (inclusive)
+        Returns:
+            dataframe: One row per (metric, year_report), one column per symbol
+        Raises:
+            ValueError: If no symbol is given or a metric is unknown
+        """
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol and symbol.strip()))
+        columns = resolve_financial_columns(metrics)
+        query, params = build_financial_data_query(symbols, columns, year, year_from, year_to)
+        self.cursor.execute(query, params)
+        df = pd.DataFrame(self.cursor.fetchall(), columns=[i[0] for i in self.cursor.description])
+        return pivot_financial_data(df, symbols, columns)
 
+    @traced("db.get_best_symbols_by_industry")
     def get_best_symbols_by_industry(self, industry_code_lv2: str, num_stocks: int = 5, missing_threshold: float = 0.5) -> List[str]:
         """
         Get list of best stocks by industry based on a composite score.
@@ -348,177 +926,175 @@ class Database:
             list[str]: List of symbols
         """
         try:
-            # Get symbols for the industry
-            symbols = self.get_symbols_by_industry(industry_code_lv2)
-            if not symbols:
-                return []
-
-            quoted_symbols = [f"'{symbol}'" for symbol in symbols]
-
-            # Define the metrics and their directions
-            metrics = {
-                'return_on_equity_percent': 'higher',
-                'net_profit_margin_percent': 'higher',
-                'revenue_growth_percent': 'higher',
-                'debt_to_equity': 'lower',
-                'total_volume': 'higher'
-            }
-
-            # Query the financial data - only get the latest year for each symbol
-            query = f"""
-                SELECT f1.symbol, f1.return_on_equity_percent, f1.net_profit_margin_percent, 
-                    f1.revenue_growth_percent, f1.total_liabilities_billion_vnd, f1.owner_equity_billion_vnd,
-                    f1.yearly_close_price_vnd, f1.yearly_volume, f1.year_report
-                FROM financial_data f1
-                INNER JOIN (
-                    SELECT symbol, MAX(year_report) as max_year
-                    FROM financial_data
-                    WHERE symbol IN ({', '.join(quoted_symbols)})
-                    GROUP BY symbol
-                ) f2 ON f1.symbol = f2.symbol AND f1.year_report = f2.max_year
-            """
-
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
+            # Latest year for each symbol of the industry, as a server-side prepared statement
+            cursor = self.prepared_cursor()
+            cursor.execute(LATEST_METRICS_BY_INDUSTRY_QUERY, (industry_code_lv2,))
+            results = cursor.fetchall()
             if not results:
                 return []
 
-            # Convert results to a list of dictionaries
-            columns = ['symbol', 'return_on_equity_percent', 'net_profit_margin_percent', 
-                    'revenue_growth_percent', 'total_liabilities_billion_vnd', 'owner_equity_billion_vnd',
-                    'yearly_close_price_vnd', 'yearly_volume', 'year_report']
-            data = []
-            for row in results:
-                converted_row = [float(val) if isinstance(val, decimal.Decimal) else val for val in row]
-                company_data = dict(zip(columns, converted_row))
-                data.append(company_data)
-
-            # Calculate derived metrics
-            for company in data:
-                total_liabilities = company['total_liabilities_billion_vnd']
-                owner_equity = company['owner_equity_billion_vnd']
-                company['debt_to_equity'] = total_liabilities / owner_equity if owner_equity and owner_equity != 0 and total_liabilities is not None else None
-
-                price = company['yearly_close_price_vnd']
-                volume = company['yearly_volume']
-                company['total_volume'] = price * volume if price is not None and volume is not None else None
-
-            # Step 1: Check missing data ratio and filter metrics
-            valid_metrics = {}
-            for metric in metrics:
-                values = [c.get(metric) for c in data if c.get(metric) is not None]
-                missing_ratio = 1 - len(values) / len(data) if data else 1
-                if missing_ratio <= missing_threshold:
-                    valid_metrics[metric] = metrics[metric]
-                else:
-                    print(f"Warning: Metric {metric} has {missing_ratio:.2%} missing values, excluded from scoring.")
-            if not valid_metrics:
-                return []
-
-            # Step 2: Calculate statistics and impute missing values with median
-            metric_stats: Dict[str, tuple] = {}
-            for metric in valid_metrics:
-                values = [c.get(metric) for c in data if c.get(metric) is not None]
-                if values:
-                    min_val = min(values)
-                    max_val = max(values)
-                    median_val = np.median(values)
-                    variance = np.var(values) if len(values) > 1 else 0
-                    metric_stats[metric] = (min_val, max_val, median_val, variance)
-                else:
-                    metric_stats[metric] = (0, 1, 0.5, 0)  # Default if no data
-
-            # Step 3: Adjust weights based on variance
-            total_variance = sum(stats[3] for stats in metric_stats.values())
-            metric_weights = {
-                metric: stats[3] / total_variance if total_variance > 0 else 1 / len(valid_metrics)
-                for metric, stats in metric_stats.items()
-            }
-            weight_sum = sum(metric_weights.values())
-            if weight_sum > 0:
-                metric_weights = {k: v / weight_sum for k, v in metric_weights.items()}
-
-            # Step 4: Handle outliers for debt_to_equity
-            debt_values = [c.get('debt_to_equity') for c in data if c.get('debt_to_equity') is not None]
-            if debt_values:
-                debt_p75 = np.percentile(debt_values, 75)
-                for company in data:
-                    debt = company.get('debt_to_equity')
-                    if debt is not None and debt > debt_p75 * 1.5:
-                        company['debt_to_equity_adjusted'] = max(0, 1 - (debt - debt_p75) / debt_p75)
-                    else:
-                        company['debt_to_equity_adjusted'] = 1.0 if debt is not None else None
-
-            # Step 5: Normalize and calculate scores
-            for company in data:
-                company_score = 0
-                total_weight = 0
-                for metric in valid_metrics:
-                    value = company.get(metric if metric != 'debt_to_equity' else 'debt_to_equity_adjusted')
-                    if value is None:
-                        # Impute with median normalized value
-                        _, _, median_val, _ = metric_stats[metric]
-                        min_val, max_val, _, _ = metric_stats[metric]
-                        if max_val == min_val:
-                            company[f"{metric}_normalized"] = 1.0
-                        else:
-                            if valid_metrics[metric] == 'higher':
-                                company[f"{metric}_normalized"] = (median_val - min_val) / (max_val - min_val)
-                            else:
-                                company[f"{metric}_normalized"] = (max_val - median_val) / (max_val - min_val)
-                    else:
-                        min_val, max_val, _, _ = metric_stats[metric]
-                        if max_val == min_val:
-                            company[f"{metric}_normalized"] = 1.0
-                        else:
-                            if valid_metrics[metric] == 'higher':
-                                company[f"{metric}_normalized"] = (value - min_val) / (max_val - min_val)
-                            else:
-                                company[f"{metric}_normalized"] = (max_val - value) / (max_val - min_val)
-
-                    normalized_value = company[f"{metric}_normalized"]
-                    weight = metric_weights[metric]
-                    company_score += normalized_value * weight
-                    total_weight += weight
-
-                company['composite_score'] = company_score / total_weight if total_weight > 0 else 0
-
-            # Step 6: Sort and return top companies
-            sorted_companies = sorted(data, key=lambda x: x.get('composite_score', 0), reverse=True)
+            data = pd.DataFrame(results, columns=[i[0] for i in cursor.description])
+            sorted_companies, metric_weights = score_companies(data, missing_threshold)
+            top_companies = sorted_companies.head(num_stocks)
 
             # Debug output
             print(f"\nTop {num_stocks} companies in industry {industry_code_lv2}:")
-            for i, company in enumerate(sorted_companies[:num_stocks]):
+            for i, company in enumerate(top_companies.itertuples(index=False)):
+                company = company._asdict()
                 print(f"{i+1}. {company['symbol']} (Year: {company['year_report']}) - Score: {company['composite_score']:.2f}")
-                for metric in valid_metrics:
-                    print(f"   {metric}: {company.get(metric):.2f}, Normalized: {company.get(f'{metric}_normalized'):.2f}, Weight: {metric_weights[metric]:.2f}")
+                for metric in metric_weights:
+                    print(f"   {metric}: {company[metric]:.2f}, Normalized: {company[f'{metric}_normalized']:.2f}, Weight: {metric_weights[metric]:.2f}")
                 print()
 
-            return [company['symbol'] for company in sorted_companies[:num_stocks]]
+            return top_companies['symbol'].tolist()
 
         except Error as e:
             print(f"Error getting best stocks by industry: {e}")
             return []
 
+# Seconds before the cached VN100 reference data is reloaded from MySQL
+REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL_SECONDS', 6 * 3600))
+
+class ReferenceDataCache:
+    """Read-through, in-process cache of the VN100 reference tables.
+    vn100_listing and vn100_listing_by_industry are loaded once into in-memory indexes
+    (symbol -> company, industry_code_lv2 -> symbols, industry list) and reloaded after
+    `ttl` seconds or when invalidate() is called, e.g. by the ingestion methods.
+    """
+    def __init__(self, ttl: float = REFERENCE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._loaded_at = None
+        self._symbols: tuple = ()
+        self._industries: tuple = ()
+        self._companies: Dict[str, dict] = {}
+        self._symbols_by_industry: Dict[str, tuple] = {}
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self):
+        """Drop the cached data, the next lookup reloads it from MySQL"""
+        self._loaded_at = None
+
+    def load(self, listing_rows: List[tuple], industry_rows: List[tuple]):
+        """Build the indexes from raw table rows.
+        Args:
+            listing_rows (list[tuple]): (symbol,) rows of vn100_listing
+            industry_rows (list[tuple]): (symbol, organ_name, industry_name_lv2, industry_code_lv2)
+                rows of vn100_listing_by_industry
+        """
+        companies = {}
+        symbols_by_industry: Dict[str, list] = {}
+        industries: Dict[str, str] = {}
+        for symbol, organ_name, industry_name_lv2, industry_code_lv2 in industry_rows:
+            companies[symbol.upper()] = {
+                "symbol": symbol,
+                "organ_name": organ_name,
+                "industry_name_lv2": industry_name_lv2,
+                "industry_code_lv2": industry_code_lv2
+            }
+            symbols_by_industry.setdefault(str(industry_code_lv2), []).append(symbol)
+            industries.setdefault(str(industry_code_lv2), industry_name_lv2)
+
+        with self._lock:
+            self._symbols = tuple(row[0] for row in listing_rows)
+            self._companies = companies
+            self._symbols_by_industry = {code: tuple(symbols) for code, symbols in symbols_by_industry.items()}
+            self._industries = tuple(industries.items())
+            self._loaded_at = time.monotonic()
+
+    @traced("db.refresh_reference_cache")
+    def refresh(self):
+        """Reload the reference tables from MySQL"""
+        with Database() as db:
+            db.cursor.execute("SELECT symbol FROM vn100_listing")
+            listing_rows = db.cursor.fetchall()
+            db.cursor.execute("""
+                SELECT symbol, organ_name, industry_name_lv2, industry_code_lv2
+                FROM vn100_listing_by_industry
+            """)
+            industry_rows = db.cursor.fetchall()
+        self.load(listing_rows, industry_rows)
+
+    def _ensure_loaded(self):
+        if self.is_stale():
+            # Only one caller reloads, the others wait and then read the fresh indexes
+            with self._refresh_lock:
+                if self.is_stale():
+                    self.refresh()
+
+    def get_all_symbols(self) -> list[str]:
+        self._ensure_loaded()
+        return list(self._symbols)
+
+    def get_industries_list(self) -> list[dict]:
+        self._ensure_loaded()
+        return [{"industry_code_lv2": code, "industry_name_lv2": name} for code, name in self._industries]
+
+    def get_symbols_by_industry(self, industry_code_lv2: str) -> list[str]:
+        self._ensure_loaded()
+        return list(self._symbols_by_industry.get(str(industry_code_lv2).strip(), ()))
+
+    def get_company_info(self, symbol: str) -> dict:
+        self._ensure_loaded()
+        company = self._companies.get(symbol.strip().upper())
+        return dict(company) if company else {}
+
+reference_cache = ReferenceDataCache()
+
 @tool
-def get_financial_data_tool(symbol: str) -> str:
+def get_financial_data_tool(symbol: str, column_groups: Optional[List[str]] = None, year_from: Optional[int] = None,
+                            year_to: Optional[int] = None, year: Optional[List[int]] = None) -> str:
     """Get financial data by symbol: income statement, balance sheet, cash flow statement and yearly stock price
     Pay attention to percentage values, they may be stored as decimal values (e.g: 15% is stored as 0.15)
+    Only request the column groups and years needed to answer the question.
     Args:
         symbol (str): Symbol of the company
+        column_groups (list[str]): Any of "balance_sheet", "income_statement", "cash_flow", "ratios", "price".
+            If None, get all groups
+        year_from (int): First year to get (inclusive), if None, from the earliest year
+        year_to (int): Last year to get (inclusive), if None, up to the latest year
+        year (list[int]): Exact years to get instead of a range, if None, get all years
     Returns:
-        str: a string representation of the financial data in csv format
+        str: a string representation of the financial data in compact csv format, one row per year
     """
     try:
-        db = Database()
-        db.connect()
-        financial_data = db.get_financial_data(symbol)
-        return financial_data.to_csv(index=False)
+        with Database() as db:
+            financial_data = db.get_financial_data(symbol, year, column_groups, year_from, year_to)
+            return to_compact_csv(financial_data, drop_columns=['symbol'])
+    except ValueError as e:
+        return str(e)
     except Error as e:
         print(f"Error getting financial data: {e}")
         return "Error getting financial data"
-    finally:
-        db.close()
+
+@tool
+def get_financial_data_batch_tool(symbols: List[str], metrics: Optional[List[str]] = None, year_from: Optional[int] = None,
+                                  year_to: Optional[int] = None, year: Optional[List[int]] = None) -> str:
+    """Get financial data of several companies at once, as one comparison table. Prefer this over
+    calling get_financial_data_tool once per symbol when comparing companies (e.g. "VCB vs BID vs CTG").
+    Pay attention to percentage values, they may be stored as decimal values (e.g: 15% is stored as 0.15)
+    Args:
+        symbols (list[str]): Symbols of the companies, e.g. ["VCB", "BID", "CTG"]
+        metrics (list[str]): Column groups ("balance_sheet", "income_statement", "cash_flow", "ratios", "price")
+            and/or column names (e.g. "net_profit_billion_vnd", "return_on_equity_percent"). If None, get all
+        year_from (int): First year to get (inclusive), if None, from the earliest year
+        year_to (int): Last year to get (inclusive), if None, up to the latest year
+        year (list[int]): Exact years to get instead of a range, if None, get all years
+    Returns:
+        str: compact csv with one row per (metric, year_report) and one column per symbol
+    """
+    try:
+        with Database() as db:
+            table = db.get_financial_data_batch(symbols, year, metrics, year_from, year_to)
+            return to_compact_csv(table.reset_index())
+    except ValueError as e:
+        return str(e)
+    except Error as e:
+        print(f"Error getting financial data batch: {e}")
+        return "Error getting financial data batch"
 
 @tool
 def get_industries_list_tool() -> list[dict]:
@@ -530,15 +1106,10 @@ def get_industries_list_tool() -> list[dict]:
               {"industry_code_lv2": "2000", "industry_name_lv2": "Ngành công nghiệp"}]
     """
     try:
-        db = Database()
-        db.connect()
-        industries = db.get_industries_list()
-        return industries
+        return reference_cache.get_industries_list()
     except Error as e:
         print(f"Error getting industries list: {e}")
         return []
-    finally:
-        db.close()
 
 @tool
 def get_symbols_by_industry_tool(industry_code_lv2: str) -> list[str]:
@@ -550,15 +1121,10 @@ def get_symbols_by_industry_tool(industry_code_lv2: str) -> list[str]:
         e.g: ["VCB", "BID", "CTG"]
     """
     try:
-        db = Database()
-        db.connect()
-        symbols = db.get_symbols_by_industry(industry_code_lv2)
-        return symbols
+        return reference_cache.get_symbols_by_industry(industry_code_lv2)
     except Error as e:
         print(f"Error getting symbols by industry: {e}")
         return []
-    finally:
-        db.close()
 
 @tool
 def get_all_symbols_tool() -> list[str]:
@@ -568,16 +1134,10 @@ def get_all_symbols_tool() -> list[str]:
         e.g: ["VCB", "BID", "CTG", ...]
     """
     try:
-        db = Database()
-        db.connect()
-        db.cursor.execute("SELECT symbol FROM vn100_listing")
-        symbols = [row[0] for row in db.cursor.fetchall()]
-        return symbols
+        return reference_cache.get_all_symbols()
     except Error as e:
         print(f"Error getting all symbols: {e}")
         return []
-    finally:
-        db.close()
 
 @tool
 def get_company_info_tool(symbol: str) -> dict:
@@ -588,27 +1148,10 @@ def get_company_info_tool(symbol: str) -> dict:
         dict: Company information including industry and organization name
     """
     try:
-        db = Database()
-        db.connect()
-        db.cursor.execute("""
-            SELECT symbol, organ_name, industry_name_lv2, industry_code_lv2 
-            FROM vn100_listing_by_industry 
-            WHERE symbol = %s
-        """, (symbol,))
-        result = db.cursor.fetchone()
-        if result:
-            return {
-                "symbol": result[0],
-                "organ_name": result[1],
-                "industry_name_lv2": result[2],
-                "industry_code_lv2": result[3]
-            }
-        return {}
+        return reference_cache.get_company_info(symbol)
     except Error as e:
         print(f"Error getting company info: {e}")
         return {}
-    finally:
-        db.close()
 
 @tool
 def get_best_symbols_by_industry_tool(industry_code_lv2: str, num_stocks: int = 5) -> list[str]:
@@ -620,19 +1163,25 @@ def get_best_symbols_by_industry_tool(industry_code_lv2: str, num_stocks: int =
         list[str]: List of symbols
     """
     try:
-        db = Database()
-        db.connect()
-        return db.get_best_symbols_by_industry(industry_code_lv2, num_stocks)
+        with Database() as db:
+            symbols = db.get_scoreboard_symbols(industry_code_lv2, num_stocks)
+            if symbols:
+                return symbols
+            # Scoreboard not built yet: score the industry on the fly
+            return db.get_best_symbols_by_industry(industry_code_lv2, num_stocks)
     except Error as e:
         print(f"Error getting best stocks by industry: {e}")
         return []
-    finally:
-        db.close()
 
 def main():
+    parser = argparse.ArgumentParser(description="Smoke test the database helpers")
+    parser.add_argument("--check-plans", action="store_true", help="Also EXPLAIN the hot tool queries")
+    args = parser.parse_args()
     # Create database tables
     db = Database()
     # db.create_tables()
+    # Nightly refresh: only send new/changed financial_data rows
+    # db.create_tables(incremental=True)
     # print the schemas of all tables in the database, pretty print
     # json_schemas = json.dumps(db.extract_tables_schemas(), indent=4)
     # print(json_schemas)
@@ -652,6 +1201,12 @@ def main():
         print("Testing get_best_symbols_by_industry:")
         best_symbols = db.get_best_symbols_by_industry("8700", 5)
         print(f"Best symbols in industry 8300: {best_symbols}")
+
+        if args.check_plans:
+            print("\n==============================================\n")
+            print("Checking query plans:")
+            for problem in db.check_query_plans() or ["All checked queries are index-backed"]:
+                print(problem)
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
     finally:
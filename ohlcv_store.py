@@ -0,0 +1,171 @@
+"""Local store of daily OHLCV bars, one row per symbol and trading day in the daily_ohlcv table.
+
+The backfill job asks vnstock only for the dates after the last stored bar of each symbol, up to
+the latest closed session, so a bar is never stored while its session is still trading. Outside
+a trading day, the price tools answer with the stored close of the latest closed session, so
+those answers need no external round trip; from the open to the close they use the live sources.
+Technical-analysis tools can read any range with get_bars.
+
+Usage:
+    pipenv run python -m ohlcv_store [--symbols VCB FPT] [--start 2015-01-01]
+"""
+import argparse
+import os
+import time
+import pandas as pd
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+from mysql.connector import Error
+from typing import Callable, Dict, List, Optional
+from database import Database, dataframe_to_rows, reference_cache
+from tracing import traced
+from tools.quote_cache import HOSE_SESSIONS, HOSE_TIMEZONE, Quote, last_close_date, session_in_progress
+load_dotenv()
+
+OHLCV_BACKFILL_START = os.getenv('OHLCV_BACKFILL_START', '2015-01-01')
+OHLCV_LOCAL_PRICES = os.getenv('OHLCV_LOCAL_PRICES', 'true').lower() in ('1', 'true', 'yes')
+OHLCV_COLUMNS = ['symbol', 'trade_date', 'open', 'high', 'low', 'close', 'volume']
+OHLCV_VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+def create_daily_ohlcv(db: Database):
+    """Create daily_ohlcv table; the primary key serves both per-symbol ranges and MAX(trade_date)"""
+    db.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_ohlcv (
+            symbol VARCHAR(10) NOT NULL,
+            trade_date DATE NOT NULL,
+            open DECIMAL(12,2),
+            high DECIMAL(12,2),
+            low DECIMAL(12,2),
+            close DECIMAL(12,2) NOT NULL,
+            volume BIGINT,
+            PRIMARY KEY (symbol, trade_date)
+        )
+    """)
+
+def get_last_dates(db: Database) -> Dict[str, date]:
+    """Date of the last stored bar per symbol"""
+    db.cursor.execute("SELECT symbol, MAX(trade_date) FROM daily_ohlcv GROUP BY symbol")
+    return {symbol: last_date for symbol, last_date in db.cursor.fetchall()}
+
+def backfill_symbol(db: Database, symbol: str, last_date: Optional[date], fetch_history: Callable,
+                    start: str = OHLCV_BACKFILL_START, end: Optional[date] = None) -> int:
+    """Fetch and upsert the bars of symbol after its last stored date (or from start) to end.
+    Args:
+        db (Database): Connected database
+        symbol (str): Stock symbol
+        last_date (date): Date of its last stored bar, None if it has none
+        fetch_history (Callable): (symbol, start, end) -> dataframe of trade_date, open, high, low, close, volume
+        start (str): First date, YYYY-MM-DD, for a symbol without bars
+        end (date): Last date, the latest closed session by default
+    Returns:
+        int: Number of bars upserted
+    """
+    end = end or last_close_date()
+    first = (last_date + timedelta(days=1)).isoformat() if last_date else start
+    bars = fetch_history(symbol, first, end.isoformat())
+    if bars.empty:
+        return 0
+    # The source may return the bar of a session still trading
+    bars = bars[pd.to_datetime(bars["trade_date"]).dt.date <= end].assign(symbol=symbol)[OHLCV_COLUMNS]
+    return db.bulk_insert("daily_ohlcv", OHLCV_COLUMNS, dataframe_to_rows(bars), update_columns=OHLCV_VALUE_COLUMNS)
+
+def backfill(symbols: Optional[List[str]] = None, fetch_history: Optional[Callable] = None,
+             start: str = OHLCV_BACKFILL_START) -> Dict[str, int]:
+    """Bring daily_ohlcv up to date.
+    Args:
+        symbols (list[str]): Symbols to backfill, all VN100 symbols by default
+        fetch_history (Callable): Bar source, get_vnstock_history by default
+        start (str): First date, YYYY-MM-DD, for symbols without bars
+    Returns:
+        dict: Counts of symbols updated, already up to date and failed, and of bars upserted
+    """
+    if fetch_history is None:
+        from tools.price_sources import get_vnstock_history
+        fetch_history = get_vnstock_history
+    summary = {"updated": 0, "up_to_date": 0, "failed": 0, "bars": 0}
+    with Database() as db:
+        create_daily_ohlcv(db)
+        last_dates = get_last_dates(db)
+        closed = last_close_date()
+        for symbol in symbols or reference_cache.get_all_symbols():
+            symbol = symbol.strip().upper()
+            last_date = last_dates.get(symbol)
+            if last_date is not None and last_date >= closed:
+                summary["up_to_date"] += 1
+                continue
+            try:
+                bars = backfill_symbol(db, symbol, last_date, fetch_history, start, closed)
+            except Exception as e:
+                print(f"Error backfilling {symbol}: {e}")
+                summary["failed"] += 1
+                continue
+            summary["updated"] += 1
+            summary["bars"] += bars
+    print(f"Backfilled daily_ohlcv: {summary}")
+    return summary
+
+@traced("db.get_bars")
+def get_bars(symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """Stored daily bars of a symbol.
+    Args:
+        symbol (str): Stock symbol
+        start (str): First date, YYYY-MM-DD, the first stored bar by default
+        end (str): Last date, YYYY-MM-DD, the last stored bar by default
+    Returns:
+        dataframe: trade_date, open, high, low, close and volume, oldest first
+    """
+    query = "SELECT trade_date, open, high, low, close, volume FROM daily_ohlcv WHERE symbol = %s"
+    params = [symbol.strip().upper()]
+    if start:
+        query += " AND trade_date >= %s"
+        params.append(start)
+    if end:
+        query += " AND trade_date <= %s"
+        params.append(end)
+    with Database() as db:
+        db.cursor.execute(query + " ORDER BY trade_date", tuple(params))
+        bars = pd.DataFrame(db.cursor.fetchall(), columns=OHLCV_COLUMNS[1:])
+    # DECIMAL columns come back as Decimal
+    return bars.astype({"open": float, "high": float, "low": float, "close": float})
+
+def close_quote(price: float, trade_date: date) -> Quote:
+    """Quote of a stored close, timestamped at the end of its session"""
+    closing_time = datetime.combine(trade_date, HOSE_SESSIONS[-1][1], tzinfo=HOSE_TIMEZONE)
+    return Quote(float(price), "ohlcv_store", closing_time)
+
+@traced("price.ohlcv_store")
+def get_closing_quotes(symbols: List[str], now: Optional[datetime] = None) -> Dict[str, Quote]:
+    """Stored closes of the latest closed session, empty while a trading day is in progress.
+    Args:
+        symbols (list[str]): Stock symbols without .VN suffix
+        now (datetime): Current time, timezone-aware; defaults to the current time in Vietnam
+    Returns:
+        dict: {symbol: Quote}, symbols without an up-to-date bar are left out
+    """
+    if not OHLCV_LOCAL_PRICES or not symbols or session_in_progress(now):
+        return {}
+    closed = last_close_date(now)
+    symbols = [symbol.strip().upper() for symbol in symbols]
+    try:
+        with Database() as db:
+            db.cursor.execute(f"""
+                SELECT symbol, close FROM daily_ohlcv
+                WHERE trade_date = %s AND symbol IN ({', '.join(['%s'] * len(symbols))})
+            """, (closed, *symbols))
+            rows = db.cursor.fetchall()
+    except Error as e:
+        print(f"Error reading daily_ohlcv: {e}")
+        return {}
+    return {symbol: close_quote(close, closed) for symbol, close in rows if close is not None and close > 0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="*", help="Symbols to backfill, all VN100 symbols by default")
+    parser.add_argument("--start", default=OHLCV_BACKFILL_START, help="First date for symbols without bars")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    backfill(args.symbols, start=args.start)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
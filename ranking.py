@@ -0,0 +1,233 @@
+"""Vectorized composite scoring used to rank companies, per industry or across the whole VN100.
+
+The scores are identical to the original per-company loop in Database.get_best_symbols_by_industry:
+metrics with too many missing values are dropped, missing values are imputed with the median,
+values are min-max scaled by direction, weighted by their variance, and debt-to-equity outliers
+are capped. All of it runs on one (companies x metrics) float array, NaN marking missing values,
+and rank_companies scores every industry in a single pass over it.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+# Metrics used in the composite score and whether higher or lower values are better
+SCORE_METRICS = {
+    'return_on_equity_percent': 'higher',
+    'net_profit_margin_percent': 'higher',
+    'revenue_growth_percent': 'higher',
+    'debt_to_equity': 'lower',
+    'total_volume': 'higher'
+}
+METRIC_NAMES = list(SCORE_METRICS)
+DEBT_TO_EQUITY_INDEX = METRIC_NAMES.index('debt_to_equity')
+HIGHER_IS_BETTER = np.array([SCORE_METRICS[metric] == 'higher' for metric in METRIC_NAMES])
+
+# financial_data columns needed to compute SCORE_METRICS
+SCORE_SOURCE_COLUMNS = [
+    'return_on_equity_percent', 'net_profit_margin_percent', 'revenue_growth_percent',
+    'total_liabilities_billion_vnd', 'owner_equity_billion_vnd',
+    'yearly_close_price_vnd', 'yearly_volume'
+]
+
+def metric_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Build the (companies x SCORE_METRICS) array, deriving debt_to_equity and total_volume.
+    Args:
+        df (pd.DataFrame): Rows with SCORE_SOURCE_COLUMNS, values may be Decimal or None
+    Returns:
+        np.ndarray: Float array with one column per SCORE_METRICS entry, NaN when missing
+    """
+    # None becomes NaN and Decimal becomes float in the cast
+    source = np.column_stack([df[column].to_numpy() for column in SCORE_SOURCE_COLUMNS]).astype(float)
+    roe, net_margin, revenue_growth, liabilities, equity, price, volume = source.T
+
+    has_ratio = ~np.isnan(liabilities) & ~np.isnan(equity) & (equity != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        debt_to_equity = np.where(has_ratio, liabilities / equity, np.nan)
+    # NaN propagates, so total_volume is missing when either price or volume is
+    total_volume = price * volume
+    return np.column_stack([roe, net_margin, revenue_growth, debt_to_equity, total_volume])
+
+# Divisions by zero give inf or NaN, like the numpy scalars of the original loop
+@np.errstate(divide='ignore', invalid='ignore')
+def score_groups(values: np.ndarray, group_ids: np.ndarray, missing_threshold: float = 0.5,
+                 verbose: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Score every group of companies (e.g. every industry) in one pass over the matrix.
+    Per-group statistics are computed on blocks of the groups with the same number of present
+    values, one numpy call per block instead of one per group.
+    Args:
+        values (np.ndarray): Output of metric_matrix
+        group_ids (np.ndarray): Group of each row, 0 to groups - 1; negative to leave the row out
+        missing_threshold (float): Threshold for missing data ratio to exclude a metric (0 to 1)
+        verbose (bool): Print a warning for every excluded metric
+    Returns:
+        tuple: (composite score per row, normalized values per row, (groups x metrics) weights).
+            Excluded metrics have NaN normalized values and weight; rows left out and rows of
+            groups without any usable metric have a NaN score.
+    """
+    n, m = values.shape
+    group_count = int(group_ids.max()) + 1 if n else 0
+    scores = np.full(n, np.nan)
+    normalized = np.full((n, m), np.nan)
+    # Rows by group, in input order within a group
+    rows = np.flatnonzero(group_ids >= 0)
+    rows = rows[np.argsort(group_ids[rows], kind='stable')]
+    groups = group_ids[rows]
+    present = ~np.isnan(values[rows])
+    sizes = np.bincount(groups, minlength=group_count)
+    counts = np.stack([np.bincount(groups, weights=present[:, j], minlength=group_count) for j in range(m)],
+                      axis=1).astype(int) if group_count else np.zeros((0, m), dtype=int)
+
+    # Step 1: Check missing data ratio and filter metrics
+    missing_ratios = np.where(sizes[:, None] > 0, 1 - counts / sizes[:, None], 1.0)
+    valid = missing_ratios <= missing_threshold
+    if verbose:
+        for group, j in zip(*np.nonzero(~valid)):
+            print(f"Warning: Metric {METRIC_NAMES[j]} has {missing_ratios[group, j]:.2%} missing values, excluded from scoring.")
+
+    # Step 2: Statistics of the present values of each metric: min, max and median from a sort,
+    # the variance like np.var on the values in row order. The values of every (group, metric) pair with k present
+    # values form one row of a (pairs x k) block. Defaults if no data: (0, 1, 0.5, 0)
+    min_vals = np.zeros((group_count, m))
+    max_vals = np.ones((group_count, m))
+    medians = np.full((group_count, m), 0.5)
+    variances = np.zeros((group_count, m))
+    debt_p75 = np.full(group_count, np.nan)
+    flat = np.concatenate([values[rows[present[:, j]], j] for j in range(m)])
+    pair_counts = counts.T.ravel()
+    pair_starts = (np.cumsum(pair_counts) - pair_counts).reshape(m, group_count).T
+    scored_pairs = valid & (counts > 0)
+    for k in np.unique(counts[scored_pairs]):
+        pair_groups, pair_metrics = np.nonzero(scored_pairs & (counts == k))
+        block = flat[pair_starts[pair_groups, pair_metrics][:, None] + np.arange(k)]
+        ordered = np.sort(block, axis=1)
+        min_vals[pair_groups, pair_metrics] = ordered[:, 0]
+        max_vals[pair_groups, pair_metrics] = ordered[:, -1]
+        medians[pair_groups, pair_metrics] = ordered[:, k // 2] if k % 2 else (ordered[:, k // 2 - 1] + ordered[:, k // 2]) / 2
+        if k > 1:
+            variances[pair_groups, pair_metrics] = np.var(block, axis=1)
+        is_debt = pair_metrics == DEBT_TO_EQUITY_INDEX
+        if is_debt.any():
+            debt_p75[pair_groups[is_debt]] = np.percentile(block[is_debt], 75, axis=1)
+
+    # Step 3: Adjust weights based on variance, summed in metric order
+    total_variance = np.zeros(group_count)
+    for j in range(m):
+        total_variance = np.where(valid[:, j], total_variance + variances[:, j], total_variance)
+    weights = np.where(total_variance[:, None] > 0, variances / total_variance[:, None],
+                       1 / valid.sum(axis=1)[:, None])
+    weights[~valid] = np.nan
+    weight_sum = np.zeros(group_count)
+    for j in range(m):
+        weight_sum = np.where(valid[:, j], weight_sum + weights[:, j], weight_sum)
+    weights = np.where(weight_sum[:, None] > 0, weights / weight_sum[:, None], weights)
+
+    # Step 4: Cap debt_to_equity outliers. Note the capped value is what gets scaled below,
+    # against the min/max of the raw ratios
+    debt = values[rows, DEBT_TO_EQUITY_INDEX]
+    row_p75 = debt_p75[groups]
+    capped = np.maximum(0, 1 - (debt - row_p75) / row_p75)
+    debt_adjusted = np.where(np.isnan(debt), np.nan, np.where(debt > row_p75 * 1.5, capped, 1.0))
+
+    # Step 5: Impute with the median, normalize and accumulate weighted scores in metric order
+    row_valid = valid[groups]
+    min_val, max_val = min_vals[groups], max_vals[groups]
+    columns = values[rows]
+    columns[:, DEBT_TO_EQUITY_INDEX] = debt_adjusted
+    columns = np.where(np.isnan(columns), medians[groups], columns)
+    scaled = np.where(HIGHER_IS_BETTER, columns - min_val, max_val - columns) / (max_val - min_val)
+    scaled = np.where(max_val == min_val, 1.0, scaled)
+    normalized[rows] = np.where(row_valid, scaled, np.nan)
+    row_weights = weights[groups]
+    company_score = np.zeros(len(rows))
+    total_weight = np.zeros(group_count)
+    for j in range(m):
+        company_score = np.where(row_valid[:, j], company_score + scaled[:, j] * row_weights[:, j], company_score)
+        total_weight = np.where(valid[:, j], total_weight + weights[:, j], total_weight)
+
+    row_weight = total_weight[groups]
+    group_scores = np.where(row_weight > 0, company_score / row_weight, 0.0)
+    scores[rows] = np.where(valid[groups].any(axis=1), group_scores, np.nan)
+    return scores, normalized, weights
+
+def score_matrix(values: np.ndarray, missing_threshold: float = 0.5,
+                 verbose: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Score one group of companies (e.g. one industry), see score_groups.
+    Args:
+        values (np.ndarray): Output of metric_matrix for the group
+        missing_threshold (float): Threshold for missing data ratio to exclude a metric (0 to 1)
+        verbose (bool): Print a warning for every excluded metric
+    Returns:
+        tuple: (composite scores, normalized values, weights per metric). Excluded metrics have
+            NaN normalized values and weight; scores are empty when no metric is usable.
+    """
+    n, m = values.shape
+    if n == 0:
+        return np.empty(0), np.full((0, m), np.nan), np.full(m, np.nan)
+    scores, normalized, weights = score_groups(values, np.zeros(n, dtype=int), missing_threshold, verbose)
+    if np.isnan(weights[0]).all():
+        return np.empty(0), normalized[:0], weights[0]
+    return scores, normalized, weights[0]
+
+def _scored_frame(df: pd.DataFrame, values: np.ndarray, normalized: np.ndarray, scores: np.ndarray,
+                  order: np.ndarray) -> pd.DataFrame:
+    """Assemble the output rows in `order`, metric columns replaced by their float values."""
+    data = {column: df[column].to_numpy()[order] for column in df.columns if column not in SCORE_METRICS}
+    data.update({metric: values[order, j] for j, metric in enumerate(METRIC_NAMES)})
+    data.update({f"{metric}_normalized": normalized[order, j] for j, metric in enumerate(METRIC_NAMES)})
+    data['composite_score'] = scores[order]
+    return pd.DataFrame(data)
+
+def score_companies(df: pd.DataFrame, missing_threshold: float = 0.5,
+                    verbose: bool = True) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """Score one group of companies and sort them by composite score.
+    Args:
+        df (pd.DataFrame): Rows with SCORE_SOURCE_COLUMNS, one per company
+        missing_threshold (float): Threshold for missing data ratio to exclude a metric (0 to 1)
+        verbose (bool): Print a warning for every excluded metric
+    Returns:
+        tuple: (rows sorted by composite_score descending, with float SCORE_METRICS columns and
+                `<metric>_normalized` columns, and {metric: weight} of the scored metrics).
+                Both are empty if no metric is usable.
+    """
+    values = metric_matrix(df)
+    scores, normalized, weights = score_matrix(values, missing_threshold, verbose)
+    if len(scores) == 0:
+        return df.iloc[0:0], {}
+
+    # Step 6: Sort, ties keep their input order
+    order = np.argsort(-scores, kind='stable')
+    scored = _scored_frame(df, values, normalized, scores, order)
+    metric_weights = {metric: weights[j] for j, metric in enumerate(METRIC_NAMES) if not np.isnan(weights[j])}
+    return scored, metric_weights
+
+def rank_companies(df: pd.DataFrame, group_column: Optional[str] = 'industry_code_lv2',
+                   missing_threshold: float = 0.5, verbose: bool = False) -> pd.DataFrame:
+    """Score and rank every group (industry) in one call.
+    Args:
+        df (pd.DataFrame): Rows with SCORE_SOURCE_COLUMNS (and group_column), one per company
+        group_column (str): Column to rank within, None to rank all rows together (e.g. the whole VN100)
+        missing_threshold (float): Threshold for missing data ratio to exclude a metric (0 to 1)
+        verbose (bool): Print a warning for every excluded metric
+    Returns:
+        pd.DataFrame: Scored rows with a 1-based `rank` column, ordered by group then rank.
+            Groups without any usable metric are left out.
+    """
+    values = metric_matrix(df)
+    n = len(df)
+    if group_column is None:
+        group_ids = np.zeros(n, dtype=int)
+    else:
+        group_ids = pd.factorize(df[group_column], sort=True)[0]
+
+    scores, normalized, _ = score_groups(values, group_ids, missing_threshold, verbose)
+
+    # Sort by group, then by score descending; ties keep their input order
+    order = np.flatnonzero(~np.isnan(scores))
+    order = order[np.argsort(-scores[order], kind='stable')]
+    order = order[np.argsort(group_ids[order], kind='stable')]
+    ordered_groups = group_ids[order]
+    ranks = np.zeros(n, dtype=int)
+    ranks[order] = np.arange(len(order)) - np.searchsorted(ordered_groups, ordered_groups) + 1
+    scored = _scored_frame(df, values, normalized, scores, order)
+    scored['rank'] = ranks[order]
+    return scored
@@ -0,0 +1,330 @@
+"""HTTP server hosting many concurrent ToolsCallingAgentWithMem sessions in one process.
+
+The LLM client, the tools bound to it, the aiomysql pool, the conversation recorder and the
+answer cache are created once and shared by every session, so a session only holds its own
+memory, tool result cache and conversation log and costs next to nothing to create. Sessions
+idle for SESSION_IDLE_SECONDS are evicted, and the least recently used idle session makes room
+when SERVER_MAX_SESSIONS is reached.
+
+Endpoints:
+    POST   /sessions                       -> {"session_id": ...}
+    POST   /sessions/{session_id}/messages    {"message": ..., "stream": false}
+           -> {"answer": ...}, or with "stream": true a text/event-stream of
+              {"type": "text", "text": ...} chunks and the agent's progress events, ending with
+              {"type": "error", "detail": ...} if the turn failed. Error details only name the
+              session; the exception itself is logged by the server
+    DELETE /sessions/{session_id}
+    GET    /metrics
+
+Run with:
+    pipenv run python server.py
+"""
+import asyncio
+import json
+import os
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from langchain_core.language_models import BaseChatModel
+from pydantic import BaseModel
+import utils
+from async_database import close_async_pool
+from answer_cache import AnswerCache
+from conversation_memory import warm_encoding
+from conversation_recorder import ConversationRecorder
+from tools.response_streamer import ResponseStreamer, ResponseStreamListener
+from tools.get_current_stock_price_tool import price_resolver, quote_cache
+from tracing import tracer
+from tools_summ_mem import ToolsCallingAgentWithMem, TOOL_CALLING_MODEL, create_llm
+load_dotenv()
+
+SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.getenv('SERVER_PORT', 8000))
+SERVER_MAX_SESSIONS = int(os.getenv('SERVER_MAX_SESSIONS', 1000))
+SESSION_IDLE_SECONDS = float(os.getenv('SESSION_IDLE_SECONDS', 1800))
+# How often idle sessions are looked for
+SESSION_SWEEP_SECONDS = 60
+
+def turn_error_detail(session_id: str) -> str:
+    """Error detail returned to the client when a turn fails, without the exception text"""
+    return f"Internal error while answering in session {session_id}"
+
+class Session:
+    def __init__(self, session_id: str, agent: ToolsCallingAgentWithMem):
+        self.session_id = session_id
+        self.agent = agent
+        # Turns of one session run one at a time
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+class QueueListener(ResponseStreamListener):
+    """Forwards the stream of one request to the HTTP response"""
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_stream(self, text: str):
+        await self.queue.put({"type": "text", "text": text})
+
+    async def on_event(self, event: dict):
+        await self.queue.put(event)
+
+class SessionManager:
+    """Creates, serves and evicts agent sessions sharing one LLM client and tool registry"""
+    def __init__(self,
+                 model_name: str = TOOL_CALLING_MODEL,
+                 llm: Optional[BaseChatModel] = None,
+                 tools: Optional[List] = None,
+                 recorder: Optional[ConversationRecorder] = None,
+                 answer_cache: Optional[AnswerCache] = None,
+                 max_sessions: int = SERVER_MAX_SESSIONS,
+                 idle_seconds: float = SESSION_IDLE_SECONDS):
+        """
+        Args:
+            model_name (str): Model used when llm is not given
+            llm (BaseChatModel): Shared chat model client
+            tools (list): Tools available to every session, ASYNC_FIN_TOOLS by default
+            recorder (ConversationRecorder): Persists the conversations of every session
+            answer_cache (AnswerCache): Answers repeated opening questions across sessions
+            max_sessions (int): Maximum number of sessions kept in memory
+            idle_seconds (float): Sessions unused for longer are evicted
+        """
+        self.llm = llm if llm is not None else create_llm(model_name)
+        self.tools = tools if tools is not None else utils.ASYNC_FIN_TOOLS
+        # Bound once, every agent reuses it
+        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        self.recorder = recorder
+        self.answer_cache = answer_cache
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._system_prompt = None
+        self._system_prompt_date = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self.created = 0
+        self.evicted = 0
+        self.turns = 0
+
+    def system_prompt(self) -> str:
+        # The prompt contains today's date, it is rebuilt once a day
+        today = date.today()
+        if self._system_prompt_date != today:
+            self._system_prompt = utils.financial_system_prompt()
+            self._system_prompt_date = today
+        return self._system_prompt
+
+    def create_session(self) -> Session:
+        """Start a new session, evicting the least recently used idle one if the server is full"""
+        if len(self.sessions) >= self.max_sessions and not self._evict_lru():
+            raise HTTPException(status_code=503, detail="Too many active sessions")
+        agent = ToolsCallingAgentWithMem(
+            tools=self.tools,
+            system_prompt=self.system_prompt(),
+            llm=self.llm,
+            llm_with_tools=self.llm_with_tools,
+            recorder=self.recorder,
+            answer_cache=self.answer_cache
+        )
+        session = Session(uuid.uuid4().hex, agent)
+        self.sessions[session.session_id] = session
+        self.created += 1
+        return session
+
+    def get_session(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found or expired")
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def close_session(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            # Cancels a running memory compaction
+            session.agent.reset()
+
+    def _evict_lru(self) -> bool:
+        for session_id, session in self.sessions.items():
+            if not session.lock.locked():
+                self.close_session(session_id)
+                self.evicted += 1
+                return True
+        return False
+
+    def evict_idle(self) -> int:
+        """Remove the sessions unused for idle_seconds that are not running a turn"""
+        deadline = time.monotonic() - self.idle_seconds
+        idle = [session_id for session_id, session in self.sessions.items()
+                if session.last_used < deadline and not session.lock.locked()]
+        for session_id in idle:
+            self.close_session(session_id)
+        self.evicted += len(idle)
+        return len(idle)
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_SECONDS)
+            self.evict_idle()
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for session_id in list(self.sessions):
+            self.close_session(session_id)
+
+    async def run_turn(self, session: Session, message: str, listener: Optional[QueueListener] = None) -> str:
+        """Answer a message in a session, streaming to listener if given"""
+        async with session.lock:
+            streamer = None
+            if listener is not None:
+                streamer = ResponseStreamer()
+                streamer.add_listener(listener)
+            session.agent.streamer = streamer
+            try:
+                answer = await session.agent.process_user_message(message)
+            except Exception as e:
+                print(f"Error in session {session.session_id}: {e!r}")
+                traceback.print_exc()
+                if streamer is not None:
+                    await streamer.emit({"type": "error", "detail": turn_error_detail(session.session_id)})
+                raise
+            finally:
+                # Deliver what is queued, the error event included, and stop the drain task
+                if streamer is not None:
+                    await streamer.aclose()
+                session.agent.streamer = None
+                # The history is rebuilt from the session memory on the next turn
+                session.agent.messages = []
+                session.last_used = time.monotonic()
+            self.turns += 1
+            return answer
+
+    def metrics(self) -> dict:
+        metrics = {
+            "sessions": len(self.sessions),
+            "busy_sessions": sum(1 for session in self.sessions.values() if session.lock.locked()),
+            "sessions_created": self.created,
+            "sessions_evicted": self.evicted,
+            "turns": self.turns
+        }
+        if self.answer_cache is not None:
+            metrics["answer_cache"] = {"entries": len(self.answer_cache.entries),
+                                       "hits": self.answer_cache.hits, "misses": self.answer_cache.misses}
+        metrics["quote_cache"] = quote_cache.metrics()
+        metrics["price_sources"] = price_resolver.metrics()
+        if tracer.enabled:
+            metrics["spans"] = tracer.summary()
+        if self.recorder is not None:
+            metrics["recorder"] = {"queued": self.recorder.queue.qsize(),
+                                   "written": self.recorder.written, "failures": self.recorder.failures}
+        return metrics
+
+class MessageRequest(BaseModel):
+    message: str
+    stream: bool = False
+
+def create_app(manager: Optional[SessionManager] = None) -> FastAPI:
+    """Build the ASGI app; the default manager records conversations if MYSQL_CONVERSATION_DB is set.
+    Args:
+        manager (SessionManager): Shared session state, e.g. with a stub LLM in load tests
+    Returns:
+        FastAPI: The application
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal manager
+        if manager is None:
+            recorder = None
+            answer_cache = AnswerCache()
+            if os.getenv('MYSQL_CONVERSATION_DB'):
+                recorder = ConversationRecorder()
+                recorder.start()
+                await answer_cache.load_history()
+            manager = SessionManager(recorder=recorder, answer_cache=answer_cache)
+        app.state.manager = manager
+        await warm_encoding()
+        manager.start()
+        try:
+            yield
+        finally:
+            await manager.stop()
+            if manager.recorder is not None:
+                manager.recorder.close()
+            await close_async_pool()
+
+    app = FastAPI(title="Financial chatbot", lifespan=lifespan)
+    # Streamed turns run in their own task, referenced here until they finish
+    running_turns = set()
+
+    @app.post("/sessions")
+    async def create_session():
+        session = app.state.manager.create_session()
+        return {"session_id": session.session_id}
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str):
+        app.state.manager.get_session(session_id)
+        app.state.manager.close_session(session_id)
+        return {"session_id": session_id}
+
+    @app.post("/sessions/{session_id}/messages")
+    async def post_message(session_id: str, request: MessageRequest):
+        manager: SessionManager = app.state.manager
+        session = manager.get_session(session_id)
+        if not request.stream:
+            try:
+                answer = await manager.run_turn(session, request.message)
+            except Exception:
+                # run_turn already logged the exception
+                raise HTTPException(status_code=500, detail=turn_error_detail(session_id))
+            return {"answer": answer}
+
+        listener = QueueListener()
+
+        async def run():
+            try:
+                await manager.run_turn(session, request.message, listener)
+            except Exception:
+                # run_turn already logged the exception and streamed the error event
+                pass
+            finally:
+                await listener.queue.put(None)
+
+        # The turn finishes even if the client disconnects, so the session memory stays consistent
+        task = asyncio.create_task(run())
+        running_turns.add(task)
+        task.add_done_callback(running_turns.discard)
+
+        async def events():
+            while True:
+                event = await listener.queue.get()
+                if event is None:
+                    break
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            await task
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/metrics")
+    async def metrics():
+        return app.state.manager.metrics()
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
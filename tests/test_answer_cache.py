@@ -0,0 +1,33 @@
+import asyncio
+from answer_cache import AnswerCache
+from database import reference_cache
+
+QUESTION = "FPT lãi ròng 10 năm gần nhất"
+
+def test_question_added_while_reference_data_is_stale_matches_after_it_loads():
+    reference_cache.invalidate()
+    cache = AnswerCache()
+    cache.add(QUESTION, "answer")
+    reference_cache.load([("FPT",), ("VCB",)], [])
+    try:
+        entry = cache.find(QUESTION)
+        assert entry is not None and entry.answer == "answer"
+    finally:
+        reference_cache.invalidate()
+
+def test_keys_use_the_symbols_loaded_before_the_first_entry():
+    reference_cache.load([("FPT",), ("VCB",)], [])
+    try:
+        cache = AnswerCache()
+        asyncio.run(cache.load_symbols())
+        cache.add(QUESTION, "answer")
+    finally:
+        reference_cache.invalidate()
+    entry = cache.find(QUESTION)
+    assert entry is not None and entry.keys == frozenset({"fpt", "10"})
+    assert cache.find("VCB lãi ròng 10 năm gần nhất") is None
+
+def test_different_numbers_never_match():
+    cache = AnswerCache(symbols=["FPT"])
+    cache.add(QUESTION, "answer")
+    assert cache.find("FPT lãi ròng 5 năm gần nhất") is None
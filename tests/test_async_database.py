@@ -0,0 +1,41 @@
+import asyncio
+import async_database
+from async_database import AsyncDatabase, get_async_pool
+
+class FakePool:
+    def __init__(self):
+        self.closed = False
+        self._free = []
+        self._used = set()
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+def test_pool_of_a_finished_loop_is_closed_on_the_next_loop(monkeypatch):
+    pools = []
+    async def create_pool(**kwargs):
+        pools.append(FakePool())
+        return pools[-1]
+    monkeypatch.setattr(async_database.aiomysql, "create_pool", create_pool)
+    first = asyncio.run(get_async_pool())
+    second = asyncio.run(get_async_pool())
+    assert first is not second
+    assert first.closed and not second.closed
+    asyncio.run(async_database.close_async_pool())
+    assert second.closed
+
+def test_concurrent_stale_callers_refresh_the_reference_cache_once(monkeypatch):
+    state = {"stale": True, "refreshes": 0}
+    async def refresh(self):
+        state["refreshes"] += 1
+        await asyncio.sleep(0.01)
+        state["stale"] = False
+    monkeypatch.setattr(async_database.reference_cache, "is_stale", lambda: state["stale"])
+    monkeypatch.setattr(AsyncDatabase, "refresh_reference_cache", refresh)
+    async def run():
+        await asyncio.gather(*(AsyncDatabase().ensure_reference_cache() for _ in range(10)))
+    asyncio.run(run())
+    assert state["refreshes"] == 1
@@ -0,0 +1,77 @@
+import threading
+import time
+import pytest
+from mysql.connector.errors import PoolError
+import database
+from database import Database, get_pooled_connection, release_pooled_connection
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+    def cursor(self):
+        return FakeCursor()
+
+    def close(self):
+        self.pool.free += 1
+
+class FakeCursor:
+    def close(self):
+        pass
+
+class FakePool:
+    """Pool of `size` connections that fails like MySQLConnectionPool when all are borrowed"""
+    def __init__(self, size):
+        self.free = size
+        self.requests = 0
+
+    def get_connection(self):
+        self.requests += 1
+        if self.free == 0:
+            raise PoolError(msg="Failed getting connection; pool exhausted")
+        self.free -= 1
+        return FakeConnection(self)
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = FakePool(2)
+    monkeypatch.setattr(database, "get_connection_pool", lambda: fake)
+    monkeypatch.setattr(database, "_connection_slots", threading.BoundedSemaphore(2))
+    return fake
+
+def test_exhausted_pool_times_out_without_polling(pool):
+    first, second = get_pooled_connection(), get_pooled_connection()
+    started = time.monotonic()
+    with pytest.raises(PoolError):
+        get_pooled_connection(timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+    assert pool.requests == 2
+    release_pooled_connection(first)
+    release_pooled_connection(second)
+    assert pool.free == 2
+
+def test_waiting_borrower_gets_the_released_connection(pool):
+    held = [get_pooled_connection(), get_pooled_connection()]
+    timer = threading.Timer(0.05, release_pooled_connection, args=(held[0],))
+    timer.start()
+    connection = get_pooled_connection(timeout=5)
+    timer.join()
+    assert connection is not None and pool.requests == 3
+
+def test_database_close_returns_the_slot(pool):
+    for _ in range(5):
+        with Database() as db:
+            assert db.connection is not None
+    assert pool.free == 2
+
+def test_failed_checkout_gives_the_slot_back(pool, monkeypatch):
+    def broken():
+        raise PoolError(msg="server unreachable")
+    monkeypatch.setattr(pool, "get_connection", broken)
+    for _ in range(3):
+        with pytest.raises(PoolError):
+            get_pooled_connection(timeout=0.01)
+    assert database._connection_slots.acquire(timeout=0) and database._connection_slots.acquire(timeout=0)
@@ -0,0 +1,56 @@
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+from conversation_memory import SUMMARY_HEADER, ConversationMemory
+
+class GatedSummaryLLM:
+    """Writes the summary only once released, so turns can be added while it runs"""
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.calls = []
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages[-1].content)
+        await self.released.wait()
+        return AIMessage(content="- tóm tắt")
+
+def questions(messages):
+    return [message.content for message in messages if isinstance(message, HumanMessage)]
+
+def test_turns_added_during_compaction_are_kept():
+    async def run():
+        llm = GatedSummaryLLM()
+        memory = ConversationMemory("system", llm=llm, token_budget=30, keep_last_turns=1)
+        memory.add_turn("q1 " * 10, "a1 " * 10)
+        memory.add_turn("q2 " * 10, "a2 " * 10)
+        assert memory._compaction is not None
+        await asyncio.sleep(0)
+        # Added while the summary is being written
+        memory.add_turn("q3", "a3")
+        llm.released.set()
+        messages = await memory.messages()
+        return memory, llm, messages
+    memory, llm, messages = asyncio.run(run())
+    assert len(llm.calls) == 1 and "q1" in llm.calls[0] and "q2" not in llm.calls[0]
+    assert messages[0].content == "system" + SUMMARY_HEADER + "- tóm tắt"
+    assert questions(messages) == ["q2 " * 10, "q3"]
+    assert memory.turn_tokens == sum(tokens for _, _, tokens in memory.turns)
+
+def test_within_budget_nothing_is_folded():
+    async def run():
+        memory = ConversationMemory("system", llm=GatedSummaryLLM(), token_budget=10000, keep_last_turns=1)
+        memory.add_turn("q1", "a1")
+        memory.add_turn("q2", "a2")
+        return memory, await memory.messages()
+    memory, messages = asyncio.run(run())
+    assert memory._compaction is None and memory.summary == ""
+    assert questions(messages) == ["q1", "q2"]
+
+def test_without_llm_older_turns_are_truncated_into_the_summary():
+    async def run():
+        memory = ConversationMemory("system", token_budget=10, keep_last_turns=1)
+        memory.add_turn("q1 " * 10, "a1 " * 10)
+        memory.add_turn("q2", "a2")
+        return memory, await memory.messages()
+    memory, messages = asyncio.run(run())
+    assert memory.summary.startswith("- Người dùng: q1")
+    assert questions(messages) == ["q2"]
@@ -0,0 +1,70 @@
+from conversation_recorder import ConversationRecorder
+
+class FakeCursor:
+    def __init__(self, has_message_id):
+        self.has_message_id = has_message_id
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+    def executemany(self, query, rows):
+        self.queries.append(query)
+
+    def fetchone(self):
+        return (1 if self.has_message_id else 0,)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, has_message_id):
+        self.cursors = []
+        self.has_message_id = has_message_id
+        self.commits = 0
+
+    def is_connected(self):
+        return True
+
+    def cursor(self):
+        cursor = FakeCursor(self.has_message_id)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+def message(index):
+    return {"kind": "message", "message_id": str(index), "conversation_id": "c", "question": "q",
+            "answer": "a", "runtime_seconds": 1.0, "created_at": "2026-10-16 10:00:00"}
+
+def test_missing_message_id_column_disables_the_recorder_without_altering_the_table(tmp_path):
+    recorder = ConversationRecorder(database="db", spool_path=str(tmp_path / "spool.jsonl"))
+    recorder.connection = FakeConnection(has_message_id=False)
+    assert not recorder._write([message(1)])
+    assert recorder.disabled
+    queries = recorder.connection.cursors[0].queries
+    assert len(queries) == 1 and "ALTER" not in queries[0].upper()
+    recorder.enqueue(message(2))
+    assert recorder.queue.empty()
+
+def test_schema_is_checked_once(tmp_path):
+    recorder = ConversationRecorder(database="db", spool_path=str(tmp_path / "spool.jsonl"))
+    recorder.connection = FakeConnection(has_message_id=True)
+    assert recorder._write([message(1)])
+    assert recorder._write([message(2)])
+    assert [len(cursor.queries) for cursor in recorder.connection.cursors] == [2, 1]
+
+def test_pending_records_are_bounded(tmp_path):
+    recorder = ConversationRecorder(database="db", spool_path=str(tmp_path / "spool.jsonl"), max_pending=3)
+    snapshot = {"kind": "conversation", "conversation_id": "c"}
+    records = [snapshot] + [message(index) for index in range(5)]
+    trimmed = recorder._trim(records)
+    assert trimmed == [snapshot, message(3), message(4)]
+    assert recorder.dropped == 3
+    for index in range(5):
+        recorder.enqueue(message(index))
+    assert recorder.queue.qsize() == 3 and recorder.dropped == 5
@@ -0,0 +1,47 @@
+import asyncio
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pytest
+import async_database
+from database import Database, build_financial_data_query, to_compact_csv
+
+class RecordingCursor:
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+def test_empty_symbols_are_rejected_before_building_sql():
+    with pytest.raises(ValueError):
+        build_financial_data_query([], ["net_profit_billion_vnd"])
+
+def test_batch_with_blank_symbols_runs_no_query():
+    db = Database()
+    db.cursor = RecordingCursor()
+    with pytest.raises(ValueError):
+        db.get_financial_data_batch(["", "  "])
+    assert db.cursor.queries == []
+
+def test_async_batch_with_no_symbols_runs_no_query():
+    db = async_database.AsyncDatabase()
+    db.cursor = RecordingCursor()
+    with pytest.raises(ValueError):
+        asyncio.run(db.get_financial_data_batch([]))
+    assert db.cursor.queries == []
+
+def test_compact_csv_drops_empty_columns_and_trailing_zeros():
+    df = pd.DataFrame({
+        "symbol": ["FPT", "FPT"],
+        "year_report": [2023, 2024],
+        "revenue_billion_vnd": [Decimal("1234.50"), Decimal("15.00")],
+        "roe": [0.15123, np.nan],
+        "dividend_yield_percent": [None, None],
+    })
+    assert to_compact_csv(df, drop_columns=["symbol"]) == (
+        "year_report,revenue_billion_vnd,roe\n2023,1234.5,0.15\n2024,15,\n")
+
+def test_compact_csv_ignores_unknown_drop_columns():
+    df = pd.DataFrame({"symbol": ["VCB"], "price": [91500.0]})
+    assert to_compact_csv(df, drop_columns=["missing"]) == "symbol,price\nVCB,91500\n"
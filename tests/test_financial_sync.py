@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from database import FINANCIAL_DATA_COLUMNS, FINANCIAL_DATA_VALUE_COLUMNS, diff_financial_frames
+
+VALUE = FINANCIAL_DATA_VALUE_COLUMNS[0]
+
+def frame(rows):
+    """financial_data frame from (symbol, year_report, VALUE, yearly_volume) tuples, other columns NaN"""
+    df = pd.DataFrame(np.nan, index=range(len(rows)), columns=FINANCIAL_DATA_COLUMNS, dtype=object)
+    for i, (symbol, year_report, value, volume) in enumerate(rows):
+        df.loc[i, ["symbol", "year_report", VALUE, "yearly_volume"]] = [symbol, year_report, value, volume]
+    return df
+
+def test_insert_update_and_unchanged_rows():
+    stored = frame([("FPT", 2023, 100.0, 5000), ("VCB", 2023, 200.0, 7000)])
+    incoming = frame([
+        ("FPT", 2023, 100.004, 5000),  # equal after rounding to DECIMAL(x,2)
+        ("VCB", 2023, 210.0, 7000),
+        ("FPT", 2024, 120.0, 6000),
+    ])
+    changed, change_log = diff_financial_frames(incoming, stored)
+    assert change_log == [("VCB", 2023, "update", [VALUE]), ("FPT", 2024, "insert", [])]
+    assert changed[["symbol", "year_report"]].values.tolist() == [["VCB", 2023], ["FPT", 2024]]
+    assert list(changed.columns) == FINANCIAL_DATA_COLUMNS
+
+def test_volume_is_compared_at_scale_zero_and_nulls_match():
+    stored = frame([("FPT", 2023, np.nan, 5000)])
+    unchanged, change_log = diff_financial_frames(frame([("FPT", 2023, np.nan, 5000.2)]), stored)
+    assert change_log == [] and unchanged.empty
+    _, change_log = diff_financial_frames(frame([("FPT", 2023, 1.0, 5001)]), stored)
+    assert change_log == [("FPT", 2023, "update", [VALUE, "yearly_volume"])]
+
+def test_everything_is_an_insert_when_nothing_is_stored():
+    incoming = frame([("FPT", 2023, 100.0, 5000), ("FPT", 2023, 999.0, 1), ("VCB", 2024, np.nan, np.nan)])
+    changed, change_log = diff_financial_frames(incoming, frame([]))
+    # Duplicated keys keep their first row
+    assert change_log == [("FPT", 2023, "insert", []), ("VCB", 2024, "insert", [])]
+    assert changed[VALUE].tolist()[0] == 100.0
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+from database import dataframe_to_rows
+
+def test_nan_becomes_none_and_numpy_scalars_become_python_values():
+    df = pd.DataFrame({
+        "symbol": ["FPT", "VCB"],
+        "year_report": np.array([2023, 2024], dtype=np.int64),
+        "revenue_billion_vnd": [np.nan, 1234.5],
+    })
+    rows = dataframe_to_rows(df)
+    assert rows == [("FPT", 2023, None), ("VCB", 2024, 1234.5)]
+    assert type(rows[0][1]) is int and type(rows[1][2]) is float
+
+def test_missing_string_becomes_none():
+    df = pd.DataFrame({"symbol": ["FPT", None], "organ_name": [np.nan, "Vietcombank"]})
+    assert dataframe_to_rows(df) == [("FPT", None), (None, "Vietcombank")]
+
+def test_empty_frame_has_no_rows():
+    assert dataframe_to_rows(pd.DataFrame(columns=["symbol", "year_report"])) == []
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+import pandas as pd
+from ohlcv_store import OHLCV_COLUMNS, backfill_symbol, close_quote, get_closing_quotes
+from tools.quote_cache import HOSE_TIMEZONE
+
+class BulkInsertRecorder:
+    def __init__(self):
+        self.inserts = []
+
+    def bulk_insert(self, table, columns, rows, update_columns=None):
+        self.inserts.append((table, columns, rows, update_columns))
+        return len(rows)
+
+def history(*days):
+    """Bar source returning one bar per day of October 2026, recording the requested range"""
+    requests = []
+    def fetch_history(symbol, start, end):
+        requests.append((symbol, start, end))
+        return pd.DataFrame({
+            "trade_date": [f"2026-10-{day:02d}" for day in days],
+            "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 100,
+        })
+    return fetch_history, requests
+
+def test_bar_of_a_session_still_trading_is_dropped():
+    db = BulkInsertRecorder()
+    fetch_history, requests = history(14, 15, 16)
+    assert backfill_symbol(db, "FPT", date(2026, 10, 13), fetch_history, end=date(2026, 10, 15)) == 2
+    assert requests == [("FPT", "2026-10-14", "2026-10-15")]
+    table, columns, rows, update_columns = db.inserts[0]
+    assert table == "daily_ohlcv" and columns == OHLCV_COLUMNS
+    assert [(row[0], str(row[1])) for row in rows] == [("FPT", "2026-10-14"), ("FPT", "2026-10-15")]
+    assert "close" in update_columns and "symbol" not in update_columns
+
+def test_symbol_without_bars_starts_at_the_backfill_start():
+    db = BulkInsertRecorder()
+    fetch_history, requests = history()
+    assert backfill_symbol(db, "VCB", None, fetch_history, start="2015-01-01", end=date(2026, 10, 16)) == 0
+    assert requests == [("VCB", "2015-01-01", "2026-10-16")]
+    assert db.inserts == []
+
+def test_stored_closes_are_not_used_while_a_trading_day_is_in_progress():
+    # Answered without a query, at the lunch break
+    assert get_closing_quotes(["FPT"], now=datetime(2026, 10, 16, 12, tzinfo=HOSE_TIMEZONE)) == {}
+
+def test_close_quote_is_timestamped_at_the_close():
+    quote = close_quote(95000, date(2026, 10, 16))
+    assert (quote.price, quote.source) == (95000.0, "ohlcv_store")
+    assert quote.fetched_at == datetime(2026, 10, 16, 15, tzinfo=HOSE_TIMEZONE)
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tools.quote_cache import Quote, QuoteCache
+
+# The default board and store come from the price source clients
+BatchPriceLookup = pytest.importorskip("tools.price_lookup").BatchPriceLookup
+
+class Recorder:
+    """Source stub answering from a dict and recording the symbols it was asked for"""
+    def __init__(self, prices, wrap=None):
+        self.prices = prices
+        self.wrap = wrap
+        self.requests = []
+
+    def __call__(self, symbols):
+        self.requests.append(list(symbols))
+        found = {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+        return {symbol: self.wrap(price) for symbol, price in found.items()} if self.wrap else found
+
+def make_lookup(cached=(), stored=(), board=(), single=()):
+    fetch = Recorder(dict(single))
+    cache = QuoteCache(lambda symbol: fetch([symbol]).get(symbol))
+    for symbol, price in dict(cached).items():
+        cache.put(symbol, Quote(price, "vnd"))
+    store = Recorder(dict(stored), wrap=lambda price: Quote(price, "ohlcv_store"))
+    board_source = Recorder(dict(board))
+    lookup = BatchPriceLookup(cache, stored=store, board=board_source, executor=ThreadPoolExecutor(max_workers=4))
+    return lookup, store, board_source, fetch
+
+def test_each_symbol_goes_to_the_first_source_that_has_it():
+    lookup, store, board, fetch = make_lookup(
+        cached={"FPT": 95000.0}, stored={"VCB": 91000.0}, board={"HPG": 27000.0, "XXX": 1.0},
+        single={"MWG": 60000.0, "SSI": 33000.0})
+    quotes = lookup.get_quotes(["FPT", "VCB", "HPG", "MWG", "SSI", "BAD"])
+    assert {symbol: quote and (quote.price, quote.source) for symbol, quote in quotes.items()} == {
+        "FPT": (95000.0, "cache:vnd"),
+        "VCB": (91000.0, "ohlcv_store"),
+        "HPG": (27000.0, "vnstock_board"),
+        "MWG": (60000.0, None),
+        "SSI": (33000.0, None),
+        "BAD": None,
+    }
+    assert store.requests == [["VCB", "HPG", "MWG", "SSI", "BAD"]]
+    assert board.requests == [["HPG", "MWG", "SSI", "BAD"]]
+    assert sorted(request[0] for request in fetch.requests) == ["BAD", "MWG", "SSI"]
+
+def test_prices_from_the_store_and_the_board_are_cached():
+    lookup, store, board, fetch = make_lookup(stored={"VCB": 91000.0}, board={"HPG": 27000.0})
+    lookup.get_quotes(["VCB", "HPG"])
+    quotes = lookup.get_quotes(["VCB", "HPG"])
+    assert [quotes[symbol].source for symbol in ("VCB", "HPG")] == ["cache:ohlcv_store", "cache:vnstock_board"]
+    assert len(store.requests) == 1 and len(board.requests) == 1
+
+def test_a_single_symbol_skips_the_board():
+    lookup, store, board, fetch = make_lookup(board={"FPT": 95000.0}, single={"FPT": 95100.0})
+    assert lookup.get_quote(" fpt.VN").price == 95100.0
+    assert store.requests == [["FPT"]] and board.requests == [] and fetch.requests == [["FPT"]]
+
+def test_lookup_keeps_the_requested_order_and_reports_missing_symbols():
+    lookup, _, _, _ = make_lookup(board={"VCB": 91000.0, "FPT": 95000.0})
+    table = lookup.lookup(["vcb", "BAD", "FPT", "VCB", " "])
+    assert table["symbol"].tolist() == ["VCB", "BAD", "FPT"]
+    assert table["source"].tolist() == ["vnstock_board", "unavailable", "vnstock_board"]
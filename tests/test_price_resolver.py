@@ -0,0 +1,33 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tools.price_resolver import HedgedPriceResolver, PriceSource, to_vnd
+
+def make_resolver(*sources):
+    return HedgedPriceResolver(list(sources), hedge_delay=0.05, timeout=1,
+                               executor=ThreadPoolExecutor(max_workers=4))
+
+def test_source_in_thousands_of_vnd_converts_before_it_wins():
+    def slow_vnd(symbol):
+        time.sleep(0.5)
+        return 91500.0
+    resolver = make_resolver(PriceSource("vnd", slow_vnd, timeout=1),
+                             PriceSource("thousands", lambda symbol: to_vnd(91.5)))
+    assert resolver.resolve("VCB") == (91500.0, "thousands")
+
+def test_resolver_does_not_convert_prices_again():
+    resolver = make_resolver(PriceSource("raw", lambda symbol: 91.5))
+    assert resolver.resolve("VCB") == (91.5, "raw")
+
+def test_price_in_vnd_is_unchanged():
+    resolver = make_resolver(PriceSource("vnd", lambda symbol: 91500))
+    assert resolver.resolve("VCB") == (91500.0, "vnd")
+
+def test_to_vnd():
+    assert to_vnd(91.5) == 91500
+    assert to_vnd(91500) == 91500
+
+def test_failed_sources_open_their_breaker():
+    resolver = make_resolver(PriceSource("down", lambda symbol: None), PriceSource("up", lambda symbol: 50000.0))
+    for _ in range(3):
+        assert resolver.resolve("FPT") == (50000.0, "up")
+    assert resolver.sources[0].breaker.state == "open"
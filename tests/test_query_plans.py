@@ -0,0 +1,54 @@
+from database import Database, SCHEMA_INDEXES
+
+COLUMNS = ("id", "select_type", "table", "type", "possible_keys", "key")
+
+class PlanCursor:
+    """Answers every EXPLAIN with the same plan rows"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = [(column,) for column in COLUMNS]
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+    def fetchall(self):
+        return self.rows
+
+class PlanConnection:
+    def __init__(self, cursor):
+        self.prepared_cursor = cursor
+
+    def cursor(self, prepared=False):
+        return self.prepared_cursor
+
+def database_with_plan(rows):
+    cursor = PlanCursor(rows)
+    db = Database()
+    db.cursor = cursor
+    db.connection = PlanConnection(cursor)
+    return db
+
+def test_full_scan_is_reported():
+    db = database_with_plan([(1, "SIMPLE", "financial_data", "ALL", None, None)])
+    problems = db.check_query_plans()
+    assert len(problems) == 3
+    assert all("full scan of financial_data" in problem for problem in problems)
+
+def test_access_without_a_key_is_reported():
+    db = database_with_plan([(1, "SIMPLE", "industry_scores", "index_merge", "idx_industry_rank", None)])
+    problems = db.check_query_plans()
+    assert len(problems) == 3
+    assert all("uses no index" in problem for problem in problems)
+
+def test_index_backed_plan_has_no_problems():
+    db = database_with_plan([
+        (1, "PRIMARY", "l", "ref", "PRIMARY,idx_industry_code_lv2", "idx_industry_code_lv2"),
+        (1, "PRIMARY", "f", "ref", "unique_record", "unique_record"),
+        (2, "DEPENDENT SUBQUERY", None, None, None, None),
+    ])
+    assert db.check_query_plans() == []
+    assert all(query.startswith("EXPLAIN ") for query in db.cursor.queries)
+
+def test_no_index_duplicates_the_financial_data_unique_key():
+    assert all(table != "financial_data" for table, _, _ in SCHEMA_INDEXES)
@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from tools.quote_cache import HOSE_TIMEZONE, QuoteCache, last_close_date, next_open, quote_ttl, session_in_progress
+
+def hose(day, hour, minute=0):
+    """Time in Vietnam on a day of October 2026; the 16th is a Friday, the 19th a Monday"""
+    return datetime(2026, 10, day, hour, minute, tzinfo=HOSE_TIMEZONE)
+
+def test_trading_ttl_while_a_session_is_open():
+    assert quote_ttl(hose(16, 9), trading_ttl=15) == 15
+    assert quote_ttl(hose(16, 14, 59), trading_ttl=15) == 15
+
+def test_lunch_break_lasts_until_the_afternoon_session():
+    assert next_open(hose(16, 11, 30)) == hose(16, 13)
+    assert quote_ttl(hose(16, 12), trading_ttl=15) == 3600
+    assert session_in_progress(hose(16, 12))
+
+def test_after_the_close_lasts_until_the_next_morning():
+    assert next_open(hose(15, 15)) == hose(16, 9)
+    assert quote_ttl(hose(15, 15), trading_ttl=15) == 18 * 3600
+    assert not session_in_progress(hose(15, 15))
+    assert last_close_date(hose(15, 15)) == date(2026, 10, 15)
+    assert last_close_date(hose(15, 14, 59)) == date(2026, 10, 14)
+
+def test_weekends_last_until_monday():
+    assert next_open(hose(16, 16)) == hose(19, 9)
+    assert next_open(hose(17, 8)) == hose(19, 9)
+    assert next_open(hose(18, 10)) == hose(19, 9)
+    assert quote_ttl(hose(18, 9), trading_ttl=15) == 24 * 3600
+    assert not session_in_progress(hose(17, 10))
+    assert last_close_date(hose(19, 10)) == date(2026, 10, 16)
+
+def test_before_the_open_lasts_until_the_morning_session():
+    assert next_open(hose(16, 8, 59)) == hose(16, 9)
+    # Never shorter than the trading TTL
+    assert quote_ttl(hose(16, 8, 59), trading_ttl=120) == 120
+
+def test_concurrent_misses_fetch_once():
+    release = threading.Event()
+    calls = []
+    def fetch(symbol):
+        calls.append(symbol)
+        release.wait(5)
+        return 95000.0
+    cache = QuoteCache(fetch)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(cache.get, " fpt") for _ in range(8)]
+        while cache.coalesced < 7:
+            time.sleep(0.01)
+        release.set()
+        prices = [future.result() for future in futures]
+    assert prices == [95000.0] * 8 and calls == ["FPT"]
+    assert cache.metrics() == {"entries": 1, "hits": 0, "misses": 1, "coalesced": 7}
+    assert cache.get("FPT") == 95000.0 and cache.hits == 1
+
+def test_failed_fetch_is_not_cached():
+    answers = iter([None, 96000.0])
+    cache = QuoteCache(lambda symbol: next(answers))
+    assert cache.get("VCB") is None
+    assert cache.get("VCB") == 96000.0
+    assert cache.misses == 2
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+from ranking import rank_companies, score_companies
+from benchmarks.ranking_benchmark import COLUMNS, legacy_scores, make_industry
+
+def test_score_companies_matches_the_original_loop():
+    rng = np.random.default_rng(11)
+    for n in [1, 2, 5, 10, 20, 100]:
+        rows = make_industry(n, rng, missing_rate=0.2)
+        scored, _ = score_companies(pd.DataFrame(rows, columns=COLUMNS), verbose=False)
+        assert list(zip(scored['symbol'], scored['composite_score'])) == legacy_scores(rows)
+
+def test_rank_companies_scores_each_industry_like_score_companies():
+    rng = np.random.default_rng(5)
+    industries = {f"{code:04d}": make_industry(size, rng) for code, size in enumerate([3, 7, 12])}
+    rows = [row + (code,) for code, industry in industries.items() for row in industry]
+    ranked = rank_companies(pd.DataFrame(rows, columns=COLUMNS + ['industry_code_lv2']))
+    for code, industry in industries.items():
+        group = ranked[ranked['industry_code_lv2'] == code]
+        assert list(zip(group['symbol'], group['composite_score'])) == legacy_scores(industry)
+        assert group['rank'].tolist() == list(range(1, len(industry) + 1))
@@ -0,0 +1,46 @@
+import database
+from database import ReferenceDataCache
+
+LISTING = [("FPT",), ("VCB",)]
+INDUSTRIES = [("FPT", "FPT Corp", "Technology", 9500), ("VCB", "Vietcombank", "Banks", 8300)]
+
+class CountingCache(ReferenceDataCache):
+    """Loads fixed rows instead of reading MySQL, counting the reloads"""
+    def __init__(self, ttl):
+        super().__init__(ttl)
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+        self.load(LISTING, INDUSTRIES)
+
+def test_lookups_within_the_ttl_are_served_from_memory(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    cache = CountingCache(ttl=60)
+    assert cache.get_all_symbols() == ["FPT", "VCB"]
+    assert cache.get_symbols_by_industry(" 8300 ") == ["VCB"]
+    assert cache.get_company_info("fpt")["organ_name"] == "FPT Corp"
+    assert cache.get_industries_list() == [
+        {"industry_code_lv2": "9500", "industry_name_lv2": "Technology"},
+        {"industry_code_lv2": "8300", "industry_name_lv2": "Banks"},
+    ]
+    now[0] += 60
+    cache.get_all_symbols()
+    assert cache.refreshes == 1
+    now[0] += 1
+    cache.get_all_symbols()
+    assert cache.refreshes == 2
+
+def test_invalidate_reloads_on_the_next_lookup():
+    cache = CountingCache(ttl=3600)
+    cache.get_all_symbols()
+    cache.invalidate()
+    assert cache.is_stale()
+    assert cache.get_company_info("VCB")["industry_code_lv2"] == 8300
+    assert cache.refreshes == 2
+
+def test_unknown_keys_return_empty_results():
+    cache = CountingCache(ttl=3600)
+    assert cache.get_company_info("XYZ") == {}
+    assert cache.get_symbols_by_industry("0000") == []
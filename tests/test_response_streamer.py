@@ -0,0 +1,51 @@
+import asyncio
+from tools.response_streamer import ListenerChannel, ResponseStreamListener
+
+class StalledListener(ResponseStreamListener):
+    """Receives nothing until released, so the channel queue fills up"""
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.texts = []
+        self.events = []
+
+    async def on_stream(self, text: str):
+        await self.released.wait()
+        self.texts.append(text)
+
+    async def on_event(self, event: dict):
+        await self.released.wait()
+        self.events.append(event["type"])
+
+def test_coalesce_stays_bounded_when_the_last_item_is_an_event():
+    async def run():
+        listener = StalledListener()
+        channel = ListenerChannel(listener, max_queue=8, overflow="coalesce")
+        for i in range(20):
+            await channel.put_text(f"a{i} ")
+        await channel.put_event({"type": "answer_reset"})
+        assert len(channel.queue) <= channel.max_queue
+        for i in range(100):
+            await channel.put_text(f"b{i} ")
+            assert len(channel.queue) <= channel.max_queue
+        listener.released.set()
+        await channel.flush()
+        await channel.close()
+        return listener
+    listener = asyncio.run(run())
+    text = "".join(listener.texts)
+    # Nothing lost or reordered around the event
+    assert text == "".join(f"a{i} " for i in range(20)) + "".join(f"b{i} " for i in range(100))
+    assert listener.events == ["answer_reset"]
+
+def test_drop_discards_text_when_full():
+    async def run():
+        listener = StalledListener()
+        channel = ListenerChannel(listener, max_queue=4, overflow="drop")
+        for i in range(10):
+            await channel.put_text(str(i))
+        assert len(channel.queue) <= channel.max_queue
+        dropped = channel.dropped
+        await channel.close()
+        return dropped
+    # The drain task may already hold the first chunk
+    assert asyncio.run(run()) >= 5
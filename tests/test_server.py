@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+
+# The server imports the agent module, which needs the LLM provider packages and the price source clients
+server = pytest.importorskip("server")
+from fastapi.testclient import TestClient
+
+SECRET = "password=hunter2 at db.internal:3306"
+
+class StubLLM:
+    model = "stub"
+
+    def bind_tools(self, tools):
+        return self
+
+class FailingAgent:
+    def __init__(self):
+        self.streamer = None
+        self.messages = []
+
+    async def process_user_message(self, message):
+        raise RuntimeError(SECRET)
+
+    def reset(self):
+        pass
+
+def failing_session(manager):
+    session = server.Session("s1", FailingAgent())
+    manager.sessions[session.session_id] = session
+    return session
+
+def test_streamed_error_event_does_not_leak_the_exception():
+    manager = server.SessionManager(llm=StubLLM(), tools=[])
+    session = failing_session(manager)
+    listener = server.QueueListener()
+    with pytest.raises(RuntimeError):
+        asyncio.run(manager.run_turn(session, "hi", listener))
+    events = []
+    while not listener.queue.empty():
+        events.append(listener.queue.get_nowait())
+    assert events == [{"type": "error", "detail": server.turn_error_detail("s1")}]
+
+def test_failed_turn_returns_a_generic_500():
+    manager = server.SessionManager(llm=StubLLM(), tools=[])
+    failing_session(manager)
+    with TestClient(server.create_app(manager)) as client:
+        response = client.post("/sessions/s1/messages", json={"message": "hi"})
+    assert response.status_code == 500
+    assert response.json()["detail"] == server.turn_error_detail("s1")
+    assert SECRET not in response.text
@@ -0,0 +1,52 @@
+from tool_result_cache import PRICE_TOOLS, ToolResultCache, compact_tool_content
+
+def call(call_id, name="get_financial_data_tool", **args):
+    return {"id": call_id, "name": name, "args": args or {"symbol": "fpt"}}
+
+def run(cache, tool_call, content=None):
+    """Look a call up like the agent does, storing content on a miss"""
+    key = cache.key(tool_call)
+    cached = cache.lookup(key, tool_call)
+    if cached is None:
+        cache.store(key, content)
+    return cached
+
+def test_equivalent_arguments_share_a_key():
+    cache = ToolResultCache()
+    assert cache.key(call("1", symbols=[" vcb", "FPT"], year=None)) == cache.key(call("2", symbols=["fpt", "VCB"]))
+
+def test_repeated_call_is_a_back_reference_then_the_cached_payload():
+    cache = ToolResultCache()
+    assert run(cache, call("1"), "year_report,roe\n2024,0.2\n") is None
+    assert run(cache, call("2", symbol=" FPT ")) == "Same result as tool call 1 above (get_financial_data_tool), not repeated."
+    cache.new_turn()
+    assert run(cache, call("3")) == "year_report,roe\n2024,0.2\n"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolResultCache(max_entries=2)
+    run(cache, call("1", symbol="FPT"), "fpt")
+    run(cache, call("2", symbol="VCB"), "vcb")
+    run(cache, call("3", symbol="FPT"))
+    run(cache, call("4", symbol="HPG"), "hpg")
+    assert cache.key(call("5", symbol="VCB")) not in cache.entries
+    assert cache.key(call("6", symbol="FPT")) in cache.entries
+
+def test_failed_call_is_retried():
+    cache = ToolResultCache()
+    tool_call = call("1")
+    key = cache.key(tool_call)
+    cache.lookup(key, tool_call)
+    cache.discard(key)
+    assert cache.lookup(key, call("2")) is None
+
+def test_price_tools_are_never_cached():
+    cache = ToolResultCache()
+    for name in PRICE_TOOLS:
+        assert cache.key(call("1", name=name, symbol="FPT")) is None
+        assert cache.key(call("1", name=name.upper(), symbol="FPT")) is None
+
+def test_compaction_of_tables_and_json():
+    assert compact_tool_content("symbol,roe,empty\nFPT,0.2500,\nVCB,0.0012,None\n") == "symbol,roe\nFPT,0.25\nVCB,0.0012\n"
+    assert compact_tool_content({"symbol": "FPT", "price": [1, 2]}) == '{"symbol":"FPT","price":[1,2]}'
+    assert compact_tool_content("Không tìm thấy dữ liệu") == "Không tìm thấy dữ liệu"
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from tools.response_streamer import ResponseStreamer
+
+# The agent module imports the LLM provider packages and the price source clients
+ToolsCallingAgentWithMem = pytest.importorskip("tools_summ_mem").ToolsCallingAgentWithMem
+
+class StubLLM:
+    """Chat model whose stream yields the given chunks and whose ainvoke answers `answer`"""
+    model = "stub"
+
+    def __init__(self, chunks=(), answer="invoked"):
+        self.chunks = list(chunks)
+        self.answer = answer
+        self.invocations = 0
+
+    async def astream(self, messages):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def ainvoke(self, messages):
+        self.invocations += 1
+        return AIMessage(content=self.answer)
+
+def make_agent(llm, **kwargs):
+    return ToolsCallingAgentWithMem(llm=llm, llm_with_tools=llm, streamer=ResponseStreamer(), **kwargs)
+
+def test_stream_without_chunks_falls_back_to_ainvoke():
+    llm = StubLLM(chunks=[])
+    agent = make_agent(llm)
+    response = asyncio.run(agent._call_llm())
+    assert isinstance(response, AIMessage) and response.content == "invoked"
+    assert llm.invocations == 1
+
+@tool
+async def slow_echo(text: str, delay: float) -> str:
+    """Echo text after delay seconds"""
+    await asyncio.sleep(delay)
+    return text
+
+@tool
+def failing_tool(text: str) -> str:
+    """Always fails"""
+    raise ValueError("bad input")
+
+def tool_call(call_id, name, **args):
+    return {"id": call_id, "name": name, "args": args}
+
+def test_tool_messages_keep_the_order_of_the_tool_calls():
+    agent = make_agent(StubLLM(), tools=[slow_echo, failing_tool], tool_concurrency=3)
+    calls = [tool_call("1", "slow_echo", text="first", delay=0.2),
+             tool_call("2", "slow_echo", text="second", delay=0.0),
+             tool_call("3", "failing_tool", text="x")]
+    messages = asyncio.run(agent.run_tool_calls(calls))
+    assert [message.tool_call_id for message in messages] == ["1", "2", "3"]
+    assert [message.content for message in messages[:2]] == ["first", "second"]
+    assert messages[2].status == "error" and "bad input" in messages[2].content
+
+def test_timed_out_tool_call_becomes_an_error_message():
+    agent = make_agent(StubLLM(), tools=[slow_echo], tool_timeout=0.05)
+    started = time.perf_counter()
+    fast, slow = asyncio.run(agent.run_tool_calls([
+        tool_call("1", "slow_echo", text="fast", delay=0.0),
+        tool_call("2", "slow_echo", text="slow", delay=5.0),
+    ]))
+    assert time.perf_counter() - started < 1
+    assert fast.content == "fast" and fast.status != "error"
+    assert slow.status == "error" and slow.tool_call_id == "2" and "timed out" in slow.content
+
+def test_unknown_tool_becomes_an_error_message():
+    agent = make_agent(StubLLM(), tools=[])
+    message, = asyncio.run(agent.run_tool_calls([tool_call("1", "missing")]))
+    assert message.status == "error" and "unknown tool" in message.content
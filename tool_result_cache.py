@@ -0,0 +1,142 @@
+"""Per-conversation cache and compaction of tool results for ToolsCallingAgentWithMem.
+
+Tool calls are keyed on tool name and normalized arguments (trimmed, symbols uppercased,
+lists sorted, None arguments dropped). A repeated call is answered from the cache without
+running the tool. Within the same turn its ToolMessage is only a back-reference to the earlier
+one, which is still in the context. In a later turn the cached payload is sent again, since
+the agent drops the tool messages of finished turns. Results are compacted before they
+enter the message list: tables as CSV without all-null columns and with at most 2 decimals,
+lists and dicts as JSON without whitespace.
+"""
+import csv
+import io
+import json
+import os
+import re
+import pandas as pd
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Any, Iterable, Optional
+from database import to_compact_csv
+load_dotenv()
+
+TOOL_RESULT_CACHE_SIZE = int(os.getenv('TOOL_RESULT_CACHE_SIZE', 64))
+# Tools returning live prices, which must be fetched every time
+PRICE_TOOLS = {"get_current_stock_price", "get_current_stock_price_tool", "get_current_stock_prices"}
+UNCACHED_TOOLS = set(PRICE_TOOLS)
+SYMBOL_ARGS = {"symbol", "symbols"}
+NULL_CELLS = {"", "None", "nan", "NaN", "null", "NULL"}
+DECIMAL_CELL = re.compile(r"^-?\d+\.\d+$")
+
+def normalize_args(args: dict) -> str:
+    """Cache key part for tool arguments: equivalent argument sets give the same string"""
+    def normalize(key: str, value: Any) -> Any:
+        if isinstance(value, str):
+            value = value.strip()
+            return value.upper() if key in SYMBOL_ARGS else value
+        if isinstance(value, (list, tuple)):
+            return sorted((normalize(key, item) for item in value), key=repr)
+        return value
+    normalized = {key: normalize(key, value) for key, value in args.items() if value is not None}
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+def _compact_number(cell: str) -> str:
+    value = float(cell)
+    compact = f"{value:.2f}".rstrip('0').rstrip('.')
+    # Keep small ratios readable instead of rounding them to 0
+    return compact if compact not in ("0", "-0") or value == 0 else f"{value:.2g}"
+
+def compact_csv_text(text: str) -> Optional[str]:
+    """Compact CSV text like database.to_compact_csv does for DataFrames.
+    Returns:
+        str: Compacted CSV, or None if text is not a rectangular CSV table
+    """
+    lines = text.strip().splitlines()
+    if len(lines) < 2 or "," not in lines[0]:
+        return None
+    try:
+        rows = list(csv.reader(lines))
+    except csv.Error:
+        return None
+    width = len(rows[0])
+    if any(len(row) != width for row in rows):
+        return None
+    keep = [j for j in range(width) if any(row[j] not in NULL_CELLS for row in rows[1:])]
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow([rows[0][j] for j in keep])
+    for row in rows[1:]:
+        writer.writerow([_compact_number(row[j]) if DECIMAL_CELL.match(row[j]) else row[j] for j in keep])
+    return output.getvalue()
+
+def compact_tool_content(result: Any) -> Any:
+    """Turn a tool result into compact ToolMessage content.
+    Args:
+        result: Value returned by the tool
+    Returns:
+        str: Compact text; the result unchanged if it is not a table, list or dict
+    """
+    if isinstance(result, pd.DataFrame):
+        return to_compact_csv(result)
+    if isinstance(result, str):
+        return compact_csv_text(result) or result
+    if isinstance(result, (list, dict)):
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str)
+    return result
+
+class ToolResultCache:
+    """Tool results of one conversation, least recently used entries evicted first"""
+    def __init__(self, max_entries: int = TOOL_RESULT_CACHE_SIZE, uncached_tools: Iterable[str] = UNCACHED_TOOLS):
+        self.max_entries = max_entries
+        self.uncached_tools = set(uncached_tools)
+        # key -> {"content": ..., "tool_call_id": ..., "turn": ...}; content is None while the call runs
+        self.entries: OrderedDict = OrderedDict()
+        self.turn = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_turn(self):
+        """Called when a user message starts a turn: earlier tool messages are no longer in the context"""
+        self.turn += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def key(self, tool_call: dict) -> Optional[str]:
+        """Cache key of a tool call, None if the tool is not cached"""
+        name = tool_call['name'].lower()
+        if name in self.uncached_tools:
+            return None
+        return f"{name}:{normalize_args(tool_call.get('args') or {})}"
+
+    def lookup(self, key: str, tool_call: dict) -> Optional[str]:
+        """Content for a repeated tool call, or None on a miss (the call is then registered as running)
+        Args:
+            key (str): Result of key()
+            tool_call (dict): The tool call being answered
+        Returns:
+            str: Back-reference to a tool message of the current turn, or the cached payload
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            self.entries[key] = {"content": None, "tool_call_id": tool_call['id'], "turn": self.turn}
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        if entry["turn"] == self.turn:
+            return f"Same result as tool call {entry['tool_call_id']} above ({tool_call['name']}), not repeated."
+        entry["turn"] = self.turn
+        entry["tool_call_id"] = tool_call['id']
+        return entry["content"]
+
+    def store(self, key: str, content: Any):
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["content"] = content
+
+    def discard(self, key: str):
+        """Forget a call that failed, so it is retried next time"""
+        self.entries.pop(key, None)
@@ -0,0 +1,16 @@
+"""Current prices of many symbols in one tool call, see tools/price_lookup.py for the lookup order."""
+from typing import List
+from langchain_core.tools import tool
+from database import to_compact_csv
+from tools.get_current_stock_price_tool import price_lookup
+
+@tool
+def get_current_stock_prices(symbols: List[str]) -> str:
+    """Get the current stock prices of several symbols in one call. Use it instead of calling
+    get_current_stock_price once per symbol.
+    Args:
+        symbols (list[str]): Stock symbols, e.g. ["VCB", "BID", "CTG"]
+    Returns:
+        str: compact csv with symbol, price (VND), source and timestamp per symbol
+    """
+    return to_compact_csv(price_lookup.lookup(symbols))
@@ -1,5 +1,5 @@
 from langchain_core.tools import tool
-from database import Database
+from database import Database, reference_cache
 @tool
 def get_industries_list() -> list[str]:
     """Get list of industries.
@@ -9,13 +9,9 @@ def get_industries_list() -> list[str]:
               {"industry_code_lv2": "2000", "industry_name_lv2": "Ngành công nghiệp"}]
     """
     try:
-        database = Database()
-        industries = database.get_industries_list()
-        return industries
+        return reference_cache.get_industries_list()
     except Exception as e:
         return f"Error getting industries list: {e}"
-    finally:
-        database.close()
 
 @tool
 def get_symbols_by_industry(industry_code_lv2: str) -> list[str]:
@@ -24,13 +20,9 @@ def get_symbols_by_industry(industry_code_lv2: str) -> list[str]:
         industry_code_lv2 (str): Industry code of the industry
     """
     try:
-        database = Database()
-        symbols = database.get_symbols_by_industry(industry_code_lv2)
-        return symbols
+        return reference_cache.get_symbols_by_industry(industry_code_lv2)
     except Exception as e:
         return f"Error getting symbols by industry: {e}"
-    finally:
-        database.close()
 
 @tool
 def get_financial_data(symbol: str, year: list[int] = None) -> dict:
@@ -40,13 +32,11 @@ def get_financial_data(symbol: str, year: list[int] = None) -> dict:
         year (list[int]): List of years, if None, get all years
     """
     try:
-        database = Database()
-        financial_data = database.get_financial_data(symbol, year)
-        return financial_data
+        with Database() as database:
+            financial_data = database.get_financial_data(symbol, year)
+            return financial_data
     except Exception as e:
         return f"Error getting financial data: {e}"
-    finally:
-        database.close()
 
 @tool
 def get_best_stocks_by_industry(industry_code_lv2: str, num_stocks: int = 5) -> list[str]:
@@ -58,10 +48,8 @@ def get_best_stocks_by_industry(industry_code_lv2: str, num_stocks: int = 5) ->
         list[str]: List of symbols
     """
     try:
-        database = Database()
-        symbols = database.get_best_stocks_by_industry(industry_code_lv2, num_stocks)
-        return symbols
+        with Database() as database:
+            symbols = database.get_best_stocks_by_industry(industry_code_lv2, num_stocks)
+            return symbols
     except Exception as e:
         return f"Error getting best stocks by industry: {e}"
-    finally:
-        database.close()
@@ -0,0 +1,98 @@
+"""Price lookups through the shared quote cache, the local OHLCV store and a bulk price board.
+
+Symbols with a valid quote in the quote cache are answered from it. Outside a trading day the
+others are read together from the local OHLCV store (ohlcv_store.py); the rest are requested
+together from a bulk price board (one request for the whole list). Whatever the board does not
+return is resolved per symbol, concurrently, through the quote cache and the hedged price
+sources. A single symbol skips the board: the hedged sources answer it as fast. Every source is
+injectable, so BatchPriceLookup can run against local stubs offline.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from tools.quote_cache import Quote, QuoteCache, HOSE_TIMEZONE
+from tools.price_resolver import PRICE_RESOLVER_WORKERS
+from tools.price_sources import get_vnstock_price_board
+from ohlcv_store import get_closing_quotes
+
+class BatchPriceLookup:
+    def __init__(self,
+                 cache: QuoteCache,
+                 stored: Optional[Callable[[List[str]], Dict[str, Quote]]] = get_closing_quotes,
+                 board: Optional[Callable[[List[str]], Dict[str, float]]] = get_vnstock_price_board,
+                 board_name: str = "vnstock_board",
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Args:
+            cache (QuoteCache): Quote cache, its fetch function resolves single symbols
+            stored (Callable): Local source returning {symbol: Quote} for a list of symbols, None to disable
+            board (Callable): Bulk source returning {symbol: price} for a list of symbols, None to disable
+            board_name (str): Source name reported for prices from the board
+            executor (ThreadPoolExecutor): Runs the per-symbol lookups concurrently
+        """
+        self.cache = cache
+        self.stored = stored
+        self.board = board
+        self.board_name = board_name
+        self.executor = executor or ThreadPoolExecutor(max_workers=PRICE_RESOLVER_WORKERS, thread_name_prefix="batch-price")
+
+    def get_quotes(self, symbols: List[str], use_board: bool = True) -> Dict[str, Optional[Quote]]:
+        """Current quotes of symbols.
+        Args:
+            symbols (list[str]): Normalized stock symbols, without duplicates
+            use_board (bool): Request the symbols missing from the cache and the store from the board
+        Returns:
+            dict: {symbol: Quote}, None for symbols no source had a price for
+        """
+        quotes: Dict[str, Optional[Quote]] = {}
+        for symbol in symbols:
+            quote = self.cache.peek(symbol)
+            if quote is not None:
+                quotes[symbol] = Quote(quote.price, f"cache:{quote.source}" if quote.source else "cache", quote.fetched_at)
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing and self.stored is not None:
+            # Empty without a query while a trading day is in progress
+            for symbol, quote in self.stored(missing).items():
+                self.cache.put(symbol, quote)
+                quotes[symbol] = quote
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing and use_board and self.board is not None:
+            requested = set(missing)
+            for symbol, price in self.board(missing).items():
+                if symbol in requested and price is not None and price > 0:
+                    quote = Quote(price, self.board_name)
+                    self.cache.put(symbol, quote)
+                    quotes[symbol] = quote
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if len(missing) == 1:
+            quotes[missing[0]] = self.cache.get_quote(missing[0])
+        else:
+            # Gaps of the board, one hedged lookup per symbol, all at once
+            for symbol, quote in zip(missing, self.executor.map(self.cache.get_quote, missing)):
+                quotes[symbol] = quote
+        return quotes
+
+    def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Current quote of one symbol: cache, then store, then the hedged sources"""
+        symbol = symbol.strip().upper().replace(".VN", "")
+        return self.get_quotes([symbol], use_board=False)[symbol]
+
+    def lookup(self, symbols: List[str]) -> pd.DataFrame:
+        """Current prices of symbols.
+        Args:
+            symbols (list[str]): Stock symbols, duplicates and case are ignored
+        Returns:
+            dataframe: symbol, price, source and timestamp (Vietnam time) per symbol, in the given order;
+            price and timestamp are empty and source is "unavailable" when no source had a price
+        """
+        symbols = list(dict.fromkeys(symbol.strip().upper().replace(".VN", "") for symbol in symbols if symbol.strip()))
+        quotes = self.get_quotes(symbols)
+        rows = []
+        for symbol in symbols:
+            quote = quotes.get(symbol)
+            if quote is None:
+                rows.append({"symbol": symbol, "price": None, "source": "unavailable", "timestamp": None})
+            else:
+                rows.append({"symbol": symbol, "price": quote.price, "source": quote.source,
+                             "timestamp": quote.fetched_at.astimezone(HOSE_TIMEZONE).strftime("%Y-%m-%d %H:%M:%S")})
+        return pd.DataFrame(rows, columns=["symbol", "price", "source", "timestamp"])
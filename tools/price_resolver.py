@@ -0,0 +1,214 @@
+"""Hedged multi-source price resolution with per-source timeouts and circuit breakers.
+
+Sources are tried in order of preference, but not one after another: if the current source has
+not answered within PRICE_HEDGE_DELAY_SECONDS, the next one is started as well, and the first
+valid price wins. A source that fails or exceeds its timeout counts as a failure; after
+PRICE_SOURCE_FAILURE_THRESHOLD consecutive failures it is skipped for PRICE_SOURCE_COOLDOWN_SECONDS,
+then given one trial call. A lookup never takes longer than PRICE_LOOKUP_TIMEOUT_SECONDS.
+
+Source functions return prices in VND: a source reporting thousands of VND converts its own
+prices with to_vnd, and the resolver returns them unchanged. Source functions are blocking and run on a shared thread
+pool. A source still running when the lookup finishes is left to complete in the background;
+only its health is recorded.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+from typing import Callable, List, Optional, Tuple
+load_dotenv()
+
+PRICE_SOURCE_TIMEOUT_SECONDS = float(os.getenv('PRICE_SOURCE_TIMEOUT_SECONDS', 3))
+PRICE_HEDGE_DELAY_SECONDS = float(os.getenv('PRICE_HEDGE_DELAY_SECONDS', 1))
+PRICE_LOOKUP_TIMEOUT_SECONDS = float(os.getenv('PRICE_LOOKUP_TIMEOUT_SECONDS', 5))
+PRICE_SOURCE_FAILURE_THRESHOLD = int(os.getenv('PRICE_SOURCE_FAILURE_THRESHOLD', 3))
+PRICE_SOURCE_COOLDOWN_SECONDS = float(os.getenv('PRICE_SOURCE_COOLDOWN_SECONDS', 60))
+PRICE_RESOLVER_WORKERS = 16
+# Some sources report thousands of VND; no listed stock trades below 1,000 VND
+THOUSANDS_VND_LIMIT = 1000
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open after `threshold` failures -> half-open after `cooldown`"""
+    def __init__(self, threshold: int = PRICE_SOURCE_FAILURE_THRESHOLD, cooldown: float = PRICE_SOURCE_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; in half-open state only one trial call at a time"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                # A failed trial opens the breaker for another cooldown
+                self.opened_at = time.monotonic()
+
+class PriceSource:
+    def __init__(self, name: str, fetch: Callable[[str], Optional[float]], timeout: float = PRICE_SOURCE_TIMEOUT_SECONDS):
+        """
+        Args:
+            name (str): Source name, e.g. "vnstock"
+            fetch (Callable): Returns the price of a symbol, or None if it is unavailable
+            timeout (float): Seconds after which a call counts as failed
+        """
+        self.name = name
+        self.fetch = fetch
+        self.timeout = timeout
+        self.breaker = CircuitBreaker()
+        self.calls = 0
+        self.wins = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latency_ewma: Optional[float] = None
+
+    def metrics(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "calls": self.calls,
+            "wins": self.wins,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None
+        }
+
+class Attempt:
+    """One call to a source; its outcome is recorded once, by the call or by the resolver's timeout"""
+    def __init__(self, source: PriceSource):
+        self.source = source
+        self.started = time.monotonic()
+        self.settled = False
+        self.lock = threading.Lock()
+
+    def settle(self, success: bool, elapsed: Optional[float] = None) -> bool:
+        with self.lock:
+            if self.settled:
+                return False
+            self.settled = True
+        if success:
+            self.source.breaker.record_success()
+            if elapsed is not None:
+                previous = self.source.latency_ewma
+                self.source.latency_ewma = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+        else:
+            self.source.breaker.record_failure()
+        return True
+
+def to_vnd(price: float) -> float:
+    """Price in VND from a price in VND or in thousands of VND"""
+    return price * 1000 if 0 < price < THOUSANDS_VND_LIMIT else price
+
+def is_valid_price(price) -> bool:
+    return price is not None and price > 0
+
+class HedgedPriceResolver:
+    """Resolves a price from the first source to answer validly, starting backups on a delay"""
+    def __init__(self,
+                 sources: List[PriceSource],
+                 hedge_delay: float = PRICE_HEDGE_DELAY_SECONDS,
+                 timeout: float = PRICE_LOOKUP_TIMEOUT_SECONDS,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Args:
+            sources (list[PriceSource]): Sources in order of preference
+            hedge_delay (float): Seconds to wait for a source before also starting the next one
+            timeout (float): Maximum seconds of a lookup
+            executor (ThreadPoolExecutor): Runs the source calls, a pool of PRICE_RESOLVER_WORKERS by default
+        """
+        self.sources = sources
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.executor = executor or ThreadPoolExecutor(max_workers=PRICE_RESOLVER_WORKERS,
+                                                       thread_name_prefix="price-source")
+
+    def _call(self, attempt: Attempt, symbol: str) -> Optional[float]:
+        source = attempt.source
+        try:
+            price = source.fetch(symbol)
+            if price is not None:
+                price = float(price)
+        except Exception as e:
+            print(f"Error getting price for {symbol} from {source.name}: {e}")
+            price = None
+        elapsed = time.monotonic() - attempt.started
+        valid = is_valid_price(price) and elapsed <= source.timeout
+        if attempt.settle(valid, elapsed) and not is_valid_price(price):
+            source.errors += 1
+        return price
+
+    def resolve(self, symbol: str) -> Tuple[Optional[float], Optional[str]]:
+        """Price of symbol from the fastest healthy source.
+        Args:
+            symbol (str): Stock symbol without .VN suffix
+        Returns:
+            tuple: (price, source name), or (None, None) if no source answered within the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        # Breakers are asked only when a source is about to start, so a half-open trial is never
+        # granted to a source that ends up not being called
+        waiting = [source for source in self.sources if source.breaker.state != "open"]
+        # Every breaker is open: a lookup that fails fast is worse than trying anyway
+        forced = not waiting
+        if forced:
+            waiting = list(self.sources)
+        pending = {}
+        next_start = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if waiting and (now >= next_start or not pending):
+                source = waiting.pop(0)
+                if forced or source.breaker.allow():
+                    attempt = Attempt(source)
+                    source.calls += 1
+                    pending[self.executor.submit(self._call, attempt, symbol)] = attempt
+                    next_start = now + self.hedge_delay
+                continue
+            if not pending or now >= deadline:
+                break
+            # Wake up for the next hedge, the earliest source timeout or the deadline
+            wake_at = min([deadline] + [attempt.started + attempt.source.timeout for attempt in pending.values()]
+                          + ([next_start] if waiting else []))
+            done, _ = wait(pending, timeout=max(0.0, wake_at - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = pending.pop(future)
+                price = future.result()
+                if is_valid_price(price) and time.monotonic() - attempt.started <= attempt.source.timeout:
+                    attempt.source.wins += 1
+                    return price, attempt.source.name
+            now = time.monotonic()
+            for future, attempt in list(pending.items()):
+                if now - attempt.started >= attempt.source.timeout:
+                    # Stop waiting for it; it keeps running but cannot win any more
+                    del pending[future]
+                    if attempt.settle(False):
+                        attempt.source.timeouts += 1
+        return None, None
+
+    def metrics(self) -> dict:
+        return {source.name: source.metrics() for source in self.sources}
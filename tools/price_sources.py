@@ -0,0 +1,228 @@
+"""Price sources built on long-lived HTTP sessions and shared client objects.
+
+- HTTP sources (VNDirect, Alpha Vantage) share one requests.Session: connections are kept alive
+  across calls, idempotent GETs are retried with exponential backoff on connection errors and
+  429/5xx answers, and a response is abandoned as soon as it exceeds PRICE_MAX_RESPONSE_BYTES.
+- vnstock clients are created once per symbol (and once for the price board) instead of per call.
+- yfinance reads `fast_info.last_price` (a small chart request) instead of the full `info` dump.
+- get_vnstock_history feeds the local daily OHLCV store (ohlcv_store.py).
+
+Every function returns prices in VND (see to_vnd), or None when the source has no price; see
+tools/price_resolver.py for the timeouts, hedging and circuit breaking around them.
+benchmarks/price_source_benchmark.py measures the per-call overhead saved against a local HTTP
+stand-in.
+"""
+import functools
+import json
+import os
+import requests
+import yfinance as yf
+import pandas as pd
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Dict, List, Optional
+from vnstock import Vnstock
+from tracing import traced
+from tools.price_resolver import PRICE_SOURCE_TIMEOUT_SECONDS, PRICE_RESOLVER_WORKERS, to_vnd
+load_dotenv()
+
+PRICE_HTTP_RETRIES = int(os.getenv('PRICE_HTTP_RETRIES', 2))
+PRICE_HTTP_BACKOFF_SECONDS = float(os.getenv('PRICE_HTTP_BACKOFF_SECONDS', 0.2))
+PRICE_MAX_RESPONSE_BYTES = int(os.getenv('PRICE_MAX_RESPONSE_BYTES', 1_000_000))
+VNDIRECT_PRICE_URL = os.getenv('VNDIRECT_PRICE_URL', 'https://dchart.vndirect.com.vn/general')
+ALPHA_VANTAGE_URL = os.getenv('ALPHA_VANTAGE_URL', 'https://www.alphavantage.co/query')
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+class ResponseTooLarge(Exception):
+    pass
+
+def create_http_session(pool_size: int = PRICE_RESOLVER_WORKERS,
+                        retries: int = PRICE_HTTP_RETRIES,
+                        backoff: float = PRICE_HTTP_BACKOFF_SECONDS) -> requests.Session:
+    """Keep-alive session retrying GET requests with exponential backoff.
+    Args:
+        pool_size (int): Connections kept per host, as many as concurrent lookups
+        retries (int): Retries on connection errors and 429/5xx answers
+        backoff (float): First backoff in seconds, doubled at every retry
+    Returns:
+        requests.Session: Session to share between threads
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+http_session = create_http_session()
+
+def get_json(url: str, params: Optional[dict] = None, session: Optional[requests.Session] = None,
+             timeout: float = PRICE_SOURCE_TIMEOUT_SECONDS, max_bytes: int = PRICE_MAX_RESPONSE_BYTES) -> Any:
+    """GET a JSON document, reading at most max_bytes of it.
+    Raises:
+        requests.RequestException: On connection errors and error statuses left after the retries
+        ResponseTooLarge: If the body is larger than max_bytes
+    """
+    session = session or http_session
+    with session.get(url, params=params, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        length = response.headers.get("Content-Length")
+        if length is not None and int(length) > max_bytes:
+            raise ResponseTooLarge(f"{url} answered {length} bytes, limit is {max_bytes}")
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=16384):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ResponseTooLarge(f"{url} answered more than {max_bytes} bytes")
+    return json.loads(body)
+
+@traced("price.vndirect")
+def get_vn_direct_price(symbol: str, base_url: str = VNDIRECT_PRICE_URL) -> Optional[float]:
+    """Get stock price from the VNDirect chart API.
+    Args:
+        symbol (str): Stock symbol without .VN suffix
+        base_url (str): Endpoint, VNDIRECT_PRICE_URL by default
+    Returns:
+        Optional[float]: Current stock price or None if not found
+    """
+    try:
+        data = get_json(base_url, params={"symbol": symbol})
+        if 'data' in data and len(data['data']) > 0:
+            return to_vnd(float(data['data'][0]['last']))
+    except Exception:
+        return None
+    return None
+
+@traced("price.alpha_vantage")
+def get_alpha_vantage_price(symbol: str, base_url: str = ALPHA_VANTAGE_URL) -> Optional[float]:
+    """Get stock price using Alpha Vantage API as fallback.
+    Args:
+        symbol (str): Stock symbol
+        base_url (str): Endpoint, ALPHA_VANTAGE_URL by default
+    Returns:
+        Optional[float]: Current stock price or None if not found
+    """
+    api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
+    if not api_key:
+        return None
+    try:
+        data = get_json(base_url, params={"function": "GLOBAL_QUOTE", "symbol": symbol.replace('.VN', ''), "apikey": api_key})
+        if 'Global Quote' in data and '05. price' in data['Global Quote']:
+            return to_vnd(float(data['Global Quote']['05. price']))
+    except Exception:
+        return None
+    return None
+
+@functools.lru_cache(maxsize=512)
+def vnstock_client(symbol: str):
+    """Shared vnstock client of a symbol"""
+    return Vnstock().stock(source="TCBS", symbol=symbol)
+
+@functools.lru_cache(maxsize=1)
+def vnstock_trading():
+    """Shared vnstock trading client, its price board accepts any list of symbols"""
+    return Vnstock().stock(symbol="VCB", source="VCI").trading
+
+@traced("price.vnstock")
+def get_vnstock_price(symbol: str) -> Optional[float]:
+    """Get stock price using VnStock API.
+    Args:
+        symbol (str): Stock symbol without .VN suffix
+    Returns:
+        Optional[float]: Current stock price or None if not found
+    """
+    try:
+        client = vnstock_client(symbol)
+        # Get latest price data
+        end = datetime.now().strftime("%Y-%m-%d")
+        start = (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d")
+        df = client.quote.history(symbol=symbol, start=start, end=end, interval="1D")
+        if not df.empty:
+            # Get the most recent close price
+            return to_vnd(float(df.iloc[-1]['close']))
+    except Exception as e:
+        print(f"Error getting price for {symbol}: {str(e)}")
+        return None
+    return None
+
+@traced("price.vnstock_history")
+def get_vnstock_history(symbol: str, start: str, end: str) -> pd.DataFrame:
+    """Daily OHLCV bars of a symbol from vnstock.
+    Args:
+        symbol (str): Stock symbol without .VN suffix
+        start (str): First date, YYYY-MM-DD
+        end (str): Last date, YYYY-MM-DD
+    Returns:
+        dataframe: trade_date, open, high, low, close (VND) and volume per trading day, empty if none
+    """
+    columns = ["trade_date", "open", "high", "low", "close", "volume"]
+    df = vnstock_client(symbol).quote.history(symbol=symbol, start=start, end=end, interval="1D")
+    if df is None or df.empty:
+        return pd.DataFrame(columns=columns)
+    bars = pd.DataFrame({"trade_date": pd.to_datetime(df["time"]).dt.date, "volume": df["volume"]})
+    for column in ["open", "high", "low", "close"]:
+        bars[column] = df[column].astype(float).map(to_vnd)
+    return bars[columns].dropna(subset=["close"])
+
+@traced("price.yfinance")
+def get_yfinance_price(symbol: str) -> Optional[float]:
+    """Get stock price using yfinance's lightweight fast_info.
+    Args:
+        symbol (str): Stock symbol without .VN suffix
+    Returns:
+        Optional[float]: Current stock price or None if not found
+    """
+    try:
+        # A new Ticker per call: fast_info keeps the first price it reads
+        current_price = yf.Ticker(f"{symbol}.VN").fast_info.last_price
+        if current_price is not None and current_price > 0:
+            return to_vnd(float(current_price))
+    except Exception:
+        return None
+    return None
+
+def flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Join MultiIndex columns such as ("match", "match_price") into "match_match_price" """
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = ["_".join(str(level) for level in column if level) for column in df.columns]
+    return df
+
+def parse_price_board(board: pd.DataFrame) -> Dict[str, float]:
+    """Last price per symbol from a vnstock price board; the reference price before the first match"""
+    board = flatten_columns(board)
+    symbol_column = next(column for column in board.columns if column.endswith("symbol"))
+    match_column = next((column for column in board.columns if column.endswith("match_price")), None)
+    ref_column = next((column for column in board.columns if column.endswith("ref_price")), None)
+    prices = {}
+    for _, row in board.iterrows():
+        price = row[match_column] if match_column is not None else None
+        if (price is None or pd.isna(price) or price <= 0) and ref_column is not None:
+            price = row[ref_column]
+        if price is not None and not pd.isna(price) and price > 0:
+            prices[str(row[symbol_column]).upper()] = to_vnd(float(price))
+    return prices
+
+@traced("price.vnstock_board")
+def get_vnstock_price_board(symbols: List[str]) -> Dict[str, float]:
+    """Last prices of several symbols from the VCI price board, in one request.
+    Args:
+        symbols (list[str]): Stock symbols without .VN suffix
+    Returns:
+        dict: {symbol: price in VND}, symbols missing from the board are left out
+    """
+    try:
+        return parse_price_board(vnstock_trading().price_board(symbols_list=symbols))
+    except Exception as e:
+        print(f"Error getting price board for {symbols}: {e}")
+        return {}
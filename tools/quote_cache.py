@@ -0,0 +1,157 @@
+"""Process-wide cache of last prices, shared by every conversation.
+
+A cached quote lives QUOTE_CACHE_TTL_SECONDS while HOSE is trading and until the next session
+opens once it is not: during the lunch break, after the close, at night and on weekends the last
+price cannot change. Concurrent misses for the same symbol are single-flight: one caller fetches,
+the others wait for its result, so 50 simultaneous requests for FPT cause one fetch.
+Failed fetches (None) are not cached.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta, time as day_time
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+from typing import Callable, Dict, Optional, Tuple, Union
+load_dotenv()
+
+QUOTE_CACHE_TTL_SECONDS = float(os.getenv('QUOTE_CACHE_TTL_SECONDS', 15))
+HOSE_TIMEZONE = ZoneInfo("Asia/Ho_Chi_Minh")
+# Morning and afternoon sessions; the afternoon one includes the ATC auction and 15 minutes for
+# the closing price to settle
+HOSE_SESSIONS = [(day_time(9, 0), day_time(11, 30)), (day_time(13, 0), day_time(15, 0))]
+
+def next_open(now: datetime) -> datetime:
+    """Start of the next HOSE session after now (weekdays only, holidays are not known)"""
+    for start, _ in HOSE_SESSIONS:
+        opening = now.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+        if opening > now and now.weekday() < 5:
+            return opening
+    day = now + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    start = HOSE_SESSIONS[0][0]
+    return day.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+
+def is_trading_time(now: Optional[datetime] = None) -> bool:
+    """Whether a HOSE session is open at now (the current time in Vietnam by default)"""
+    now = (now or datetime.now(HOSE_TIMEZONE)).astimezone(HOSE_TIMEZONE)
+    return now.weekday() < 5 and any(start <= now.time() < end for start, end in HOSE_SESSIONS)
+
+def session_in_progress(now: Optional[datetime] = None) -> bool:
+    """Whether today's trading day has opened and not yet closed, lunch break included"""
+    now = (now or datetime.now(HOSE_TIMEZONE)).astimezone(HOSE_TIMEZONE)
+    return now.weekday() < 5 and HOSE_SESSIONS[0][0] <= now.time() < HOSE_SESSIONS[-1][1]
+
+def last_close_date(now: Optional[datetime] = None) -> date:
+    """Date of the latest trading day whose afternoon session has closed (weekdays only, holidays are not known)"""
+    now = (now or datetime.now(HOSE_TIMEZONE)).astimezone(HOSE_TIMEZONE)
+    day = now.date()
+    if now.time() < HOSE_SESSIONS[-1][1]:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+def quote_ttl(now: Optional[datetime] = None, trading_ttl: float = QUOTE_CACHE_TTL_SECONDS) -> float:
+    """Seconds a price fetched now stays valid.
+    Args:
+        now (datetime): Current time, timezone-aware; defaults to the current time in Vietnam
+        trading_ttl (float): TTL while a session is open
+    Returns:
+        float: trading_ttl during a session, otherwise the seconds until the next session opens
+    """
+    now = (now or datetime.now(HOSE_TIMEZONE)).astimezone(HOSE_TIMEZONE)
+    if is_trading_time(now):
+        return trading_ttl
+    return max((next_open(now) - now).total_seconds(), trading_ttl)
+
+class Quote:
+    """A last price with where and when it was obtained"""
+    __slots__ = ("price", "source", "fetched_at")
+
+    def __init__(self, price: float, source: Optional[str] = None, fetched_at: Optional[datetime] = None):
+        self.price = price
+        self.source = source
+        self.fetched_at = fetched_at or datetime.now(HOSE_TIMEZONE)
+
+class QuoteCache:
+    """Thread-safe last-price cache with single-flight fetching, shared by the price tools"""
+    def __init__(self, fetch: Callable[[str], Union[Quote, float, None]], trading_ttl: float = QUOTE_CACHE_TTL_SECONDS):
+        """
+        Args:
+            fetch (Callable): Returns the last price (or Quote) of a symbol, or None if it is unavailable
+            trading_ttl (float): TTL of a quote while HOSE is trading
+        """
+        self.fetch = fetch
+        self.trading_ttl = trading_ttl
+        # symbol -> (quote, monotonic expiry)
+        self.entries: Dict[str, Tuple[Quote, float]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, symbol: str) -> Optional[float]:
+        """Last price of symbol, from the cache, from a fetch already running, or fetched now"""
+        quote = self.get_quote(symbol)
+        return quote.price if quote is not None else None
+
+    def peek(self, symbol: str) -> Optional[Quote]:
+        """Cached quote of symbol if it is still valid, without fetching"""
+        with self._lock:
+            entry = self.entries.get(symbol.strip().upper())
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+        return None
+
+    def put(self, symbol: str, quote: Quote):
+        """Store a quote obtained elsewhere, e.g. from a bulk price board"""
+        with self._lock:
+            self.entries[symbol.strip().upper()] = (quote, time.monotonic() + quote_ttl(trading_ttl=self.trading_ttl))
+
+    def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Like get(), with the source and time of the price"""
+        symbol = symbol.strip().upper()
+        with self._lock:
+            entry = self.entries.get(symbol)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            future = self._inflight.get(symbol)
+            if future is None:
+                self.misses += 1
+                future = self._inflight[symbol] = Future()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            return future.result()
+        try:
+            quote = self.fetch(symbol)
+        except Exception as e:
+            print(f"Error fetching quote for {symbol}: {e}")
+            quote = None
+        if quote is not None and not isinstance(quote, Quote):
+            quote = Quote(quote)
+        with self._lock:
+            if quote is not None:
+                self.entries[symbol] = (quote, time.monotonic() + quote_ttl(trading_ttl=self.trading_ttl))
+            del self._inflight[symbol]
+        future.set_result(quote)
+        return quote
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(symbol.strip().upper(), None)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
@@ -1,7 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from collections import deque
+from typing import Any, Dict, List, Optional
 from colorama import Fore
 import asyncio
+import time
+
+# What a listener queue does when it is full:
+#   drop: discard new text chunks
+#   coalesce: append new text to the last queued chunk, or merge two adjacent queued chunks to
+#             make room when the last item is an event (the text is dropped if none are adjacent)
+#   block: make the producer wait until the listener catches up
+# Events are never dropped or merged: they wait for space under "block", make room like text
+# under "coalesce", and are queued anyway if there is none
+OVERFLOW_POLICIES = ("drop", "coalesce", "block")
 
 class ResponseStreamListener(ABC):
     """Abstract base class for response stream listeners"""
@@ -10,23 +21,200 @@ class ResponseStreamListener(ABC):
         """Called when new text is available"""
         pass
 
+    async def on_event(self, event: dict):
+        """Called on progress events of the agent, e.g.
+        {"type": "tool_start", "tool": ..., "readable_name": ..., "tool_call_id": ...}
+        {"type": "tool_end", "tool": ..., "readable_name": ..., "tool_call_id": ..., "status": ..., "elapsed": ...}
+        {"type": "answer_reset"}: the text streamed so far preceded tool calls and is not the final answer
+        {"type": "answer_end"}: the final answer is complete
+        """
+        pass
+
 class ConsoleStreamer(ResponseStreamListener):
     """A simple console-based streamer that prints responses in color"""
     async def on_stream(self, text: str):
-        print(Fore.RED + f"{text}" + Fore.RESET)
+        print(Fore.RED + f"{text}" + Fore.RESET, end="", flush=True)
+
+    async def on_event(self, event: dict):
+        if event["type"] == "tool_start":
+            print(Fore.CYAN + f"⚙️ {event['readable_name']}..." + Fore.RESET)
+        elif event["type"] == "tool_end" and event["status"] == "error":
+            print(Fore.RED + f"❌ {event['readable_name']}" + Fore.RESET)
+        elif event["type"] in ("answer_reset", "answer_end"):
+            print()
+
+class ListenerChannel:
+    """Bounded queue of one listener, drained by its own task so a slow listener only delays itself"""
+    def __init__(self, listener: ResponseStreamListener, max_queue: int, overflow: str):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}, expected one of {OVERFLOW_POLICIES}")
+        self.listener = listener
+        self.max_queue = max_queue
+        self.overflow = overflow
+        # Items are [kind, payload, enqueued_at], kind being "text" or "event"
+        self.queue = deque()
+        self.task: Optional[asyncio.Task] = None
+        self._has_items = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_lag = 0.0
+
+    def _ensure_task(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._drain())
+
+    def _append(self, kind: str, payload: Any):
+        self.queue.append([kind, payload, time.perf_counter()])
+        self._idle.clear()
+        self._has_items.set()
+        if len(self.queue) >= self.max_queue:
+            self._has_space.clear()
+
+    def _make_room(self) -> bool:
+        """Merge the last two adjacent queued text chunks into one, keeping their order"""
+        for i in range(len(self.queue) - 1, 0, -1):
+            if self.queue[i][0] == "text" and self.queue[i - 1][0] == "text":
+                self.queue[i - 1][1] += self.queue[i][1]
+                del self.queue[i]
+                self.coalesced += 1
+                return True
+        return False
+
+    async def put_text(self, text: str):
+        self._ensure_task()
+        if len(self.queue) < self.max_queue:
+            self._append("text", text)
+        elif self.overflow == "drop":
+            self.dropped += 1
+        elif self.overflow == "coalesce":
+            if self.queue[-1][0] == "text":
+                self.queue[-1][1] += text
+                self.coalesced += 1
+            elif self._make_room():
+                self._append("text", text)
+            else:
+                self.dropped += 1
+        else:
+            await self._has_space.wait()
+            self._append("text", text)
+
+    async def put_event(self, event: dict):
+        self._ensure_task()
+        if len(self.queue) >= self.max_queue:
+            if self.overflow == "block":
+                await self._has_space.wait()
+            elif self.overflow == "coalesce":
+                self._make_room()
+        self._append("event", event)
+
+    async def _drain(self):
+        while True:
+            if not self.queue:
+                self._has_items.clear()
+                self._idle.set()
+                await self._has_items.wait()
+                continue
+            kind, payload, enqueued_at = self.queue.popleft()
+            if len(self.queue) < self.max_queue:
+                self._has_space.set()
+            self.max_lag = max(self.max_lag, time.perf_counter() - enqueued_at)
+            try:
+                if kind == "text":
+                    await self.listener.on_stream(payload)
+                else:
+                    await self.listener.on_event(payload)
+                self.delivered += 1
+            except Exception as e:
+                # A failing listener must not affect the producer or the other listeners
+                self.errors += 1
+                print(f"Error in stream listener {type(self.listener).__name__}: {e}")
+
+    async def flush(self):
+        """Wait until every queued item has been delivered"""
+        if self.task is not None and not self.task.done():
+            await self._idle.wait()
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def metrics(self) -> dict:
+        oldest = self.queue[0][2] if self.queue else None
+        return {
+            "pending": len(self.queue),
+            "lag_seconds": time.perf_counter() - oldest if oldest is not None else 0.0,
+            "max_lag_seconds": self.max_lag,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "overflow": self.overflow
+        }
 
 class ResponseStreamer:
-    """Manages multiple response stream listeners"""
-    def __init__(self):
+    """Manages multiple response stream listeners.
+
+    Every listener gets its own bounded queue and drain task: stream() and emit() only enqueue,
+    so a slow or failing listener neither delays the others nor the LLM stream (except under
+    the "block" overflow policy, which is the point of it).
+    """
+    def __init__(self, max_queue: int = 256, overflow: str = "coalesce"):
+        """
+        Args:
+            max_queue (int): Default queue size of a listener
+            overflow (str): Default overflow policy, one of OVERFLOW_POLICIES
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}, expected one of {OVERFLOW_POLICIES}")
+        self.max_queue = max_queue
+        self.overflow = overflow
         self.listeners: List[ResponseStreamListener] = []
+        self.channels: Dict[int, ListenerChannel] = {}
 
-    def add_listener(self, listener: ResponseStreamListener):
+    def add_listener(self, listener: ResponseStreamListener, max_queue: Optional[int] = None,
+                     overflow: Optional[str] = None):
+        """Register a listener, optionally with its own queue size and overflow policy"""
         self.listeners.append(listener)
+        self.channels[id(listener)] = ListenerChannel(listener, max_queue or self.max_queue, overflow or self.overflow)
 
     def remove_listener(self, listener: ResponseStreamListener):
+        """Unregister a listener, its undelivered items are discarded"""
         self.listeners.remove(listener)
+        channel = self.channels.pop(id(listener))
+        if channel.task is not None:
+            channel.task.cancel()
 
     async def stream(self, text: str):
         """Stream text to all listeners asynchronously"""
         for listener in self.listeners:
-            await listener.on_stream(text) 
\ No newline at end of file
+            await self.channels[id(listener)].put_text(text)
+
+    async def emit(self, event: dict):
+        """Send a progress event to all listeners"""
+        for listener in self.listeners:
+            await self.channels[id(listener)].put_event(event)
+
+    async def flush(self):
+        """Wait until all listeners have received everything streamed so far"""
+        await asyncio.gather(*(channel.flush() for channel in self.channels.values()))
+
+    async def aclose(self):
+        """Deliver what is queued, then stop the drain tasks"""
+        await self.flush()
+        await asyncio.gather(*(channel.close() for channel in self.channels.values()))
+
+    def metrics(self) -> Dict[str, dict]:
+        """Queue metrics per listener: pending items, current and max lag, delivered/dropped/coalesced/errors"""
+        return {f"{type(listener).__name__}#{i}": self.channels[id(listener)].metrics()
+                for i, listener in enumerate(self.listeners)}
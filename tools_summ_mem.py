@@ -1,12 +1,21 @@
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage, message_chunk_to_message
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from typing import List, Optional
 import os
+import time
 import asyncio
 import colorama
 from colorama import Fore
 import utils
+from tools.response_streamer import ResponseStreamer, ConsoleStreamer
+from tool_result_cache import ToolResultCache, compact_tool_content
+from conversation_recorder import ConversationRecorder
+from answer_cache import AnswerCache, used_price_tools
+from conversation_memory import ConversationMemory, MEMORY_TOKEN_BUDGET, MEMORY_KEEP_TURNS, count_tokens, message_text
+from tracing import tracer
 TOOL_CALLING_MODEL = os.getenv('CLAUDE_3_5_SONNET')
 
 OPEN_AI_MODELS = ["gpt-4o", "gpt-4o-mini", "o3-mini"]
@@ -20,42 +29,208 @@ ANTHROPIC_AI_MODELS = [
 
 DEFAULT_SYSTEM_PROMPT = """You are a helpful assistant."""
 
+# Tool calls of one LLM turn run concurrently, at most TOOL_CALL_CONCURRENCY at a time,
+# each one cancelled after TOOL_CALL_TIMEOUT seconds
+TOOL_CALL_CONCURRENCY = int(os.getenv('TOOL_CALL_CONCURRENCY', 4))
+TOOL_CALL_TIMEOUT = float(os.getenv('TOOL_CALL_TIMEOUT', 60))
+
+def create_llm(model_name: str) -> BaseChatModel:
+    """Chat model client for one of OPEN_AI_MODELS or ANTHROPIC_AI_MODELS"""
+    if model_name in OPEN_AI_MODELS:
+        return ChatOpenAI(model=model_name)
+    if model_name in ANTHROPIC_AI_MODELS:
+        return ChatAnthropic(model=model_name)
+    raise ValueError(f"Unknown model {model_name}")
+
 class ToolsCallingAgentWithMem:
     def __init__(self, 
                  model_name: str = TOOL_CALLING_MODEL,
                  system_prompt: Optional[str] = None,
-                 tools: Optional[List] = None):
+                 tools: Optional[List] = None,
+                 tool_concurrency: int = TOOL_CALL_CONCURRENCY,
+                 tool_timeout: float = TOOL_CALL_TIMEOUT,
+                 llm: Optional[BaseChatModel] = None,
+                 llm_with_tools: Optional[Runnable] = None,
+                 streamer: Optional[ResponseStreamer] = None,
+                 memory_token_budget: int = MEMORY_TOKEN_BUDGET,
+                 memory_keep_turns: int = MEMORY_KEEP_TURNS,
+                 recorder: Optional[ConversationRecorder] = None,
+                 answer_cache: Optional[AnswerCache] = None):
         """Initialize the ToolsCallingAgentWithMem.
         
         Args:
             model_name: Name of the LLM model to use
             system_prompt: System prompt to use
             tools: List of tools to make available to the LLM
+            tool_concurrency: Maximum number of tool calls of one turn running at once
+            tool_timeout: Seconds before a tool call is cancelled
+            llm: Chat model to use instead of the one built from model_name (e.g. a stub in load tests)
+            llm_with_tools: llm already bound to tools, shared between agents to skip bind_tools
+            streamer: Receives the final answer token by token and the tool progress events
+            memory_token_budget: Prompt tokens above which older turns are summarized
+            memory_keep_turns: Number of latest turns always kept verbatim
+            recorder: Persists the conversation and its turns in the background
+            answer_cache: Answers opening questions that were already answered, shared between agents
         """
         # Initialize the LLM
-        if model_name in OPEN_AI_MODELS:
-            self.llm = ChatOpenAI(model=model_name)
-        elif model_name in ANTHROPIC_AI_MODELS:
-            self.llm = ChatAnthropic(model=model_name)
+        self.model_name = model_name
+        if llm is not None:
+            self.llm = llm
+            self.model_name = getattr(llm, 'model', None) or getattr(llm, 'model_name', None) or llm._llm_type
+        else:
+            self.llm = create_llm(model_name)
             
         # Set system prompt
         if system_prompt is None:
             system_prompt = DEFAULT_SYSTEM_PROMPT
             
-        # Initialize message history
+        # Initialize message history, older turns are folded into a summary past the token budget
+        self.memory = ConversationMemory(system_prompt, llm=self.llm, token_budget=memory_token_budget,
+                                         keep_last_turns=memory_keep_turns)
         self.messages = [SystemMessage(content=system_prompt)]
         
         # Set up tools
         self.tools = tools if tools is not None else []
         self.tools_map = {tool.name: tool for tool in self.tools}
+        self.tool_concurrency = tool_concurrency
+        self.tool_timeout = tool_timeout
+        self.streamer = streamer
+        self.tool_cache = ToolResultCache()
+        self.recorder = recorder
+        self.conversation_log = None
+        self.answer_cache = answer_cache
         
         # Bind tools to LLM
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        self.llm_with_tools = llm_with_tools if llm_with_tools is not None else self.llm.bind_tools(self.tools)
+
+    def _tool_message(self, tool_call: dict, tool_result) -> ToolMessage:
+        """Wrap a tool result into the ToolMessage answering tool_call, compacting its content."""
+        tool_content = compact_tool_content(tool_result)
+        if not isinstance(tool_content, str):
+            tool_content = str(tool_content)
+
+        return ToolMessage(
+            content=tool_content,
+            tool_call_id=tool_call['id'],
+            name=tool_call['name']
+        )
+
+    async def _run_tool_call(self, tool_call: dict, semaphore: asyncio.Semaphore) -> ToolMessage:
+        """Execute one tool call with a timeout, turning failures into an error ToolMessage.
+
+        Async tools run on the event loop, sync tools on the default thread pool (ainvoke).
+        The tool is invoked with the arguments only, so its raw output (e.g. a DataFrame) is compacted here.
+        A sync tool that times out keeps running in its thread but its result is dropped.
+        """
+        tool_name = tool_call['name'].lower()
+        tool_selected = self.tools_map.get(tool_name)
+        if tool_selected is None:
+            return ToolMessage(content=f"Error: unknown tool {tool_call['name']}",
+                               tool_call_id=tool_call['id'], name=tool_call['name'], status="error")
+        # Repeated calls are answered from the conversation's cache
+        cache_key = self.tool_cache.key(tool_call)
+        if cache_key is not None:
+            with tracer.span("tool_cache.lookup", tool=tool_name) as span:
+                cached_content = self.tool_cache.lookup(cache_key, tool_call)
+                span.set(hit=cached_content is not None)
+            if cached_content is not None:
+                return ToolMessage(content=cached_content, tool_call_id=tool_call['id'], name=tool_call['name'])
+        queued = time.perf_counter()
+        async with semaphore:
+            event = {
+                "tool": tool_call['name'],
+                "readable_name": utils.MAP_TOOLS_2_READABLE_NAME.get(tool_call['name'], tool_call['name']),
+                "tool_call_id": tool_call['id']
+            }
+            await self._emit({"type": "tool_start", **event})
+            start = time.perf_counter()
+            with tracer.span(f"tool.{tool_name}", queue_ms=round((start - queued) * 1000, 1)) as span:
+                try:
+                    tool_result = await asyncio.wait_for(tool_selected.ainvoke(tool_call['args']), timeout=self.tool_timeout)
+                    tool_message = self._tool_message(tool_call, tool_result)
+                except asyncio.TimeoutError:
+                    tool_message = ToolMessage(content=f"Error: {tool_call['name']} timed out after {self.tool_timeout:g}s",
+                                               tool_call_id=tool_call['id'], name=tool_call['name'], status="error")
+                except Exception as e:
+                    tool_message = ToolMessage(content=f"Error: {tool_call['name']} failed: {e}",
+                                               tool_call_id=tool_call['id'], name=tool_call['name'], status="error")
+                span.set(status=tool_message.status, payload_chars=len(tool_message.content))
+            await self._emit({"type": "tool_end", **event, "status": tool_message.status,
+                              "elapsed": time.perf_counter() - start})
+        if cache_key is not None:
+            if tool_message.status == "error":
+                self.tool_cache.discard(cache_key)
+            else:
+                self.tool_cache.store(cache_key, tool_message.content)
+        return tool_message
+
+    async def run_tool_calls(self, tool_calls: List[dict]) -> List[ToolMessage]:
+        """Execute the tool calls of one LLM response concurrently.
+
+        Args:
+            tool_calls: tool_calls of the AIMessage
+
+        Returns:
+            List[ToolMessage]: One message per tool call, in the order of tool_calls
+        """
+        semaphore = asyncio.Semaphore(self.tool_concurrency)
+        return await asyncio.gather(*(self._run_tool_call(tool_call, semaphore) for tool_call in tool_calls))
+
+    async def _emit(self, event: dict):
+        if self.streamer is not None:
+            await self.streamer.emit(event)
+
+    async def _call_llm(self) -> AIMessage:
+        """Call the LLM on the history, streaming text chunks to the streamer if there is one.
+
+        Text is forwarded as soon as it arrives. If the response turns out to contain tool
+        calls, an answer_reset event tells the listeners that this text was not the final answer.
+        """
+        with tracer.span("llm.call", model=self.model_name, messages=len(self.messages)) as span:
+            if self.streamer is None:
+                response = await self.llm_with_tools.ainvoke(self.messages)
+            else:
+                start = time.perf_counter()
+                response = None
+                streamed = False
+                async for chunk in self.llm_with_tools.astream(self.messages):
+                    response = chunk if response is None else response + chunk
+                    text = chunk.text()
+                    if text:
+                        if not streamed:
+                            span.set(first_token_ms=round((time.perf_counter() - start) * 1000, 1))
+                        streamed = True
+                        await self.streamer.stream(text)
+                if response is None:
+                    # A stream that ended without a chunk: ask again without streaming
+                    print(f"LLM stream of {self.model_name} returned no chunks, retrying without streaming")
+                    response = await self.llm_with_tools.ainvoke(self.messages)
+                else:
+                    if response.tool_calls and streamed:
+                        await self._emit({"type": "answer_reset"})
+                    response = message_chunk_to_message(response)
+            if tracer.enabled:
+                span.set(tool_calls=len(response.tool_calls), **self._token_usage(response))
+            return response
+
+    def _token_usage(self, response: AIMessage) -> dict:
+        """Tokens sent and received by an LLM call, estimated when the provider does not report them"""
+        usage = response.usage_metadata
+        if usage:
+            return {"input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens")}
+        return {
+            "input_tokens": sum(count_tokens(message_text(message)) for message in self.messages),
+            "output_tokens": count_tokens(message_text(response)),
+            "tokens_estimated": True
+        }
 
     def reset(self):
         """Reset the conversation history."""
-        system_prompt = self.messages[0].content
-        self.messages = [SystemMessage(content=system_prompt)]
+        self.memory.reset()
+        self.tool_cache.clear()
+        # The next message starts a new conversation record
+        self.conversation_log = None
+        self.messages = [SystemMessage(content=self.memory.system_prompt)]
 
     async def process_user_message(self, user_message: str) -> str:
         """Process a user message and return the final response.
@@ -66,62 +241,107 @@ class ToolsCallingAgentWithMem:
         Returns:
             str: The final response from the LLM
         """
-        # Add user message to history
-        self.messages.append(HumanMessage(content=user_message))
-        
-        count_added_messages = 0
-        # Get initial response from LLM
-        response = self.llm_with_tools.invoke(self.messages)
-        self.messages.append(response)
-        count_added_messages += 1
+        with tracer.span("agent.turn", model=self.model_name, question_chars=len(user_message)) as turn_span:
+            start = time.perf_counter()
+            self.tool_cache.new_turn()
+            if self.recorder is not None and self.conversation_log is None:
+                self.conversation_log = self.recorder.start_conversation(self.model_name, self.memory.system_prompt)
+            if self.conversation_log is not None:
+                turn_span.set(conversation_id=self.conversation_log.conversation_id)
+            # Only the first question of a conversation can be answered from the answer cache
+            opening = self.answer_cache is not None and not self.memory.turns and not self.memory.summary
+            # Build the history from memory and add user message
+            self.messages = await self.memory.messages()
+            self.messages.append(HumanMessage(content=user_message))
+
+            if opening:
+                cached_answer = await self.answer_cache.lookup(user_message)
+                if cached_answer is not None:
+                    turn_span.set(answer_cache_hit=True, answer_chars=len(cached_answer))
+                    return await self._answer_from_cache(user_message, cached_answer, start)
         
-        # Handle tool calls if any
-        while response.tool_calls:
-            for tool_call in response.tool_calls:
-                # Execute the tool
-                tool_name = tool_call['name'].lower()
-                tool_selected = self.tools_map[tool_name]
-                tool_result = tool_selected.invoke(tool_call)
-                
-                # Create tool message
-                tool_content = str(tool_result)
-                if hasattr(tool_result, 'to_dict'):  # Handle pandas DataFrame
-                    tool_content = tool_result.to_string()
-                elif isinstance(tool_result, (list, dict)):
-                    tool_content = tool_result
-                
-                tool_message = ToolMessage(
-                    content=tool_content,
-                    tool_call_id=tool_call['id'],
-                    name=tool_call['name']
-                )
-                
-                self.messages.append(tool_message)
-                count_added_messages += 1
-            # Get next response
-            response = self.llm_with_tools.invoke(self.messages)
+            count_added_messages = 0
+            # Get initial response from LLM
+            response = await self._call_llm()
             self.messages.append(response)
             count_added_messages += 1
+        
+            # Handle tool calls if any
+            while response.tool_calls:
+                # Execute the tools concurrently, results keep the order of the tool calls
+                tool_messages = await self.run_tool_calls(response.tool_calls)
+                self.messages.extend(tool_messages)
+                count_added_messages += len(tool_messages)
+                # Get next response
+                response = await self._call_llm()
+                self.messages.append(response)
+                count_added_messages += 1
 
-        last_message = self.messages[-1]
-        content = last_message.content
+            last_message = self.messages[-1]
+            content = last_message.content
 
-        # Remove all intermediate messages and add the final one
-        for i in range(count_added_messages):
-            self.messages.pop()
-        self.messages.append(last_message)
+            turn_messages = self.messages[-count_added_messages:]
+            tool_names = [tool_call['name'] for message in turn_messages
+                          for tool_call in getattr(message, 'tool_calls', None) or []]
+            turn_span.set(llm_calls=count_added_messages - len(tool_names), tool_calls=len(tool_names),
+                          answer_chars=len(message_text(last_message)))
+            if opening:
+                # Answers built on failed tool calls are not worth repeating
+                if not any(getattr(message, 'status', None) == "error" for message in turn_messages):
+                    self.answer_cache.add(user_message, message_text(last_message), used_price_tools(tool_names))
 
-        return content  # Return full response for display
+            if self.conversation_log is not None:
+                self.conversation_log.record_turn(user_message, message_text(last_message), time.perf_counter() - start,
+                                                  self.messages[-count_added_messages - 1:])
+
+            # Remove all intermediate messages and add the final one
+            for i in range(count_added_messages):
+                self.messages.pop()
+            self.messages.append(last_message)
+            self.memory.add_turn(user_message, message_text(last_message))
+            await self._emit({"type": "answer_end"})
+
+            return content  # Return full response for display
+
+    async def _answer_from_cache(self, user_message: str, answer: str, start: float) -> str:
+        """Finish the turn with a cached answer, without calling the LLM or the tools."""
+        answer_message = AIMessage(content=answer)
+        if self.streamer is not None:
+            await self.streamer.stream(answer)
+        if self.conversation_log is not None:
+            self.conversation_log.record_turn(user_message, answer, time.perf_counter() - start, [answer_message])
+        self.messages.append(answer_message)
+        self.memory.add_turn(user_message, answer)
+        await self._emit({"type": "answer_end"})
+        return answer
 
 async def run_interactive_chat():
     """Run an interactive chat session with the ToolsCallingAgentWithMem."""
     colorama.init()  # Initialize colorama for colored output
     
+    # Record the conversation in MYSQL_CONVERSATION_DB if configured
+    recorder = None
+    if os.getenv('MYSQL_CONVERSATION_DB'):
+        recorder = ConversationRecorder()
+        recorder.start()
+
+    # Answers to opening questions, seeded with the recorded conversations
+    answer_cache = AnswerCache()
+    if os.getenv('MYSQL_CONVERSATION_DB'):
+        await answer_cache.load_history()
+
+    # Stream the answer and the tool progress to the console
+    streamer = ResponseStreamer()
+    streamer.add_listener(ConsoleStreamer())
+
     # Initialize agent with some example tools
     agent = ToolsCallingAgentWithMem(
         model_name=TOOL_CALLING_MODEL,
-        tools=utils.FIN_TOOLS,
-        system_prompt=utils.financial_system_prompt()
+        tools=utils.ASYNC_FIN_TOOLS,
+        system_prompt=utils.financial_system_prompt(),
+        streamer=streamer,
+        recorder=recorder,
+        answer_cache=answer_cache
     )
 
     print(Fore.CYAN + "\n" + "="*50)
@@ -133,7 +353,7 @@ async def run_interactive_chat():
     while True:
         # Get user input
         print(Fore.YELLOW + "👤 User:" + Fore.RESET)
-        user_input = input(Fore.WHITE + "➜ " + Fore.RESET)
+        user_input = await asyncio.to_thread(input, Fore.WHITE + "➜ " + Fore.RESET)
         print()  # Add newline for spacing
         
         # Check for exit command
@@ -149,18 +369,19 @@ async def run_interactive_chat():
 
         try:
             # Process user message
-            print(Fore.CYAN + "⚙️ Processing..." + Fore.RESET)
-            response = await agent.process_user_message(user_input)
-
-            # Print the response
-            print(Fore.GREEN + "\n🤖 Assistant:" + Fore.RESET)
-            print(response)
+            # The response is printed by the ConsoleStreamer as it is generated
+            print(Fore.GREEN + "🤖 Assistant:" + Fore.RESET)
+            await agent.process_user_message(user_input)
+            await streamer.flush()
             print()
 
         except Exception as e:
             print(Fore.RED + f"\n❌ Error: {str(e)}\n" + Fore.RESET)
             continue
 
+    if recorder is not None:
+        recorder.close()
+
 if __name__ == "__main__":
     # Run the interactive chat
     asyncio.run(run_interactive_chat())
@@ -0,0 +1,227 @@
+"""Lightweight span tracing of agent turns: LLM calls, tool calls, DB queries and price lookups.
+
+Spans nest through a context variable, so the tool calls run by asyncio.gather are children
+of the turn that started them. A finished span is written as one JSON line to TRACE_PATH
+(trace_id, span_id, parent_id, name, start, duration_ms and attributes such as token counts
+and payload sizes) and its duration is added to an in-process histogram per span name.
+
+Tracing is off unless TRACING_ENABLED is set: span() then returns a shared no-op span and
+traced() functions call straight through, so instrumented code costs one attribute check.
+"""
+import asyncio
+import atexit
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Any, Callable, Dict, Optional
+load_dotenv()
+
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', '').lower() in ('1', 'true', 'yes')
+# Empty to keep only the histograms
+TRACE_PATH = os.getenv('TRACE_PATH', 'agent_traces.jsonl')
+# Upper bounds in milliseconds of the histogram buckets
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, 120000]
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+class Histogram:
+    """Bucketed durations of one span name"""
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, duration_ms: float):
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Approximate percentile, interpolated inside its bucket"""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = HISTOGRAM_BOUNDS_MS[index - 1] if index > 0 else 0.0
+                upper = HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else self.max_ms
+                value = lower + (upper - lower) * (rank - seen) / count
+                return round(min(value, self.max_ms), 2)
+            seen += count
+        return round(self.max_ms, 2)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 2)
+        }
+
+class Span:
+    """A timed operation, used as a context manager; set() adds attributes to the exported record"""
+    __slots__ = ("tracer", "name", "attrs", "trace_id", "span_id", "parent_id", "start_time", "start", "duration", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.duration = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start_time = datetime.now()
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.finish(self)
+        return False
+
+class NoopSpan:
+    """Returned by span() when tracing is disabled"""
+    duration = 0.0
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NOOP_SPAN = NoopSpan()
+
+class Tracer:
+    def __init__(self, enabled: bool = TRACING_ENABLED, path: Optional[str] = TRACE_PATH):
+        """
+        Args:
+            enabled (bool): Record spans; when False span() is a no-op
+            path (str): JSON lines file the spans are appended to, None or empty for histograms only
+        """
+        self.enabled = enabled
+        self.path = path
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def span(self, name: str, **attrs) -> Any:
+        """Span context manager, e.g. `with tracer.span("llm.call", messages=12) as span:`"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def finish(self, span: Span):
+        duration_ms = span.duration * 1000
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start_time.isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 3),
+            **span.attrs
+        }
+        # Spans finish on the event loop and in tool threads
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram()
+            histogram.add(duration_ms)
+            if self.path:
+                try:
+                    if self._file is None:
+                        self._file = open(self.path, "a", encoding="utf-8")
+                        atexit.register(self.close)
+                    self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                except OSError as e:
+                    print(f"Error writing trace, disabling the trace file: {e}")
+                    self.path = None
+
+    def summary(self) -> Dict[str, dict]:
+        """Count, mean, p50, p95 and max duration in milliseconds per span name"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def format_summary(self) -> str:
+        lines = [f"{'span':<40} {'count':>7} {'mean_ms':>10} {'p50_ms':>8} {'p95_ms':>8} {'max_ms':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<40} {stats['count']:>7} {stats['mean_ms']:>10.2f} {stats['p50_ms']:>8.2f} "
+                         f"{stats['p95_ms']:>8.2f} {stats['max_ms']:>10.2f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+tracer = Tracer()
+
+def payload_size(value: Any) -> Optional[int]:
+    """Rows of a DataFrame or items of a list/dict, characters of a string, None otherwise"""
+    if isinstance(value, (str, list, tuple, dict)) or hasattr(value, "columns"):
+        return len(value)
+    return None
+
+def _set_result(span: Span, result: Any):
+    if result is None:
+        span.set(empty=True)
+    else:
+        size = payload_size(result)
+        if size is not None:
+            span.set(size=size)
+
+def traced(name: str) -> Callable:
+    """Decorator running a sync or async function in a span, with the size of its result as `size`
+    (or `empty` if it returned None).
+    Args:
+        name (str): Span name, e.g. "db.get_financial_data"
+    """
+    def decorate(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(name) as span:
+                    result = await func(*args, **kwargs)
+                    _set_result(span, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name) as span:
+                result = func(*args, **kwargs)
+                _set_result(span, result)
+                return result
+        return wrapper
+    return decorate
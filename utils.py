@@ -1,7 +1,9 @@
 from datetime import datetime
 from langchain_community.tools import TavilySearchResults
-from database import get_financial_data_tool, get_industries_list_tool, get_all_symbols_tool, get_company_info_tool, get_best_symbols_by_industry_tool
+from database import get_financial_data_tool, get_financial_data_batch_tool, get_industries_list_tool, get_all_symbols_tool, get_company_info_tool, get_best_symbols_by_industry_tool
 from tools.get_current_stock_price_tool import get_current_stock_price
+from tools.batch_price_tool import get_current_stock_prices
+import async_database
 
 def financial_system_prompt():
     today_date = datetime.now().strftime("%Y-%m-%d")
@@ -37,18 +39,26 @@ Ngày hôm nay là (YYYY-MM-DD): {today_date}.
 """
 
 search_tool = TavilySearchResults(max_results=5)
-FIN_TOOLS = [get_financial_data_tool, get_industries_list_tool, 
+FIN_TOOLS = [get_financial_data_tool, get_financial_data_batch_tool, get_industries_list_tool, 
              get_all_symbols_tool, get_company_info_tool, 
-             search_tool, get_best_symbols_by_industry_tool, get_current_stock_price]
+             search_tool, get_best_symbols_by_industry_tool, get_current_stock_price, get_current_stock_prices]
+# Same tools with the database ones on the aiomysql pool, for agents that call tools with ainvoke
+ASYNC_FIN_TOOLS = [async_database.get_financial_data_tool, async_database.get_financial_data_batch_tool,
+                   async_database.get_industries_list_tool, async_database.get_all_symbols_tool,
+                   async_database.get_company_info_tool, search_tool,
+                   async_database.get_best_symbols_by_industry_tool, get_current_stock_price, get_current_stock_prices]
 MAP_TOOLS_2_READABLE_NAME = {
     "get_financial_data_tool": "Truy xuất dữ liệu tài chính",
+    "get_financial_data_batch_tool": "Truy xuất dữ liệu tài chính nhiều mã",
     "get_industries_list_tool": "Truy xuất danh sách ngành",
     "get_all_symbols_tool": "Truy xuất tất cả mã chứng khoán",
     "get_company_info_tool": "Truy xuất thông tin công ty",
     # "search_tool": "Tìm kiếm trên internet",
     "tavily_search_results_json": "Tìm kiếm trên internet",
     "get_best_symbols_by_industry_tool": "Truy xuất mã chứng khoán tốt nhất theo ngành",
-    "get_current_stock_price_tool": "Truy xuất giá cổ phiếu hiện tại"
+    "get_current_stock_price_tool": "Truy xuất giá cổ phiếu hiện tại",
+    "get_current_stock_price": "Truy xuất giá cổ phiếu hiện tại",
+    "get_current_stock_prices": "Truy xuất giá nhiều cổ phiếu hiện tại"
 }
 
 # Don't remove this code, it's backup prompt: V4
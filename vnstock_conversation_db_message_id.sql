@@ -0,0 +1,8 @@
+-- Idempotency key of the conversation recorder (conversation_recorder.py).
+-- Run once against MYSQL_CONVERSATION_DB after loading vnstock_conversation_db.sql:
+--   mysql vnstock_conversation_db < vnstock_conversation_db_message_id.sql
+-- Existing rows keep a NULL message_id, which the unique key allows.
+
+ALTER TABLE `tool_calling_messages`
+  ADD COLUMN `message_id` varchar(36) DEFAULT NULL,
+  ADD UNIQUE KEY `uq_message_id` (`message_id`);